@@ -1,10 +1,29 @@
+"""
+Заполнение block_id свапов слотами транзакций из Solana JSON-RPC (getTransaction).
+
+Свапы без block_id читаются страницами в порядке id (keyset), уникальные tx_hash страницы
+запрашиваются JSON-RPC батчами по RPC_BATCH_SIZE вызовов в одном HTTP-запросе через одну сессию
+с ограничением одновременных запросов, block_id записывается одним UPDATE на страницу.
+Последний обработанный id сохраняется в PROGRESS_FILE - после перезапуска обход продолжается с него,
+после полного прохода отметка сбрасывается.
+
+Запуск: python -m src.application.etl.block_id_updater [--rpc-url URL] [--restart]
+Локально: python -m src.application.etl.fake_solana_rpc и --rpc-url http://127.0.0.1:8899
+"""
+
+import argparse
 import asyncio
+import json
 import logging
+import os
+import time
+import uuid
+from pathlib import Path
 
 import aiohttp
 from tortoise import Tortoise
 
-from src.infra.db.models.tortoise import Swap
+from src.infra.db import queries
 from src.infra.db.setup_tortoise import (
     init_db_async,
 )
@@ -13,69 +32,199 @@ from src.settings import config
 logger = logging.getLogger()
 logger.setLevel(logging.INFO)
 
-BATCH_SIZE = 1  # Размер пачки
-
-
-async def get_transaction(session, tx_hash):
-    payload = {
-        "jsonrpc": "2.0",
-        "id": 1,
-        "method": "getTransaction",
-        "params": [
-            tx_hash,
-            {
-                "encoding": "json",
-                "maxSupportedTransactionVersion": 0,
-            },
-        ],
-    }
+BATCH_SIZE = 10_000  # Свапов на страницу из БД
+RPC_BATCH_SIZE = 100  # Вызовов getTransaction в одном HTTP-запросе
+RPC_CONCURRENCY = 8  # Одновременных HTTP-запросов к ноде
+RPC_TIMEOUT = 30  # Секунд на HTTP-запрос
+RPC_RETRIES = 3
+PROGRESS_FILE = ".block_id_updater_progress.json"
+MIN_ID = uuid.UUID(int=0)
+
+
+class BatchRejectedException(Exception):
+    """Нода отклонила батч целиком (ошибка вместо списка ответов или 413) - например, превышен размер батча"""
+
+
+def load_progress(progress_file: str = PROGRESS_FILE) -> uuid.UUID:
     try:
-        async with session.post(
-            config.solana.rpc_node_url,
-            json=payload,
-            timeout=5,
-        ) as response:
-            response.raise_for_status()
-            json_data = await response.json()
-            return json_data.get("result", {})
-    except Exception as e:
-        logger.error(f"Ошибка запроса для {tx_hash}: {e}")
-        return {}
-
-
-async def get_swap_block_id(session, swap):
-    transaction_data = await get_transaction(session, swap.tx_hash)
-    return swap, transaction_data.get("slot")
-
-
-async def process():
-    while True:
-        swaps = await Swap.filter(block_id=None).limit(BATCH_SIZE)
-        if not swaps:
-            break
-
-        async with aiohttp.ClientSession() as session:
-            tasks = [get_swap_block_id(session, swap) for swap in swaps]
-            results = await asyncio.gather(*tasks, return_exceptions=True)
-
-        # Обновляем только успешные
-        updates = [swap for swap, block_id in results if block_id is not None]
-        for swap, block_id in results:
-            if block_id is not None:
-                swap.block_id = block_id
-
-        if updates:
-            await Swap.bulk_update(updates, fields=["block_id"])
-            logger.info(f"Обработано {len(updates)} транзакций")
-
-
-async def main():
+        return uuid.UUID(json.loads(Path(progress_file).read_text())["last_id"])
+    except (FileNotFoundError, KeyError, ValueError):
+        return MIN_ID
+
+
+def save_progress(last_id: uuid.UUID, progress_file: str = PROGRESS_FILE) -> None:
+    path = Path(progress_file)
+    tmp_path = path.with_suffix(f".{os.getpid()}.tmp")
+    tmp_path.write_text(json.dumps({"last_id": str(last_id)}))
+    os.replace(tmp_path, path)
+
+
+def reset_progress(progress_file: str = PROGRESS_FILE) -> None:
+    Path(progress_file).unlink(missing_ok=True)
+
+
+def build_get_transactions_payload(tx_hashes: list[str]) -> list[dict]:
+    """JSON-RPC батч: id вызова - индекс хэша в tx_hashes"""
+    return [
+        {
+            "jsonrpc": "2.0",
+            "id": i,
+            "method": "getTransaction",
+            "params": [
+                tx_hash,
+                {
+                    "encoding": "json",
+                    "maxSupportedTransactionVersion": 0,
+                },
+            ],
+        }
+        for i, tx_hash in enumerate(tx_hashes)
+    ]
+
+
+async def get_transactions_slots(
+    session: aiohttp.ClientSession,
+    semaphore: asyncio.Semaphore,
+    rpc_url: str,
+    tx_hashes: list[str],
+) -> dict[str, int | None]:
+    """
+    Слоты транзакций одним батч-запросом: None - транзакция не найдена.
+    Хэшей, вызовы которых вернули ошибку, в результате нет - они остаются до следующего прохода.
+    Отклоненный целиком батч делится пополам, половины запрашиваются заново
+    """
+    payload = build_get_transactions_payload(tx_hashes)
+    for attempt in range(1, RPC_RETRIES + 1):
+        try:
+            async with semaphore:
+                async with session.post(rpc_url, json=payload) as response:
+                    if response.status == 413:
+                        raise BatchRejectedException(f"HTTP 413: {response.reason}")
+                    response.raise_for_status()
+                    json_data = await response.json(content_type=None)
+            if not isinstance(json_data, list):
+                # Ошибка на весь батч, например -32005 - превышен размер батча
+                raise BatchRejectedException(f"Ответ не является батчем: {json_data}")
+            slots = {}
+            for item in json_data:
+                if "error" in item:
+                    continue
+                result = item.get("result")
+                slots[tx_hashes[item["id"]]] = result.get("slot") if result else None
+            return slots
+        except BatchRejectedException as e:
+            if len(tx_hashes) > 1:
+                middle = len(tx_hashes) // 2
+                logger.warning(f"Батч из {len(tx_hashes)} транзакций отклонен ({e}) - делим пополам")
+                halves = await asyncio.gather(
+                    get_transactions_slots(session, semaphore, rpc_url, tx_hashes[:middle]),
+                    get_transactions_slots(session, semaphore, rpc_url, tx_hashes[middle:]),
+                )
+                return halves[0] | halves[1]
+            error = e
+        except (aiohttp.ClientError, asyncio.TimeoutError, ValueError) as e:
+            error = e
+        logger.warning(f"Ошибка запроса {len(tx_hashes)} транзакций (попытка {attempt}/{RPC_RETRIES}): {error}")
+        if attempt < RPC_RETRIES:
+            await asyncio.sleep(2**attempt)
+    return {}
+
+
+async def update_block_ids(slots: dict[str, int]) -> int:
+    if not slots:
+        return 0
+    updated, _ = await Tortoise.get_connection("default").execute_query(
+        queries.UPDATE_SWAPS_BLOCK_ID,
+        [list(slots), list(slots.values())],
+    )
+    return updated
+
+
+async def process(
+    rpc_url: str | None = None,
+    batch_size: int = BATCH_SIZE,
+    rpc_batch_size: int = RPC_BATCH_SIZE,
+    concurrency: int = RPC_CONCURRENCY,
+    progress_file: str = PROGRESS_FILE,
+) -> None:
+    rpc_url = rpc_url or config.solana.rpc_node_url
+    connection = Tortoise.get_connection("default")
+    last_id = load_progress(progress_file)
+    if last_id != MIN_ID:
+        logger.info(f"Продолжаем с id {last_id}")
+    semaphore = asyncio.Semaphore(concurrency)
+    total_swaps = total_transactions = total_updated = total_missing = total_failed = 0
+    started = time.perf_counter()
+    async with aiohttp.ClientSession(
+        connector=aiohttp.TCPConnector(limit=concurrency),
+        timeout=aiohttp.ClientTimeout(total=RPC_TIMEOUT),
+    ) as session:
+        while True:
+            rows = await connection.execute_query_dict(queries.GET_SWAPS_WITHOUT_BLOCK_ID, [last_id, batch_size])
+            if not rows:
+                break
+            # Свапы одной транзакции запрашиваем один раз
+            tx_hashes = list(dict.fromkeys(row["tx_hash"] for row in rows if row["tx_hash"]))
+            results = await asyncio.gather(
+                *[
+                    get_transactions_slots(session, semaphore, rpc_url, tx_hashes[i : i + rpc_batch_size])
+                    for i in range(0, len(tx_hashes), rpc_batch_size)
+                ]
+            )
+            slots = {}
+            for result in results:
+                slots.update(result)
+            found_slots = {tx_hash: slot for tx_hash, slot in slots.items() if slot is not None}
+            updated = await update_block_ids(found_slots)
+
+            last_id = rows[-1]["id"]
+            save_progress(last_id, progress_file)
+            total_swaps += len(rows)
+            total_transactions += len(tx_hashes)
+            total_updated += updated
+            total_missing += len(slots) - len(found_slots)
+            total_failed += len(tx_hashes) - len(slots)
+            elapsed = time.perf_counter() - started
+            logger.info(
+                f"Свапов: {total_swaps} | транзакций: {total_transactions} | обновлено свапов: {total_updated} "
+                f"| не найдено транзакций: {total_missing} | ошибок: {total_failed} "
+                f"| транзакций/сек: {round(total_transactions / max(elapsed, 1e-9))}"
+            )
+    # Полный проход завершен - следующий начнется сначала и повторит транзакции с ошибками
+    reset_progress(progress_file)
+    logger.info(
+        f"block_id заполнены: обновлено {total_updated} свапов за {round(time.perf_counter() - started, 1)} сек"
+    )
+
+
+async def main(
+    rpc_url: str | None = None,
+    restart: bool = False,
+    **kwargs,
+):
+    if restart:
+        reset_progress(kwargs.get("progress_file", PROGRESS_FILE))
     await init_db_async()
     try:
-        await process()
+        await process(rpc_url, **kwargs)
     finally:
         await Tortoise.close_connections()
 
 
 if __name__ == "__main__":
-    asyncio.run(main())
+    arg_parser = argparse.ArgumentParser(description="Заполнение block_id свапов через Solana JSON-RPC")
+    arg_parser.add_argument("--rpc-url", help="По умолчанию - config.solana.rpc_node_url")
+    arg_parser.add_argument("--batch-size", type=int, default=BATCH_SIZE)
+    arg_parser.add_argument("--rpc-batch-size", type=int, default=RPC_BATCH_SIZE)
+    arg_parser.add_argument("--concurrency", type=int, default=RPC_CONCURRENCY)
+    arg_parser.add_argument("--restart", action="store_true", help="Начать обход сначала")
+    args = arg_parser.parse_args()
+    asyncio.run(
+        main(
+            args.rpc_url,
+            args.restart,
+            batch_size=args.batch_size,
+            rpc_batch_size=args.rpc_batch_size,
+            concurrency=args.concurrency,
+        )
+    )
@@ -0,0 +1,82 @@
+"""
+Локальный JSON-RPC сервер с getTransaction для проверки block_id_updater без ноды Solana.
+Слот транзакции детерминированно вычисляется из хэша, часть транзакций "не найдена" (result: null).
+Поддерживает одиночные и батч-запросы, считает HTTP-запросы и вызовы.
+
+Запуск: python -m src.application.etl.fake_solana_rpc [--port 8899]
+"""
+
+import argparse
+import asyncio
+import hashlib
+
+from aiohttp import web
+
+FIRST_SLOT = 300_000_000
+
+
+class FakeSolanaRpc:
+    def __init__(self, missing_rate: float = 0.01, max_batch_size: int | None = None):
+        self.missing_rate = missing_rate
+        self.max_batch_size = max_batch_size
+        self.requests_count = 0
+        self.calls_count = 0
+
+    @staticmethod
+    def _hash_fraction(tx_hash: str) -> float:
+        return int(hashlib.sha256(tx_hash.encode()).hexdigest()[:8], 16) / 16**8
+
+    def get_slot(self, tx_hash: str) -> int | None:
+        fraction = self._hash_fraction(tx_hash)
+        if fraction < self.missing_rate:
+            return None
+        return FIRST_SLOT + int(fraction * 10_000_000)
+
+    def _call(self, request: dict) -> dict:
+        self.calls_count += 1
+        response = {"jsonrpc": "2.0", "id": request.get("id")}
+        if request.get("method") != "getTransaction":
+            response["error"] = {"code": -32601, "message": "Method not found"}
+            return response
+        slot = self.get_slot(request["params"][0])
+        response["result"] = {"slot": slot, "blockTime": None, "meta": {}} if slot is not None else None
+        return response
+
+    async def handle(self, request: web.Request) -> web.Response:
+        self.requests_count += 1
+        payload = await request.json()
+        if isinstance(payload, list):
+            if self.max_batch_size and len(payload) > self.max_batch_size:
+                return web.json_response(
+                    {"jsonrpc": "2.0", "id": None, "error": {"code": -32005, "message": "Batch too large"}}
+                )
+            return web.json_response([self._call(item) for item in payload])
+        return web.json_response(self._call(payload))
+
+    def create_app(self) -> web.Application:
+        app = web.Application()
+        app.router.add_post("/", self.handle)
+        return app
+
+    async def start(self, host: str = "127.0.0.1", port: int = 8899) -> web.AppRunner:
+        runner = web.AppRunner(self.create_app())
+        await runner.setup()
+        await web.TCPSite(runner, host, port).start()
+        return runner
+
+
+async def serve(host: str, port: int) -> None:
+    runner = await FakeSolanaRpc().start(host, port)
+    print(f"Fake Solana RPC: http://{host}:{port}")
+    try:
+        await asyncio.Event().wait()
+    finally:
+        await runner.cleanup()
+
+
+if __name__ == "__main__":
+    arg_parser = argparse.ArgumentParser(description="Локальный JSON-RPC сервер с getTransaction")
+    arg_parser.add_argument("--host", default="127.0.0.1")
+    arg_parser.add_argument("--port", type=int, default=8899)
+    args = arg_parser.parse_args()
+    asyncio.run(serve(args.host, args.port))
@@ -1 +0,0 @@
-SOL_ADDRESS = "So11111111111111111111111111111111111111112"
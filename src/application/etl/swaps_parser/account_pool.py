@@ -0,0 +1,119 @@
+import asyncio
+import time
+from contextlib import asynccontextmanager
+from dataclasses import dataclass
+
+from . import db_utils
+from .config import (
+    ACCOUNT_COOLDOWN_SECONDS,
+    ACCOUNT_MAX_CONCURRENCY,
+    ACCOUNT_MAX_FAILURES,
+    ACCOUNT_MIN_QUERY_INTERVAL_SECONDS,
+)
+from .logger import logger
+
+
+class NoActiveFlipsideAccountsException(Exception):
+    def __init__(self):
+        super().__init__("Нету активных аккаунтов FlipsideCrypto")
+
+
+@dataclass
+class AccountState:
+    account: object
+    in_flight: int = 0
+    failures: int = 0  # Ошибок подряд
+    next_query_at: float = 0  # Раньше этого времени (monotonic) новый запрос на ключ не запускаем
+    cooldown_until: float = 0
+
+
+class FlipsideAccountPool:
+    """
+    Распределяет запросы по всем активным учеткам Flipside с ограничением одновременных запросов
+    и частоты запуска на ключ. Ключ с ошибкой уходит на паузу, после max_failures ошибок подряд
+    отключается в БД, а запрос повторяется на другом ключе
+    """
+
+    def __init__(
+        self,
+        accounts: list,
+        max_concurrency: int = ACCOUNT_MAX_CONCURRENCY,
+        min_query_interval: float = ACCOUNT_MIN_QUERY_INTERVAL_SECONDS,
+        cooldown: float = ACCOUNT_COOLDOWN_SECONDS,
+        max_failures: int = ACCOUNT_MAX_FAILURES,
+    ):
+        self.max_concurrency = max_concurrency
+        self.min_query_interval = min_query_interval
+        self.cooldown = cooldown
+        self.max_failures = max_failures
+        self._states = {account.api_key: AccountState(account) for account in accounts}
+        self._changed = asyncio.Event()
+
+    @classmethod
+    async def create(cls, **kwargs) -> "FlipsideAccountPool":
+        return cls(await db_utils.get_flipside_accounts(), **kwargs)
+
+    def __len__(self) -> int:
+        return len(self._states)
+
+    def _pick(self, now: float) -> AccountState | None:
+        available = [
+            state
+            for state in self._states.values()
+            if state.in_flight < self.max_concurrency and state.cooldown_until <= now and state.next_query_at <= now
+        ]
+        return min(available, key=lambda state: state.in_flight, default=None)
+
+    def _wait_timeout(self, now: float) -> float | None:
+        """Через сколько освободится бюджет какого-либо ключа (None - только после завершения запроса)"""
+        ready_at = [
+            max(state.cooldown_until, state.next_query_at)
+            for state in self._states.values()
+            if state.in_flight < self.max_concurrency
+        ]
+        return max(min(ready_at) - now, 0) if ready_at else None
+
+    async def _acquire(self) -> AccountState:
+        while True:
+            if not self._states:
+                raise NoActiveFlipsideAccountsException()
+            now = time.monotonic()
+            state = self._pick(now)
+            if state:
+                state.in_flight += 1
+                state.next_query_at = now + self.min_query_interval
+                return state
+            self._changed.clear()
+            try:
+                await asyncio.wait_for(self._changed.wait(), timeout=self._wait_timeout(now))
+            except TimeoutError:
+                pass
+
+    @asynccontextmanager
+    async def account(self):
+        """Занимает ключ на время запроса"""
+        state = await self._acquire()
+        try:
+            yield state.account
+        finally:
+            state.in_flight -= 1
+            self._changed.set()
+
+    def mark_success(self, account) -> None:
+        state = self._states.get(account.api_key)
+        if state:
+            state.failures = 0
+
+    async def mark_failed(self, account, error: Exception) -> None:
+        state = self._states.get(account.api_key)
+        if not state:
+            return
+        state.failures += 1
+        if state.failures >= self.max_failures:
+            logger.error(f"Отключаем учетку Flipside после {state.failures} ошибок подряд - {error}")
+            del self._states[account.api_key]
+            await db_utils.set_flipside_account_inactive(account)
+        else:
+            logger.warning(f"Ошибка учетки Flipside ({state.failures}/{self.max_failures}), пауза - {error}")
+            state.cooldown_until = time.monotonic() + self.cooldown
+        self._changed.set()
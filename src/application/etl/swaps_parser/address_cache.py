@@ -0,0 +1,52 @@
+from collections import OrderedDict
+from typing import Any, NamedTuple
+from uuid import UUID
+
+from .config import TOKENS_CACHE_SIZE, WALLETS_CACHE_SIZE
+
+
+class CachedWallet(NamedTuple):
+    id: UUID
+    relations_exist: bool  # Созданы ли WalletDetail и статистики кошелька
+
+
+class AddressCache:
+    """Ограниченный LRU-кэш адрес -> данные записи в БД со счетчиками попаданий/промахов"""
+
+    def __init__(self, maxsize: int):
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._data: OrderedDict[str, Any] = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def get(self, address: str) -> Any | None:
+        value = self._data.get(address)
+        if value is None:
+            self.misses += 1
+            return None
+        self._data.move_to_end(address)
+        self.hits += 1
+        return value
+
+    def put(self, address: str, value: Any) -> None:
+        self._data[address] = value
+        self._data.move_to_end(address)
+        while len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+
+    def clear(self) -> None:
+        self._data.clear()
+        self.hits = 0
+        self.misses = 0
+
+    def __str__(self) -> str:
+        return f"записей: {len(self._data)}, попаданий: {self.hits}, промахов: {self.misses}"
+
+
+# Кэши общие для процесса: при обработке нескольких периодов подряд в БД уходят только новые адреса.
+# Заполняются только после коммита записей в БД
+wallets_cache = AddressCache(WALLETS_CACHE_SIZE)  # адрес -> CachedWallet
+tokens_cache = AddressCache(TOKENS_CACHE_SIZE)  # адрес -> id токена
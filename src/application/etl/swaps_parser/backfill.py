@@ -0,0 +1,185 @@
+"""
+Бэкфилл истории свапов за большой диапазон.
+
+Вместо почасового импорта с чтением/upsert WalletToken на каждую пару:
+1. свапы диапазона собираются и превращаются в строки swap тем же кодом, что и в инкрементальном пути,
+   и копируются (COPY) в UNLOGGED staging-таблицу;
+2. кошельки и токены импортируются по уникальным адресам staging;
+3. swap и wallet_token заполняются несколькими INSERT ... SELECT ... GROUP BY по суткам staging,
+   вторичные индексы на это время снимаются и пересоздаются после;
+4. WalletToken затронутых пар сверяется с пересчетом с нуля по таблице swap.
+
+Запуск: python -m src.application.etl.swaps_parser.backfill 2025-01-01T00:00 2025-02-01T00:00 [--source-dir DIR]
+"""
+
+import argparse
+import asyncio
+from datetime import datetime, timedelta
+
+from tortoise import Tortoise
+
+from src.infra.db.models.tortoise import Swap, Token, Wallet, WalletToken
+from src.infra.db.setup_tortoise import init_db_async
+
+from . import db_utils, utils
+from .account_pool import NoActiveFlipsideAccountsException
+from .config import (
+    BACKFILL_ADDRESSES_CHUNK_SIZE,
+    BACKFILL_BATCH_MINUTES,
+    BACKFILL_REBUILD_INDEXES,
+)
+from .logger import logger
+from .parser import (
+    build_objects,
+    create_flipside_source,
+    fetch_period,
+    get_fetch_executor,
+    record_period_volume,
+    shutdown_fetch_executor,
+)
+from .swap_sources import FileSwapSource, SwapSource
+
+
+class BackfillVerificationException(Exception):
+    def __init__(self, pairs_count: int, mismatches_count: int):
+        self.pairs_count = pairs_count
+        self.mismatches_count = mismatches_count
+        super().__init__(
+            f"WalletToken после бэкфилла не сходится с пересчетом по swap: {mismatches_count} из {pairs_count} пар"
+        )
+
+
+async def load_staging(start_time, end_time, source: SwapSource) -> int:
+    """Собирает свапы диапазона по часам и копирует созданные активности в staging"""
+    executor = get_fetch_executor()
+    activities_count = 0
+    for start, end in utils.split_time_range_by_minutes(start_time, end_time, 60):
+        sol_prices = await db_utils.get_sol_prices(
+            minute_from=start - timedelta(minutes=1),
+            minute_to=end + timedelta(minutes=1),
+        )
+        if not sol_prices.get(end):
+            raise ValueError(f"Нету данных о цене соланы в {end}!")
+        swaps, swaps_jupiter = await fetch_period(executor, start, end, source)
+        fetched_counts = len(swaps), len(swaps_jupiter)
+        if swaps or swaps_jupiter:
+            _, _, activities = await asyncio.to_thread(build_objects, swaps, swaps_jupiter, sol_prices)
+            await db_utils.copy_to_backfill_staging(activities)
+            activities_count += len(activities)
+            logger.info(f"В staging загружено свапов за {start} - {end}: {len(activities)} (всего {activities_count})")
+        record_period_volume(source, start, end, *fetched_counts)
+    return activities_count
+
+
+async def import_staging_addresses(chunk_size: int = BACKFILL_ADDRESSES_CHUNK_SIZE) -> None:
+    """Кошельки (со связями) и токены staging импортируются тем же кодом, что и в инкрементальном пути"""
+    wallet_addresses = await db_utils.get_backfill_staging_addresses("wallet_address")
+    for i in range(0, len(wallet_addresses), chunk_size):
+        await db_utils.import_wallets_data(
+            [Wallet(address=address) for address in wallet_addresses[i : i + chunk_size]]
+        )
+    token_addresses = await db_utils.get_backfill_staging_addresses("token_address")
+    for i in range(0, len(token_addresses), chunk_size):
+        await db_utils.import_tokens([Token(address=address) for address in token_addresses[i : i + chunk_size]])
+    logger.info(f"Импортировано кошельков: {len(wallet_addresses)} | токенов: {len(token_addresses)}")
+
+
+async def merge_staging(start_time, end_time, batch_minutes: int = BACKFILL_BATCH_MINUTES) -> None:
+    for start, end in utils.split_time_range_by_minutes(start_time, end_time, batch_minutes):
+        started = datetime.now()
+        await db_utils.merge_backfill_staging(start.timestamp(), end.timestamp())
+        logger.info(f"Слиты свапы и WalletToken-статистики за {start} - {end} | {datetime.now() - started}")
+
+
+async def _backfill(
+    start_time,
+    end_time,
+    source: SwapSource | None = None,
+    batch_minutes: int = BACKFILL_BATCH_MINUTES,
+    rebuild_indexes: bool = BACKFILL_REBUILD_INDEXES,
+    verify: bool = True,
+) -> None:
+    source = source or await create_flipside_source()
+    if not source:
+        return
+    logger.info(f"Запущен бэкфилл за {start_time} - {end_time} | источник: {source.name}")
+
+    await db_utils.create_backfill_staging_table()
+    try:
+        try:
+            activities_count = await load_staging(start_time, end_time, source)
+        except NoActiveFlipsideAccountsException as e:
+            logger.error(e)
+            return
+        if not activities_count:
+            logger.info(f"Свапов за {start_time} - {end_time} нет")
+            return
+        await db_utils.index_backfill_staging()
+        await import_staging_addresses()
+        await db_utils.ensure_swap_partitions(start_time, end_time)
+
+        tables = [Swap._meta.db_table, WalletToken._meta.db_table]
+        index_definitions = []
+        try:
+            if rebuild_indexes:
+                for table in tables:
+                    index_definitions.extend(await db_utils.drop_secondary_indexes(table))
+                logger.info(f"Сняты индексы на время слияния: {len(index_definitions)}")
+            await merge_staging(start_time, end_time, batch_minutes)
+        finally:
+            # Индексы возвращаем и при ошибке - инкрементальный парсер без них не работает
+            await db_utils.create_indexes(index_definitions)
+            if index_definitions:
+                logger.info(f"Индексы пересозданы: {len(index_definitions)}")
+        await db_utils.analyze_tables(tables)
+
+        if verify:
+            pairs_count, mismatches_count = await db_utils.verify_backfill()
+            if mismatches_count:
+                raise BackfillVerificationException(pairs_count, mismatches_count)
+            logger.info(f"Сверка WalletToken пройдена: {pairs_count} пар")
+    finally:
+        await db_utils.drop_backfill_staging_table()
+
+
+async def backfill(
+    start_time,
+    end_time,
+    source: SwapSource | None = None,
+    batch_minutes: int = BACKFILL_BATCH_MINUTES,
+    rebuild_indexes: bool = BACKFILL_REBUILD_INDEXES,
+    verify: bool = True,
+) -> None:
+    """
+    Бэкфилл за [start_time, end_time). swaps_parsed_untill не меняется, а уже импортированные свапы
+    отсекаются ключом дедупликации. Парсер, дойдя до заполненного диапазона, находит в нем свапы и проверяет
+    свои на дубли (import_data_to_db), поэтому пересечение не задваивает статистики.
+    Не запускать одновременно с парсером при rebuild_indexes
+    """
+    await init_db_async()
+    try:
+        await _backfill(start_time, end_time, source, batch_minutes, rebuild_indexes, verify)
+    finally:
+        shutdown_fetch_executor()
+        await Tortoise.close_connections()
+
+
+if __name__ == "__main__":
+    arg_parser = argparse.ArgumentParser(description="Бэкфилл истории свапов через staging-таблицы")
+    arg_parser.add_argument("start_time", type=utils.parse_datetime)
+    arg_parser.add_argument("end_time", type=utils.parse_datetime)
+    arg_parser.add_argument("--source-dir", help="Папка выгрузок для FileSwapSource (по умолчанию - Flipside)")
+    arg_parser.add_argument("--batch-minutes", type=int, default=BACKFILL_BATCH_MINUTES)
+    arg_parser.add_argument("--keep-indexes", action="store_true", help="Не снимать индексы на время слияния")
+    arg_parser.add_argument("--no-verify", action="store_true")
+    args = arg_parser.parse_args()
+    asyncio.run(
+        backfill(
+            args.start_time,
+            args.end_time,
+            source=FileSwapSource(args.source_dir) if args.source_dir else None,
+            batch_minutes=args.batch_minutes,
+            rebuild_indexes=not args.keep_indexes,
+            verify=not args.no_verify,
+        )
+    )
@@ -0,0 +1,112 @@
+"""
+Бенчмарк разметки свапов данными уровня транзакции: utils.populate_swaps_data (словари по транзакциям)
+против пакетной разметки columnar.annotate_swaps и SwapBatch.populate.
+Перед замером сверяет пакетную разметку с populate_swaps_data на случайных транзакциях
+из небольшого набора адресов (несколько роутеров, None-трейдеры, покупка и продажа одного токена).
+
+Запуск: python -m src.application.etl.swaps_parser.benchmarks.annotation
+"""
+
+import random
+import time
+from collections import defaultdict
+from datetime import datetime, timezone
+
+from .. import columnar, utils
+from ..config import OKX_ROUTER_ADDRESS, SOL_ADDRESS
+from .transform import generate_period
+
+ANNOTATION_FIELDS = ("swapper", "is_part_of_transaction_with_mt_3_swappers", "is_part_of_arbitrage_swap_event")
+
+
+def map_by_tx(swaps):
+    mapped_swaps = defaultdict(list)
+    for swap in swaps:
+        mapped_swaps[swap["tx_id"]].append(swap)
+    return mapped_swaps
+
+
+def annotations(swaps):
+    return [tuple(swap.get(field, False) for field in ANNOTATION_FIELDS) for swap in swaps]
+
+
+def generate_random_swaps(rnd, txs_count, router_addresses):
+    swappers = [None, *router_addresses, *(f"wallet-{i}" for i in range(4))]
+    tokens = [f"token-{i}" for i in range(3)]
+    swaps = []
+    for tx_number in range(txs_count):
+        for _ in range(rnd.randint(1, 5)):
+            token = rnd.choice(tokens)
+            is_buy = rnd.random() < 0.5
+            swaps.append(
+                {
+                    "tx_id": f"tx-{tx_number}",
+                    "swapper": rnd.choice(swappers),
+                    "swap_from_mint": SOL_ADDRESS if is_buy else token,
+                    "swap_to_mint": token if is_buy else rnd.choice((SOL_ADDRESS, rnd.choice(tokens))),
+                }
+            )
+    # Свапы транзакций вперемешку - пакетная разметка не требует группировки
+    rnd.shuffle(swaps)
+    return swaps
+
+
+def check_equivalence(rounds=200, txs_count=50, seed=0):
+    rnd = random.Random(seed)
+    for round_number in range(rounds):
+        router_addresses = (OKX_ROUTER_ADDRESS, "router-2")[: rnd.randint(0, 2)]
+        swaps = generate_random_swaps(rnd, txs_count, router_addresses)
+        expected = [swap.copy() for swap in swaps]
+        utils.populate_swaps_data(map_by_tx(expected), router_addresses)
+        columnar.annotate_swaps(swaps, router_addresses)
+        if annotations(swaps) != annotations(expected):
+            raise AssertionError(f"Разметка отличается от populate_swaps_data (раунд {round_number}, seed {seed})")
+
+
+def measure(annotate, swaps):
+    swaps = [swap.copy() for swap in swaps]
+    started = time.perf_counter()
+    annotate(swaps)
+    return swaps, round(time.perf_counter() - started, 3)
+
+
+def populate_dicts(swaps):
+    # Группировка по транзакциям входит в замер - в combine_swaps она делается так же
+    utils.populate_swaps_data(map_by_tx(swaps))
+
+
+def populate_batch(swaps):
+    columnar.SwapBatch.from_records(swaps).populate()
+
+
+def main(
+    swaps_per_minute_values=(500, 2000, 5000),
+    minutes=60,
+):
+    check_equivalence()
+    print("Пакетная разметка совпадает с populate_swaps_data")
+    start_time = datetime(2025, 2, 18, 10, 0, tzinfo=timezone.utc)
+    for swaps_per_minute in swaps_per_minute_values:
+        swaps, _ = generate_period(start_time, minutes, swaps_per_minute, 0)
+        annotated_dicts, seconds_dicts = measure(populate_dicts, swaps)
+        annotated_batch, seconds_batch = measure(columnar.annotate_swaps, swaps)
+        if annotations(annotated_dicts) != annotations(annotated_batch):
+            raise AssertionError("Разметка периода отличается от populate_swaps_data!")
+        _, seconds_columns = measure(populate_batch, swaps)
+        print(
+            " | ".join(
+                [
+                    f"Свапов: {len(swaps)}",
+                    f"Транзакций: {len({swap['tx_id'] for swap in swaps})}",
+                    f"Словари: {seconds_dicts} сек",
+                    f"annotate_swaps: {seconds_batch} сек",
+                    f"SwapBatch (с кодированием): {seconds_columns} сек",
+                    f"Свапов/сек: {round(len(swaps) / max(seconds_dicts, 1e-9))} / "
+                    f"{round(len(swaps) / max(seconds_batch, 1e-9))}",
+                ]
+            )
+        )
+
+
+if __name__ == "__main__":
+    main()
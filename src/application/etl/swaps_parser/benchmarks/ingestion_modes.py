@@ -0,0 +1,73 @@
+"""
+Бенчмарк режимов импорта периода (transactional, parallel, copy) на одном и том же синтетическом часе.
+Каждому режиму достается копия часа с суффиксом режима в tx_hash: объем, кошельки и токены одинаковые,
+а ключ дедупликации не отбрасывает свапы, импортированные предыдущим режимом. Требует БД.
+
+Запуск: python -m src.application.etl.swaps_parser.benchmarks.ingestion_modes
+"""
+
+import asyncio
+import time
+from datetime import datetime, timedelta, timezone
+
+from tortoise import Tortoise
+
+from src.infra.db.setup_tortoise import init_db_async
+
+from ..config import INGESTION_COPY, INGESTION_PARALLEL, INGESTION_TRANSACTIONAL
+from ..parser import build_objects, fetch_period, get_fetch_executor, import_data_to_db, shutdown_fetch_executor
+from ..swap_sources import SyntheticSwapSource
+from .transform import generate_sol_prices
+
+MODES = (INGESTION_TRANSACTIONAL, INGESTION_PARALLEL, INGESTION_COPY)
+# Импорт периода атомарен вместе с отметкой собранного периода
+ATOMIC_MODES = (INGESTION_TRANSACTIONAL, INGESTION_COPY)
+
+
+async def build_period(source, start_time, end_time, sol_prices, tx_suffix):
+    swaps, swaps_jupiter = await fetch_period(get_fetch_executor(), start_time, end_time, source)
+    wallets, tokens, activities = build_objects(swaps, swaps_jupiter, sol_prices)
+    for activity in activities:
+        activity.tx_hash = f"{activity.tx_hash}-{tx_suffix}"
+    return wallets, tokens, activities
+
+
+async def main(
+    swaps_per_minute=2000,
+    minutes=60,
+    modes=MODES,
+):
+    await init_db_async()
+    start_time = datetime(2025, 2, 18, 10, 0, tzinfo=timezone.utc)
+    end_time = start_time + timedelta(minutes=minutes)
+    sol_prices = generate_sol_prices(start_time, minutes)
+    source = SyntheticSwapSource(swaps_per_minute=swaps_per_minute)
+    run_id = int(time.time())
+    try:
+        for mode in modes:
+            wallets, tokens, activities = await build_period(
+                source, start_time, end_time, sol_prices, f"{mode}-{run_id}"
+            )
+            started = time.perf_counter()
+            await import_data_to_db(wallets, tokens, activities, ingestion=mode)
+            seconds = time.perf_counter() - started
+            print(
+                " | ".join(
+                    [
+                        f"Режим: {mode}",
+                        f"Атомарно: {'да' if mode in ATOMIC_MODES else 'нет'}",
+                        f"Свапов: {len(activities)}",
+                        f"Кошельков: {len(wallets)}",
+                        f"Токенов: {len(tokens)}",
+                        f"Время: {round(seconds, 3)} сек",
+                        f"Свапов/сек: {round(len(activities) / max(seconds, 1e-9))}",
+                    ]
+                )
+            )
+    finally:
+        shutdown_fetch_executor()
+        await Tortoise.close_connections()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
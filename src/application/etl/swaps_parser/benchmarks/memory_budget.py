@@ -0,0 +1,120 @@
+"""
+Бенчмарк бюджета памяти: пиковый RSS создания объектов и подготовки импорта (маппинг по кошелькам,
+WalletToken-дельты) для периода целиком и по частям по хэшу кошелька. БД не требуется.
+Перед замером проверяет, что части дают те же активности (с swap_index) и WalletToken-дельты,
+что и период целиком, а кошельки частей не пересекаются. Выводит оценку памяти на свап
+для SWAP_MEMORY_ESTIMATE_KB.
+
+Запуск: python -m src.application.etl.swaps_parser.benchmarks.memory_budget
+"""
+
+import gc
+from datetime import datetime, timezone
+from unittest import mock
+
+from .. import calculations, mappers, memory, parser
+from .transform import generate_period, generate_sol_prices, snapshot
+
+
+def prepare_import(extracted):
+    """Та часть import_data_to_db, что держит объекты периода в памяти, без запросов к БД"""
+    wallets, tokens, activities = extracted
+    mapped_data = mappers.map_data_by_wallets(
+        mappers.map_objects_by_address(wallets),
+        mappers.map_objects_by_address(tokens),
+        activities,
+    )
+    return mapped_data, calculations.calculate_wallet_token_deltas(mapped_data)
+
+
+def deltas_snapshot(mapped_data):
+    return {
+        (wallet_data["wallet"].address, token_data["token"].address): (
+            token_data["stats"].total_buys_count,
+            token_data["stats"].total_sales_count,
+            token_data["stats"].total_buy_amount_usd,
+            token_data["stats"].total_sell_amount_usd,
+        )
+        for wallet_data in mapped_data.values()
+        for token_data in wallet_data["tokens"].values()
+    }
+
+
+def process_parts(swaps, swaps_jupiter, sol_prices, parts_count):
+    """Активности, WalletToken-дельты и кошельки по частям"""
+    # Путь на словарях размечает записи на месте - каждому прогону свои копии
+    swaps = [swap.copy() for swap in swaps]
+    swaps_jupiter = [swap.copy() for swap in swaps_jupiter]
+    parts = parser.split_prepared_swaps(parser.prepare_swaps(swaps, swaps_jupiter), parts_count)
+    activities, deltas, wallets_by_part = [], {}, []
+    for part in parts:
+        extracted = parser.build_part_objects(part, sol_prices)
+        mapped_data, _ = prepare_import(extracted)
+        activities.extend(snapshot(extracted)[2])
+        deltas.update(deltas_snapshot(mapped_data))
+        wallets_by_part.append({wallet.address for wallet in extracted[0]})
+    return sorted(activities, key=repr), deltas, wallets_by_part
+
+
+def check_equivalence(swaps, swaps_jupiter, sol_prices, parts_count_values=(2, 7)):
+    for columnar_transform in (True, False):
+        with mock.patch.object(parser, "COLUMNAR_TRANSFORM", columnar_transform):
+            expected_activities, expected_deltas, _ = process_parts(swaps, swaps_jupiter, sol_prices, 1)
+            for parts_count in parts_count_values:
+                activities, deltas, wallets_by_part = process_parts(swaps, swaps_jupiter, sol_prices, parts_count)
+                if activities != expected_activities or deltas != expected_deltas:
+                    raise AssertionError(f"Части ({parts_count}) дают другой результат, чем период целиком")
+                if sum(map(len, wallets_by_part)) != len(set().union(*wallets_by_part)):
+                    raise AssertionError(f"Кошелек попал в несколько частей ({parts_count})")
+
+
+def measure_peak(swaps, swaps_jupiter, sol_prices, parts_count):
+    """Пиковый RSS сверх RSS до обработки, МБ"""
+    gc.collect()
+    memory.reset_peak_rss()
+    rss_before = memory.rss_mb()
+    parts = parser.split_prepared_swaps(parser.prepare_swaps(swaps, swaps_jupiter), parts_count)
+    activities_count = 0
+    for number in range(len(parts)):
+        part, parts[number] = parts[number], None
+        extracted = parser.build_part_objects(part, sol_prices)
+        del part
+        prepared_import = prepare_import(extracted)
+        activities_count += len(extracted[2])
+        del extracted, prepared_import
+    return round(memory.peak_rss_mb() - rss_before, 1), activities_count
+
+
+def main(
+    swaps_per_minute=5000,
+    minutes=60,
+    parts_count_values=(1, 4, 16),
+):
+    start_time = datetime(2025, 2, 18, 10, 0, tzinfo=timezone.utc)
+    sol_prices = generate_sol_prices(start_time, minutes)
+    check_swaps, check_swaps_jupiter = generate_period(start_time, 5, 500, 150)
+    check_equivalence(check_swaps, check_swaps_jupiter, sol_prices)
+    print("Части совпадают с периодом целиком")
+
+    swaps, swaps_jupiter = generate_period(start_time, minutes, swaps_per_minute, swaps_per_minute // 3)
+    for parts_count in parts_count_values:
+        # Путь на словарях размечает записи на месте - каждому замеру свои копии
+        swaps_copy = [swap.copy() for swap in swaps]
+        swaps_jupiter_copy = [swap.copy() for swap in swaps_jupiter]
+        peak_mb, activities_count = measure_peak(swaps_copy, swaps_jupiter_copy, sol_prices, parts_count)
+        del swaps_copy, swaps_jupiter_copy
+        print(
+            " | ".join(
+                [
+                    f"Частей: {parts_count}",
+                    f"Активностей: {activities_count}",
+                    f"Пик RSS сверх исходного: {peak_mb} МБ",
+                    f"КБ на свап: {round(peak_mb * 1024 / max(activities_count, 1), 2)}",
+                    f"Пик сбрасывается: {memory.reset_peak_rss()}",
+                ]
+            )
+        )
+
+
+if __name__ == "__main__":
+    main()
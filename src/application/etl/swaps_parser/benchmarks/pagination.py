@@ -0,0 +1,70 @@
+"""
+Бенчмарк пагинации Flipside-запросов: LIMIT/OFFSET против keyset на офлайн-клиенте FakeFlipside.
+Показывает, как растет кол-во отсортированных/пропущенных строк с ростом числа страниц за час.
+
+Запуск: python -m src.application.etl.swaps_parser.benchmarks.pagination
+"""
+
+import time
+from datetime import datetime, timedelta, timezone
+
+from .. import utils
+from ..config import PAGINATION_KEYSET, PAGINATION_OFFSET
+from ..fake_flipside import FakeFlipside
+from ..parser import fetch_data_for_period
+from ..swap_sources import FlipsideSwapSource
+
+
+def run_period(client, start_time, end_time, pagination, limit, parts=12):
+    client.reset_stats()
+    started = time.perf_counter()
+    total = 0
+    for start, end in utils.split_time_range(start_time, end_time, parts):
+        _, count, _ = fetch_data_for_period(
+            start,
+            end,
+            None,
+            pagination=pagination,
+            source=FlipsideSwapSource(client=client),
+            limit=limit,
+            use_page_cache=False,
+        )
+        total += count
+    return {
+        "records": total,
+        "queries": client.queries_count,
+        "rows_sorted": client.rows_sorted,
+        "rows_skipped": client.rows_skipped,
+        "seconds": round(time.perf_counter() - started, 3),
+    }
+
+
+def main(
+    swaps_per_minute_values=(500, 2000, 5000, 10000),
+    limit=5000,
+):
+    start_time = datetime(2025, 2, 18, 10, 0, tzinfo=timezone.utc)
+    end_time = start_time + timedelta(minutes=60)
+    for swaps_per_minute in swaps_per_minute_values:
+        client = FakeFlipside(swaps_per_minute=swaps_per_minute)
+        # Генерируем данные заранее, чтобы в замер попала только стоимость запросов
+        client.warm_up(start_time, end_time)
+        for pagination in (PAGINATION_OFFSET, PAGINATION_KEYSET):
+            result = run_period(client, start_time, end_time, pagination, limit)
+            print(
+                " | ".join(
+                    [
+                        f"Свапов/мин: {swaps_per_minute}",
+                        f"Пагинация: {pagination}",
+                        f"Записей: {result['records']}",
+                        f"Запросов: {result['queries']}",
+                        f"Отсортировано строк: {result['rows_sorted']}",
+                        f"Пропущено строк: {result['rows_skipped']}",
+                        f"Время: {result['seconds']} сек",
+                    ]
+                )
+            )
+
+
+if __name__ == "__main__":
+    main()
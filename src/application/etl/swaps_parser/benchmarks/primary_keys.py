@@ -0,0 +1,85 @@
+"""
+Бенчмарк первичных ключей: вставка rows_count строк в таблицу с uuid PRIMARY KEY для uuid1 (прежний ID),
+uuid4 и uuid7. Строки вставляются COPY пачками, для каждого генератора выводятся скорость вставки
+в начале и в конце заполнения и размер индекса первичного ключа. Требует БД, таблицы удаляются после замера.
+
+Запуск: python -m src.application.etl.swaps_parser.benchmarks.primary_keys
+"""
+
+import asyncio
+import time
+import uuid
+
+from tortoise import Tortoise
+
+from src.infra.db.setup_tortoise import init_db_async
+from src.infra.db.uuid7 import uuid7_batch
+
+GENERATORS = {
+    "uuid1": lambda count: [uuid.uuid1() for _ in range(count)],
+    "uuid4": lambda count: [uuid.uuid4() for _ in range(count)],
+    "uuid7": uuid7_batch,
+}
+CREATE_TABLE = "CREATE TABLE {table_name} (id uuid PRIMARY KEY, payload bigint NOT NULL)"
+DROP_TABLE = "DROP TABLE IF EXISTS {table_name}"
+GET_INDEX_SIZE = (
+    "SELECT pg_relation_size('{table_name}_pkey') AS index_size, pg_relation_size('{table_name}') AS table_size"
+)
+
+
+async def fill_table(conn, table_name, generate_ids, rows_count, batch_size):
+    """Секунды на пачку для каждой пачки (генерация ID не входит в замер)"""
+    batches_seconds = []
+    for offset in range(0, rows_count, batch_size):
+        count = min(batch_size, rows_count - offset)
+        records = list(zip(generate_ids(count), range(offset, offset + count)))
+        started = time.perf_counter()
+        await conn.copy_records_to_table(table_name, records=records, columns=("id", "payload"))
+        batches_seconds.append(time.perf_counter() - started)
+    return batches_seconds
+
+
+def rows_per_second(batches_seconds, batch_size):
+    return round(batch_size * len(batches_seconds) / max(sum(batches_seconds), 1e-9))
+
+
+async def main(
+    rows_count=10_000_000,
+    batch_size=100_000,
+    generators=tuple(GENERATORS),
+):
+    await init_db_async()
+    try:
+        async with Tortoise.get_connection("default").acquire_connection() as conn:
+            for name in generators:
+                table_name = f"pk_benchmark_{name}"
+                await conn.execute(DROP_TABLE.format(table_name=table_name))
+                await conn.execute(CREATE_TABLE.format(table_name=table_name))
+                try:
+                    started = time.perf_counter()
+                    batches_seconds = await fill_table(conn, table_name, GENERATORS[name], rows_count, batch_size)
+                    total_seconds = time.perf_counter() - started
+                    sizes = await conn.fetchrow(GET_INDEX_SIZE.format(table_name=table_name))
+                finally:
+                    await conn.execute(DROP_TABLE.format(table_name=table_name))
+                # Первые и последние 10% пачек - как меняется скорость с ростом индекса
+                tail = max(len(batches_seconds) // 10, 1)
+                print(
+                    " | ".join(
+                        [
+                            f"ID: {name}",
+                            f"Строк: {rows_count}",
+                            f"Всего: {round(total_seconds, 1)} сек",
+                            f"Строк/сек в начале: {rows_per_second(batches_seconds[:tail], batch_size)}",
+                            f"в конце: {rows_per_second(batches_seconds[-tail:], batch_size)}",
+                            f"Индекс PK: {round(sizes['index_size'] / 1024**2)} МБ",
+                            f"Таблица: {round(sizes['table_size'] / 1024**2)} МБ",
+                        ]
+                    )
+                )
+    finally:
+        await Tortoise.close_connections()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
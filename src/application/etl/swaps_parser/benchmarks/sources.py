@@ -0,0 +1,79 @@
+"""
+Бенчмарк источников свапов без сети и БД: сбор и создание объектов (без импорта) для синтетического источника
+и выгрузок NDJSON на диске. Выгрузки создаются из синтетического источника во временной папке, поэтому
+результаты обоих источников должны совпадать. Импорт в БД измеряет benchmarks/ingestion_modes.py.
+
+Запуск: python -m src.application.etl.swaps_parser.benchmarks.sources
+"""
+
+import asyncio
+import tempfile
+import time
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+
+from .. import utils
+from ..interval_planner import SOURCE_EZ_DEX_SWAPS, SOURCE_JUPITER
+from ..parser import build_objects, fetch_period, get_fetch_executor, shutdown_fetch_executor
+from ..swap_sources import FileSwapSource, SyntheticSwapSource, write_ndjson
+from .transform import generate_sol_prices, snapshot
+
+
+def dump_source(source, directory, start_time, end_time):
+    """Выгружает свапы источника по часам в NDJSON-файлы в формате FileSwapSource"""
+    for table in (SOURCE_EZ_DEX_SWAPS, SOURCE_JUPITER):
+        for start, end in utils.split_time_range_by_minutes(start_time, end_time, 60):
+            records, _ = source.get_page(start, end, is_jupiter=table == SOURCE_JUPITER, limit=10**9)
+            write_ndjson(Path(directory) / table / f"{start:%Y%m%d%H}.ndjson", records)
+
+
+async def run_source(source, start_time, end_time, sol_prices):
+    started = time.perf_counter()
+    swaps, swaps_jupiter = await fetch_period(get_fetch_executor(), start_time, end_time, source)
+    fetched = time.perf_counter()
+    extracted = build_objects(swaps, swaps_jupiter, sol_prices)
+    built = time.perf_counter()
+    return extracted, {
+        "swaps": len(swaps) + len(swaps_jupiter),
+        "fetch": round(fetched - started, 3),
+        "build": round(built - fetched, 3),
+    }
+
+
+async def main(
+    swaps_per_minute_values=(500, 2000, 5000),
+    minutes=60,
+):
+    start_time = datetime(2025, 2, 18, 10, 0, tzinfo=timezone.utc)
+    end_time = start_time + timedelta(minutes=minutes)
+    sol_prices = generate_sol_prices(start_time, minutes)
+    try:
+        for swaps_per_minute in swaps_per_minute_values:
+            synthetic = SyntheticSwapSource(swaps_per_minute=swaps_per_minute)
+            with tempfile.TemporaryDirectory() as directory:
+                dump_source(SyntheticSwapSource(swaps_per_minute=swaps_per_minute), directory, start_time, end_time)
+                files = FileSwapSource(directory)
+                results = {}
+                for name, source in (("synthetic", synthetic), ("file", files)):
+                    results[name] = await run_source(source, start_time, end_time, sol_prices)
+            if snapshot(results["synthetic"][0]) != snapshot(results["file"][0]):
+                raise AssertionError("Результаты синтетического источника и выгрузок отличаются!")
+            for name, (extracted, stats) in results.items():
+                print(
+                    " | ".join(
+                        [
+                            f"Источник: {name}",
+                            f"Свапов: {stats['swaps']}",
+                            f"Активностей: {len(extracted[2])}",
+                            f"Сбор: {stats['fetch']} сек",
+                            f"Создание объектов: {stats['build']} сек",
+                            f"Свапов/сек: {round(stats['swaps'] / max(stats['fetch'] + stats['build'], 1e-9))}",
+                        ]
+                    )
+                )
+    finally:
+        shutdown_fetch_executor()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,116 @@
+"""
+Бенчмарк стадии создания объектов: списки словарей (utils) против колоночной обработки (columnar).
+Перед замером проверяет, что оба пути дают одинаковый результат.
+
+Запуск: python -m src.application.etl.swaps_parser.benchmarks.transform
+"""
+
+import time
+from datetime import datetime, timedelta, timezone
+from decimal import Decimal
+
+from .. import columnar, utils
+from ..fake_flipside import EZ_DEX_SWAPS_TABLE, JUPITER_SWAPS_TABLE, generate_minute_swaps
+from ..parser import BLACKLISTED_TOKENS
+
+
+def generate_period(start_time, minutes, swaps_per_minute, jupiter_swaps_per_minute):
+    swaps = []
+    swaps_jupiter = []
+    for i in range(minutes):
+        minute = start_time + timedelta(minutes=i)
+        swaps.extend(generate_minute_swaps(minute, swaps_per_minute, table=EZ_DEX_SWAPS_TABLE))
+        swaps_jupiter.extend(generate_minute_swaps(minute, jupiter_swaps_per_minute, table=JUPITER_SWAPS_TABLE))
+    return swaps, swaps_jupiter
+
+
+def generate_sol_prices(start_time, minutes):
+    return {
+        start_time + timedelta(minutes=i): Decimal("180.5") + Decimal(i % 17) / Decimal(10)
+        for i in range(-1, minutes + 2)
+    }
+
+
+def build_objects_dicts(swaps, swaps_jupiter, sol_prices):
+    all_swaps = utils.combine_swaps(swaps, swaps_jupiter)
+    filtered_swaps = utils.filter_swaps(all_swaps, BLACKLISTED_TOKENS)
+    return utils.extract_and_build_objects(filtered_swaps, sol_prices)
+
+
+def build_objects_columnar(swaps, swaps_jupiter, sol_prices):
+    return columnar.build_objects(swaps, swaps_jupiter, sol_prices, BLACKLISTED_TOKENS)
+
+
+def combine_and_filter_dicts(swaps, swaps_jupiter, sol_prices):
+    return utils.filter_swaps(utils.combine_swaps(swaps, swaps_jupiter), BLACKLISTED_TOKENS)
+
+
+def combine_and_filter_columnar(swaps, swaps_jupiter, sol_prices):
+    return columnar.SwapBatch.combine(swaps, swaps_jupiter).filter(BLACKLISTED_TOKENS)
+
+
+def snapshot(extracted):
+    """Сравнимое представление результата (без случайных id)"""
+    wallets, tokens, activities = extracted
+    return (
+        [wallet.address for wallet in wallets],
+        [token.address for token in tokens],
+        [
+            (
+                activity.tx_hash,
+                activity.block_id,
+                activity.timestamp,
+                activity.event_type,
+                activity.quote_amount,
+                activity.token_amount,
+                activity.cost_usd,
+                activity.price_usd,
+                activity.is_part_of_transaction_with_mt_3_swappers,
+                activity.is_part_of_arbitrage_swap_event,
+                activity.wallet_address,
+                activity.token_address,
+            )
+            for activity in activities
+        ],
+    )
+
+
+def measure(build, swaps, swaps_jupiter, sol_prices):
+    # Путь на словарях изменяет записи, поэтому каждому пути - свои копии
+    swaps = [swap.copy() for swap in swaps]
+    swaps_jupiter = [swap.copy() for swap in swaps_jupiter]
+    started = time.perf_counter()
+    extracted = build(swaps, swaps_jupiter, sol_prices)
+    return extracted, round(time.perf_counter() - started, 3)
+
+
+def main(
+    swaps_per_minute_values=(500, 2000, 5000),
+    minutes=60,
+):
+    start_time = datetime(2025, 2, 18, 10, 0, tzinfo=timezone.utc)
+    sol_prices = generate_sol_prices(start_time, minutes)
+    for swaps_per_minute in swaps_per_minute_values:
+        swaps, swaps_jupiter = generate_period(start_time, minutes, swaps_per_minute, swaps_per_minute // 3)
+        extracted_dicts, seconds_dicts = measure(build_objects_dicts, swaps, swaps_jupiter, sol_prices)
+        extracted_columnar, seconds_columnar = measure(build_objects_columnar, swaps, swaps_jupiter, sol_prices)
+        if snapshot(extracted_dicts) != snapshot(extracted_columnar):
+            raise AssertionError("Результаты колоночной обработки и обработки словарей отличаются!")
+        # Отдельно - стадии обьединения и фильтрации, без создания Tortoise-обьектов
+        _, combine_seconds_dicts = measure(combine_and_filter_dicts, swaps, swaps_jupiter, sol_prices)
+        _, combine_seconds_columnar = measure(combine_and_filter_columnar, swaps, swaps_jupiter, sol_prices)
+        print(
+            " | ".join(
+                [
+                    f"Свапов: {len(swaps) + len(swaps_jupiter)}",
+                    f"Активностей: {len(extracted_dicts[2])}",
+                    f"Словари: {seconds_dicts} сек",
+                    f"Колонки: {seconds_columnar} сек",
+                    f"Обьединение+фильтр: {combine_seconds_dicts} / {combine_seconds_columnar} сек",
+                ]
+            )
+        )
+
+
+if __name__ == "__main__":
+    main()
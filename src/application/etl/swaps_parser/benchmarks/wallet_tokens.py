@@ -0,0 +1,98 @@
+"""
+Бенчмарк загрузки WalletToken: запрос на каждый токен (прежний цикл) против set-based запросов через unnest.
+Считает выполненные запросы по логгеру tortoise.db_client. Требует БД с данными WalletToken.
+
+Запуск: python -m src.application.etl.swaps_parser.benchmarks.wallet_tokens
+"""
+
+import asyncio
+import logging
+import random
+import time
+import uuid
+from collections import defaultdict
+
+from tortoise import Tortoise
+from tortoise.log import db_client_logger
+
+from src.infra.db.models.tortoise import WalletToken
+from src.infra.db.setup_tortoise import init_db_async
+
+from .. import db_utils
+
+
+class QueriesCounter(logging.Handler):
+    def __init__(self):
+        super().__init__(logging.DEBUG)
+        self.count = 0
+
+    def emit(self, record):
+        self.count += 1
+
+
+async def load_wallet_tokens_per_token(token_wallet_list, chunks_count: int = 5):
+    """Прежняя загрузка: запрос на каждый токен в chunks_count корутинах"""
+
+    async def _load(token_wallet_list_):
+        token_wallet_ids = defaultdict(list)
+        for item in token_wallet_list_:
+            token_wallet_ids[item["token_id"]].append(item["wallet_id"])
+        all_wt_stats = []
+        for token_id, wallet_ids in token_wallet_ids.items():
+            all_wt_stats.extend(await WalletToken.filter(token_id=token_id, wallet_id__in=wallet_ids).all())
+        return all_wt_stats
+
+    chunks = [token_wallet_list[i::chunks_count] for i in range(chunks_count)]
+    results = await asyncio.gather(*[_load(chunk) for chunk in chunks])
+    return [wt for result in results for wt in result]
+
+
+async def sample_token_wallet_list(pairs_count: int) -> list[dict]:
+    """Половина пар - существующие WalletToken, половина - несуществующие кошельки для тех же токенов"""
+    existing = await WalletToken.all().limit(pairs_count // 2).values_list("wallet_id", "token_id")
+    token_ids = [token_id for _, token_id in existing]
+    missing = [(uuid.uuid4(), random.choice(token_ids)) for _ in range(pairs_count - len(existing))]
+    return [{"wallet_id": wallet_id, "token_id": token_id} for wallet_id, token_id in existing + missing]
+
+
+async def measure(load, token_wallet_list, counter):
+    counter.count = 0
+    started = time.perf_counter()
+    wallet_tokens = await load(token_wallet_list)
+    return len(wallet_tokens), counter.count, round(time.perf_counter() - started, 3)
+
+
+async def main(pairs_count_values=(1000, 10000, 100000)):
+    await init_db_async()
+    counter = QueriesCounter()
+    db_client_logger.setLevel(logging.DEBUG)
+    db_client_logger.propagate = False
+    db_client_logger.addHandler(counter)
+    try:
+        for pairs_count in pairs_count_values:
+            token_wallet_list = await sample_token_wallet_list(pairs_count)
+            tokens_count = len({item["token_id"] for item in token_wallet_list})
+            for name, load in (
+                ("по токенам", load_wallet_tokens_per_token),
+                ("unnest", db_utils.load_wallet_tokens),
+            ):
+                found, queries_count, seconds = await measure(load, token_wallet_list, counter)
+                print(
+                    " | ".join(
+                        [
+                            f"Пар: {len(token_wallet_list)}",
+                            f"Токенов: {tokens_count}",
+                            f"Загрузка: {name}",
+                            f"Найдено: {found}",
+                            f"Запросов: {queries_count}",
+                            f"Время: {seconds} сек",
+                        ]
+                    )
+                )
+    finally:
+        db_client_logger.removeHandler(counter)
+        await Tortoise.close_connections()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
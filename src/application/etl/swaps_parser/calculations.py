@@ -79,46 +79,44 @@ def recalculate_wallet_token_stats(wallets_dict):
     logger.info(f"Новых токен-статс {new_count}")
 
 
+def calculate_wallet_token_deltas(wallets_dict) -> list[WalletToken]:
+    """Статистики только по активностям периода - для слияния с существующими записями на стороне БД"""
+    deltas = []
+    for wallet_data in wallets_dict.values():
+        wallet = wallet_data["wallet"]
+        for token_data in wallet_data["tokens"].values():
+            token_data["stats"] = WalletToken(
+                token_id=token_data["token"].id,
+                wallet_id=wallet.id,
+            )
+            calculate_token_stats(token_data)
+            deltas.append(token_data["stats"])
+    return deltas
+
+
 def calculate_wallet_first_last_activity_timestamps(
     wallets: list,
     mapped_data: dict,
 ):
+    """
+    Время первой и последней активности кошельков по свапам периода.
+    Со значениями в БД они сводятся уже в запросе (db_utils.update_wallets)
+    """
     for wallet in wallets:
         wallet_data = mapped_data[wallet.id]
         # Собираем все активности для кошелька
         all_activities = [
             activity for token_data in wallet_data["tokens"].values() for activity in token_data["activities"]
         ]
-        last_activity_timestamp = (
-            datetime.fromtimestamp(
-                max(
-                    all_activities,
-                    key=lambda x: x.timestamp,
-                ).timestamp,
-                tz=timezone.utc,
-            )
-            if all_activities
-            else None
+        if not all_activities:
+            wallet.first_activity_timestamp = None
+            wallet.last_activity_timestamp = None
+            continue
+        wallet.last_activity_timestamp = datetime.fromtimestamp(
+            max(all_activities, key=lambda x: x.timestamp).timestamp,
+            tz=timezone.utc,
         )
-        last_activity_timestamp_in_db = wallet.last_activity_timestamp
-        if last_activity_timestamp and (
-            last_activity_timestamp_in_db is None or last_activity_timestamp > last_activity_timestamp_in_db
-        ):
-            wallet.last_activity_timestamp = last_activity_timestamp
-
-        first_activity_timestamp = (
-            datetime.fromtimestamp(
-                max(
-                    all_activities,
-                    key=lambda x: x.timestamp,
-                ).timestamp,
-                tz=timezone.utc,
-            )
-            if all_activities
-            else None
+        wallet.first_activity_timestamp = datetime.fromtimestamp(
+            min(all_activities, key=lambda x: x.timestamp).timestamp,
+            tz=timezone.utc,
         )
-        first_activity_timestamp_in_db = wallet.first_activity_timestamp
-        if first_activity_timestamp and (
-            first_activity_timestamp_in_db is None or first_activity_timestamp > first_activity_timestamp_in_db
-        ):
-            wallet.first_activity_timestamp = first_activity_timestamp
@@ -0,0 +1,402 @@
+import zlib
+from datetime import datetime, timedelta, timezone
+from decimal import Decimal
+from operator import itemgetter
+from typing import List, Sequence, Tuple
+
+import numpy as np
+
+from src.infra.db.models.tortoise import Swap, Token, Wallet
+from src.infra.db.uuid7 import uuid7_batch
+
+from .config import ROUTER_ADDRESSES, SOL_ADDRESS
+from .logger import logger
+
+EPOCH = datetime(1970, 1, 1, tzinfo=timezone.utc)
+RECORD_FIELDS = (
+    "tx_id",
+    "swapper",
+    "swap_from_mint",
+    "swap_to_mint",
+    "swap_from_amount",
+    "swap_to_amount",
+    "block_id",
+    "block_timestamp",
+)
+MINUTE_US = 60_000_000
+
+
+class StringDictionary:
+    """Словарь интернированных строк (адресов, хэшей транзакций): строка <-> int-код"""
+
+    def __init__(self):
+        self.codes: dict = {}
+        self._values = None
+
+    def __len__(self):
+        return len(self.codes)
+
+    def encode(self, values: Sequence) -> np.ndarray:
+        codes = self.codes
+        self._values = None
+        # Новые коды выдаются только уникальным значениям, сама кодировка идет через map без цикла на Python
+        for value in dict.fromkeys(values):
+            if value not in codes:
+                codes[value] = len(codes)
+        return np.fromiter(map(codes.__getitem__, values), dtype=np.int64, count=len(values))
+
+    def code(self, value) -> int:
+        """Код строки или -1, если строка не встречалась"""
+        return self.codes.get(value, -1)
+
+    def falsy_codes(self) -> list[int]:
+        return [code for value, code in self.codes.items() if not value]
+
+    @property
+    def values(self) -> np.ndarray:
+        if self._values is None or len(self._values) != len(self.codes):
+            self._values = np.array(list(self.codes), dtype=object)
+        return self._values
+
+    def decode(self, codes: np.ndarray) -> list:
+        return self.values[codes].tolist()
+
+
+def wallet_part(address: str | None, parts_count: int) -> int:
+    """Номер части периода для кошелька: стабильный хэш адреса (hash() строк меняется между запусками)"""
+    return zlib.crc32(address.encode()) % parts_count if address else 0
+
+
+def object_array(values: Sequence) -> np.ndarray:
+    array = np.empty(len(values), dtype=object)
+    array[:] = values
+    return array
+
+
+def parse_timestamps_us(iso_strings: Sequence[str]) -> np.ndarray:
+    """ISO-строки BLOCK_TIMESTAMP -> int64 микросекунды от эпохи (UTC)"""
+    try:
+        stripped = [value[:-1] if value.endswith("Z") else value for value in iso_strings]
+        return np.array(stripped, dtype="datetime64[us]").astype(np.int64)
+    except (ValueError, TypeError):
+        # Нестандартный формат (например, смещение вместо Z) - разбираем построчно
+        return np.fromiter(
+            (
+                (datetime.fromisoformat(value.replace("Z", "+00:00")) - EPOCH) // timedelta(microseconds=1)
+                for value in iso_strings
+            ),
+            dtype=np.int64,
+            count=len(iso_strings),
+        )
+
+
+def group_order(keys: np.ndarray) -> np.ndarray:
+    """Перестановка, группирующая строки по ключу в порядке первого появления ключа (стабильно внутри группы)"""
+    if not len(keys):
+        return np.arange(0)
+    _, first_index, inverse = np.unique(keys, return_index=True, return_inverse=True)
+    rank = np.empty(len(first_index), dtype=np.int64)
+    rank[np.argsort(first_index)] = np.arange(len(first_index))
+    return np.argsort(rank[inverse], kind="stable")
+
+
+def first_appearance(codes: np.ndarray) -> np.ndarray:
+    """Уникальные коды в порядке первого появления"""
+    if not len(codes):
+        return codes
+    unique, first_index = np.unique(codes, return_index=True)
+    return unique[np.argsort(first_index)]
+
+
+class SwapBatch:
+    """
+    Колоночное представление пачки свапов: NumPy-массивы + интернированные словари адресов и транзакций.
+    Повторяет combine_swaps / populate_swaps_data / filter_swaps / extract_and_build_objects из utils,
+    но выполняет их векторно над массивами вместо циклов по словарям.
+    """
+
+    columns = (
+        "tx",
+        "swapper",
+        "from_mint",
+        "to_mint",
+        "from_amount",
+        "to_amount",
+        "block_id",
+        "timestamp_us",
+        "is_mt_3_swappers",
+        "is_arbitrage",
+    )
+
+    def __init__(self, addresses: StringDictionary, txs: StringDictionary, **columns):
+        self.addresses = addresses
+        self.txs = txs
+        for name in self.columns:
+            setattr(self, name, columns[name])
+
+    def __len__(self):
+        return len(self.tx)
+
+    @classmethod
+    def from_records(
+        cls,
+        records: list[dict],
+        addresses: StringDictionary | None = None,
+        txs: StringDictionary | None = None,
+    ) -> "SwapBatch":
+        addresses = addresses if addresses is not None else StringDictionary()
+        txs = txs if txs is not None else StringDictionary()
+        count = len(records)
+        columns = [list(map(itemgetter(field), records)) for field in RECORD_FIELDS]
+        tx_ids, swappers, from_mints, to_mints, from_amounts, to_amounts, block_ids, block_timestamps = columns
+        return cls(
+            addresses,
+            txs,
+            tx=txs.encode(tx_ids),
+            swapper=addresses.encode(swappers),
+            from_mint=addresses.encode(from_mints),
+            to_mint=addresses.encode(to_mints),
+            from_amount=object_array(from_amounts),
+            to_amount=object_array(to_amounts),
+            block_id=object_array(block_ids),
+            timestamp_us=parse_timestamps_us(block_timestamps),
+            is_mt_3_swappers=np.zeros(count, dtype=bool),
+            is_arbitrage=np.zeros(count, dtype=bool),
+        )
+
+    def take(self, indices: np.ndarray) -> "SwapBatch":
+        return SwapBatch(
+            self.addresses,
+            self.txs,
+            **{name: getattr(self, name)[indices] for name in self.columns},
+        )
+
+    @classmethod
+    def concat(cls, batches: list["SwapBatch"]) -> "SwapBatch":
+        first = batches[0]
+        return cls(
+            first.addresses,
+            first.txs,
+            **{name: np.concatenate([getattr(batch, name) for batch in batches]) for name in cls.columns},
+        )
+
+    @classmethod
+    def combine(cls, swaps: list[dict], swaps_jupiter: list[dict]) -> "SwapBatch":
+        """Обьединяет свапы с двух источников (аналог utils.combine_swaps)"""
+        addresses = StringDictionary()
+        txs = StringDictionary()
+        batch_all = cls.from_records(swaps, addresses, txs)
+        batch_jupiter = cls.from_records(swaps_jupiter, addresses, txs)
+
+        # Jupiter-свапы без swapper не учитываем, чтобы учитывался свап из другой таблицы
+        batch_jupiter = batch_jupiter.take(batch_jupiter.swapper != addresses.code(None))
+        batch_all = batch_all.take(~np.isin(batch_all.tx, batch_jupiter.tx))
+        batch_all = batch_all.take(group_order(batch_all.tx))
+        batch_jupiter = batch_jupiter.take(group_order(batch_jupiter.tx))
+
+        combined = cls.concat([batch_all, batch_jupiter])
+        combined.populate()
+
+        logger.debug(
+            f"\nСвапов - Всего: {len(swaps)} | Юпитер: {len(swaps_jupiter)}"
+            f"\nТранзакций - Всего: {len(np.unique(combined.tx))} | Без юпитера: {len(np.unique(batch_all.tx))} | Юпитер: {len(np.unique(batch_jupiter.tx))}"
+            f"\nСвапов суммарно: {len(combined)}"
+        )
+        return combined
+
+    def populate(self, router_addresses: Sequence[str] = ROUTER_ADDRESSES) -> None:
+        """Дополняет свапы данными уровня транзакции (аналог utils.populate_swaps_data)"""
+        if not len(self):
+            return
+        router_codes = [code for code in map(self.addresses.code, router_addresses) if code != -1]
+        swapper, is_mt_3_swappers, is_arbitrage = annotate_transactions(
+            self.tx,
+            self.swapper,
+            self.from_mint,
+            self.to_mint,
+            sol=self.addresses.code(SOL_ADDRESS),
+            router_codes=router_codes,
+            groups_count=len(self.txs),
+        )
+        self.swapper = swapper
+        self.is_mt_3_swappers |= is_mt_3_swappers
+        self.is_arbitrage |= is_arbitrage
+
+    def filter(self, blacklisted_tokens: List[str] | None = None) -> "SwapBatch":
+        """Отфильтровывает неподходящие активности (аналог utils.filter_swaps)"""
+        sol = self.addresses.code(SOL_ADDRESS)
+        is_blacklisted = np.zeros(len(self.addresses) + 1, dtype=bool)
+        for address in blacklisted_tokens or []:
+            code = self.addresses.code(address)
+            if code != -1:
+                is_blacklisted[code] = True
+        from_sol = self.from_mint == sol
+        to_sol = self.to_mint == sol
+        token_blacklisted = np.where(from_sol, is_blacklisted[self.to_mint], is_blacklisted[self.from_mint])
+        return self.take((from_sol | to_sol) & ~token_blacklisted)
+
+    def split_by_wallet(self, parts_count: int) -> list["SwapBatch"]:
+        """Делит свапы на parts_count частей по хэшу адреса кошелька (аналог utils.split_swaps_by_wallet)"""
+        if parts_count <= 1:
+            return [self]
+        address_parts = np.fromiter(
+            (wallet_part(address, parts_count) for address in self.addresses.values),
+            dtype=np.int64,
+            count=len(self.addresses),
+        )
+        swap_parts = address_parts[self.swapper]
+        return [self.take(swap_parts == part) for part in range(parts_count)]
+
+    def build_objects(self, sol_prices: dict) -> Tuple[List[Wallet], List[Token], List[Swap]]:
+        """Создание обьектов кошельков, токенов и активностей (аналог utils.extract_and_build_objects)"""
+        valid = ~np.isin(self.swapper, self.addresses.falsy_codes()) & ~np.isin(self.tx, self.txs.falsy_codes())
+        batch = self.take(valid)
+
+        is_buy = batch.from_mint == batch.addresses.code(SOL_ADDRESS)
+        token = np.where(is_buy, batch.to_mint, batch.from_mint)
+        quote_amounts = np.where(is_buy, batch.from_amount, batch.to_amount)
+        token_amounts = np.where(is_buy, batch.to_amount, batch.from_amount)
+        event_types = np.where(is_buy, "buy", "sell").tolist()
+
+        swap_prices = lookup_minute_prices(sol_prices, batch.timestamp_us - batch.timestamp_us % MINUTE_US)
+        timestamps = (batch.timestamp_us / 1_000_000).tolist()
+        wallet_addresses = batch.addresses.decode(batch.swapper)
+        token_addresses = batch.addresses.decode(token)
+        tx_hashes = batch.txs.decode(batch.tx)
+        block_ids = batch.block_id.tolist()
+        mt_3_flags = batch.is_mt_3_swappers.tolist()
+        arbitrage_flags = batch.is_arbitrage.tolist()
+
+        activities = []
+        ids = uuid7_batch(len(event_types))
+        for i, (quote_amount, token_amount, sol_price) in enumerate(zip(quote_amounts, token_amounts, swap_prices)):
+            quote_amount = Decimal(str(quote_amount))
+            token_amount = Decimal(str(token_amount))
+            cost_usd = Decimal(str(quote_amount * sol_price))
+            price_usd = Decimal(str(cost_usd / token_amount)) if token_amount else None
+            activity = Swap(
+                id=ids[i],
+                tx_hash=tx_hashes[i],
+                block_id=block_ids[i],
+                timestamp=timestamps[i],
+                event_type=event_types[i],
+                quote_amount=quote_amount,
+                token_amount=token_amount,
+                cost_usd=cost_usd,
+                price_usd=price_usd,
+                is_part_of_transaction_with_mt_3_swappers=mt_3_flags[i],
+                is_part_of_arbitrage_swap_event=arbitrage_flags[i],
+            )
+            activity.wallet_address = wallet_addresses[i]
+            activity.token_address = token_addresses[i]
+            activities.append(activity)
+
+        wallets = [Wallet(address=address) for address in batch.addresses.decode(first_appearance(batch.swapper))]
+        tokens = [Token(address=address) for address in batch.addresses.decode(first_appearance(token))]
+        return wallets, tokens, activities
+
+
+def annotate_transactions(
+    tx: np.ndarray,
+    swapper: np.ndarray,
+    from_mint: np.ndarray,
+    to_mint: np.ndarray,
+    sol: int,
+    router_codes: Sequence[int],
+    groups_count: int,
+) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Признаки уровня транзакции по колонкам кодов, tx - коды транзакций из [0, groups_count).
+    Строки не обязаны быть сгруппированы: кол-во свапов и трейдеров транзакций считается через bincount
+    по парам (транзакция, адрес). Возвращает трейдеров (с учетом роутеров), флаги >= 3 трейдеров и арбитража
+    """
+    base = int(max(swapper.max(), from_mint.max(), to_mint.max())) + 1
+    swaps_count = np.bincount(tx, minlength=groups_count)
+    tx_swappers = np.unique(tx * base + swapper)
+    swappers_count = np.bincount(tx_swappers // base, minlength=groups_count)
+
+    token = np.where(to_mint == sol, from_mint, to_mint)
+    is_buy = to_mint == token
+
+    # Один трейдер и в транзакции есть и покупка, и продажа одного токена - арбитраж
+    buy_keys = np.unique(tx[is_buy] * base + token[is_buy])
+    sell_keys = np.unique(tx[~is_buy] * base + token[~is_buy])
+    has_buy_and_sell = np.zeros(groups_count, dtype=bool)
+    has_buy_and_sell[np.intersect1d(buy_keys, sell_keys) // base] = True
+    arbitrage_groups = (swaps_count >= 2) & (swappers_count == 1) & has_buy_and_sell
+
+    # Два трейдера, ровно один из которых роутер - все свапы принадлежат второму трейдеру
+    swapper = swapper.copy()
+    if len(router_codes):
+        is_router = np.isin(swapper, router_codes)
+        routers_count = np.bincount(
+            tx_swappers[np.isin(tx_swappers % base, router_codes)] // base,
+            minlength=groups_count,
+        )
+        router_groups = (swaps_count >= 2) & (swappers_count == 2) & (routers_count == 1)
+        real_swapper = np.full(groups_count, -1, dtype=np.int64)
+        real_rows = ~is_router & router_groups[tx]
+        real_swapper[tx[real_rows]] = swapper[real_rows]
+        rows = router_groups[tx]
+        swapper[rows] = real_swapper[tx[rows]]
+
+    mt_3_groups = (swaps_count >= 2) & (swappers_count >= 3)
+    return swapper, mt_3_groups[tx], arbitrage_groups[tx]
+
+
+def annotate_swaps(swaps: list[dict], router_addresses: Sequence[str] = ROUTER_ADDRESSES) -> None:
+    """
+    Пакетный аналог utils.populate_swaps_data для списка записей: транзакции и адреса кодируются один раз,
+    признаки считаются annotate_transactions, в записи дописываются только изменения
+    """
+    if not swaps:
+        return
+    addresses = StringDictionary()
+    tx = StringDictionary().encode(list(map(itemgetter("tx_id"), swaps)))
+    swapper = addresses.encode(list(map(itemgetter("swapper"), swaps)))
+    from_mint = addresses.encode(list(map(itemgetter("swap_from_mint"), swaps)))
+    to_mint = addresses.encode(list(map(itemgetter("swap_to_mint"), swaps)))
+    router_codes = [code for code in map(addresses.code, router_addresses) if code != -1]
+    new_swapper, is_mt_3_swappers, is_arbitrage = annotate_transactions(
+        tx,
+        swapper,
+        from_mint,
+        to_mint,
+        sol=addresses.code(SOL_ADDRESS),
+        router_codes=router_codes,
+        groups_count=int(tx.max()) + 1,
+    )
+    for i in np.flatnonzero(new_swapper != swapper).tolist():
+        swaps[i]["swapper"] = addresses.values[new_swapper[i]]
+    for i in np.flatnonzero(is_mt_3_swappers).tolist():
+        swaps[i]["is_part_of_transaction_with_mt_3_swappers"] = True
+    for i in np.flatnonzero(is_arbitrage).tolist():
+        swaps[i]["is_part_of_arbitrage_swap_event"] = True
+
+
+def lookup_minute_prices(prices: dict, minutes_us: np.ndarray) -> np.ndarray:
+    """Цены по минутам через индексацию массива вместо поиска в словаре для каждой строки"""
+    keys = np.array(
+        [(minute - EPOCH) // timedelta(microseconds=1) for minute in prices],
+        dtype=np.int64,
+    )
+    values = object_array(list(prices.values()))
+    order = np.argsort(keys)
+    keys, values = keys[order], values[order]
+    positions = np.minimum(np.searchsorted(keys, minutes_us), max(len(keys) - 1, 0))
+    found = keys[positions] == minutes_us if len(keys) else np.zeros(len(minutes_us), dtype=bool)
+    if not found.all():
+        missing = minutes_us[~found][0]
+        raise KeyError(EPOCH + timedelta(microseconds=int(missing)))
+    return values[positions]
+
+
+def build_objects(
+    swaps: list[dict],
+    swaps_jupiter: list[dict],
+    sol_prices: dict,
+    blacklisted_tokens: List[str] | None = None,
+) -> Tuple[List[Wallet], List[Token], List[Swap]]:
+    """Колоночный аналог combine_swaps -> filter_swaps -> extract_and_build_objects"""
+    batch = SwapBatch.combine(swaps, swaps_jupiter)
+    return batch.filter(blacklisted_tokens).build_objects(sol_prices)
@@ -1 +1,120 @@
+import os
+import tempfile
+
 SOL_ADDRESS = "So11111111111111111111111111111111111111112"
+
+FLIPSIDE_API_URL = "https://api-v2.flipsidecrypto.xyz"
+FLIPSIDE_PAGE_LIMIT = 100000  # Максимальное кол-во записей в одной странице запроса
+
+# Режимы пагинации запросов к Flipside
+PAGINATION_OFFSET = "offset"  # LIMIT/OFFSET - каждая следующая страница дороже предыдущей
+PAGINATION_KEYSET = "keyset"  # Продолжение с последнего полученного ID - стоимость страницы постоянна
+
+# Потоковый режим: период делится на части, которые проходят через ограниченные очереди
+STREAMING_CHUNKS_COUNT = 4  # Частей в периоде (по одному интервалу Jupiter на часть)
+STREAMING_INTERVALS_PER_CHUNK = 3  # Интервалов ez_dex_swaps в части
+STREAMING_QUEUE_SIZE = 1  # Макс. кол-во готовых частей, ожидающих следующую стадию
+
+OKX_ROUTER_ADDRESS = "HV1KXxWFaSeriyFvXyx48FqG9BoFbfinB8njCJonqP7K"
+# Роутеры агрегаторов: если в транзакции два трейдера и один из них роутер, все свапы принадлежат второму
+ROUTER_ADDRESSES = (OKX_ROUTER_ADDRESS,)
+
+# Колоночная (NumPy) обработка свапов вместо обработки списков словарей. Выключена по умолчанию,
+# пока на реальных периодах не сверено совпадение ее результата с обработкой словарей
+COLUMNAR_TRANSFORM = False
+
+# Режимы импорта активностей и WalletToken-статистик в БД (бывший swaps_parser(fast_unsafe) - режим parallel)
+INGESTION_TRANSACTIONAL = "transactional"  # Многострочные INSERT (bulk_create) в одной транзакции с отметкой
+INGESTION_PARALLEL = "parallel"  # Части параллельно на разных соединениях без общей транзакции - не атомарно
+INGESTION_COPY = "copy"  # Бинарный COPY кортежей (upsert - через staging-таблицу) в одной транзакции
+INGESTION_MODE = INGESTION_TRANSACTIONAL
+INGESTION_PARALLEL_CHUNKS = 5  # Частей на таблицу в режиме parallel
+
+# Размеры LRU-кэшей адрес -> id (записей на процесс)
+WALLETS_CACHE_SIZE = 500_000
+TOKENS_CACHE_SIZE = 100_000
+
+WALLET_TOKENS_LOAD_CHUNK_SIZE = 50_000  # Пар (wallet_id, token_id) на один запрос загрузки WalletToken
+
+# Способы пересчета WalletToken-статистик
+WALLET_TOKEN_AGGREGATION_PYTHON = "python"  # Загрузка записей, пересчет в Python и upsert всех колонок
+WALLET_TOKEN_AGGREGATION_DB = "db"  # Дельты по активностям периода сливаются с записями на стороне БД
+WALLET_TOKEN_AGGREGATION = WALLET_TOKEN_AGGREGATION_PYTHON
+
+# Локальный кэш страниц Flipside: повторная обработка периода (ретраи, реимпорт, бенчмарки) без сети.
+# По умолчанию выключен: страницы - сырые данные Flipside, на диске они копятся до PAGE_CACHE_MAX_BYTES
+PAGE_CACHE_ENABLED = False
+# Абсолютный путь - кэш не зависит от рабочей директории, из которой запущен парсер
+PAGE_CACHE_DIR = os.path.join(tempfile.gettempdir(), "flipside_page_cache")
+PAGE_CACHE_MAX_BYTES = 2 * 1024**3  # При превышении удаляются давно не читанные страницы
+
+# Сколько следующих часовых периодов собирать из Flipside, пока текущий импортируется (0 - без конвейера).
+# Выключено по умолчанию: каждый собираемый заранее период держит в памяти свои свапы и расходует ключи Flipside
+PREFETCH_DEPTH = 0
+
+FETCH_WORKERS = 16  # Потоков сбора данных из Flipside - ограничение одновременных запросов
+
+# Адаптивная разбивка периода на интервалы запросов по наблюдаемому объему свапов
+# Скользящее среднее свапов в минуту по источникам. Абсолютный путь, как у PAGE_CACHE_DIR - общий для run.py,
+# backfill.py и бенчмарков независимо от рабочей директории
+INTERVALS_STATS_FILE = os.path.join(tempfile.gettempdir(), "flipside_volume_stats.json")
+INTERVAL_TARGET_ROWS = 50_000  # Желаемое кол-во записей на запрос
+INTERVALS_MIN_COUNT = 1
+INTERVALS_MAX_COUNT = 60
+# Интервал, не уместившийся в столько страниц, делится на части и собирается заново (уже полученные страницы
+# запрашиваются повторно). 0 - не делится, а дочитывается страницами
+INTERVAL_MAX_PAGES = 0
+INTERVAL_MIN_SECONDS = 60  # Интервалы короче не делятся, а дочитываются страницами
+
+# Пул учеток Flipside: запросы интервалов распределяются по всем активным ключам
+ACCOUNT_MAX_CONCURRENCY = 4  # Одновременных запросов на один ключ
+ACCOUNT_MIN_QUERY_INTERVAL_SECONDS = 0.5  # Минимальный интервал между запусками запросов на одном ключе
+ACCOUNT_COOLDOWN_SECONDS = 60  # Пауза для ключа после ошибки
+ACCOUNT_MAX_FAILURES = 3  # Ошибок подряд, после которых ключ отключается в БД
+
+# Перед импортом отбрасываются свапы, уже сохраненные в БД (по ключу tx_hash, кошелек, токен, тип, номер),
+# чтобы повторный импорт периода не учитывал их в WalletToken-статистиках второй раз. Выключена по умолчанию:
+# период с отметкой импортируется в одной транзакции и повторно не приходит. Проверка включается всегда для периода,
+# разбитого на части (бюджет памяти), и для периода, за время которого в БД уже есть свапы (бэкфилл)
+SWAP_DEDUP_CHECK = False
+SWAP_DEDUP_CHECK_CHUNK_SIZE = 50_000  # Ключей на один запрос проверки
+
+# Колонка времени, по которой свапы выбираются из Flipside
+TIME_COLUMN_BLOCK = "BLOCK_TIMESTAMP"  # Основной режим: часовые периоды по времени блока с отставанием в сутки
+TIME_COLUMN_INSERTED = "INSERTED_TIMESTAMP"  # Режим близкий к реальному времени: окна по времени вставки в Flipside
+
+# Режим близкий к реальному времени (process_realtime)
+REALTIME_LAG_MINUTES = 5  # Окно собирается не раньше, чем через столько минут после его конца
+REALTIME_WINDOW_MINUTES = 5
+REALTIME_OVERLAP_MINUTES = 2  # Окно перечитывает конец предыдущего - строки, вставленные в Flipside с опозданием
+REALTIME_POLL_SECONDS = 60
+# Транзакция, найденная только в одной из таблиц (ez_dex/Jupiter), с блоком не старше стольких минут до конца окна
+# откладывается до следующего окна: вторая таблица может получить ее строки позже. Не больше REALTIME_OVERLAP_MINUTES -
+# следующее окно перечитывает отложенные строки за счет перекрытия
+REALTIME_TX_HOLD_MINUTES = REALTIME_OVERLAP_MINUTES
+
+# Бэкфилл истории (backfill.py): сырые свапы диапазона -> UNLOGGED staging -> set-based INSERT ... SELECT
+BACKFILL_STAGING_TABLE = "swap_backfill_staging"
+BACKFILL_BATCH_MINUTES = 1440  # Диапазон staging, сливаемый в swap/wallet_token одной транзакцией
+BACKFILL_ADDRESSES_CHUNK_SIZE = 50_000  # Адресов кошельков/токенов на один импорт
+BACKFILL_REBUILD_INDEXES = True  # Снимать вторичные индексы swap/wallet_token на время слияния
+BACKFILL_VERIFY_TOLERANCE = "0.000000001"  # Допустимое расхождение сумм при сверке (USD/token-amount)
+
+# Откат свапов (rollback.py): удаление диапазона и пересчет WalletToken/кошельков set-based запросами
+ROLLBACK_BATCH_MINUTES = 10  # Диапазон свапов, откатываемый одной транзакцией
+
+# Секционирование swap по timestamp (partition_swaps.py). Секции создаются заранее: строки вне секций
+# попадают в DEFAULT, после чего секцию на их период создать нельзя
+SWAP_PARTITION_INTERVAL = "month"  # "month" | "week"
+SWAP_PARTITIONS_AHEAD = 2  # Будущих периодов, секции которых создаются заранее
+SWAP_PARTITION_RECHECK_SECONDS = 600  # Как часто парсер перепроверяет, не секционирована ли swap после migrate
+
+# Бюджет памяти импорта (memory.py): свапы периода делятся на части по хэшу адреса кошелька,
+# части создаются и импортируются по очереди отдельными транзакциями, swaps_parsed_untill сдвигает последняя.
+# Все свапы кошелька попадают в одну часть, поэтому WalletToken-статистики считаются так же, как без деления.
+# После падения посреди периода повтор пропускает уже импортированные части проверкой дублей (SWAP_DEDUP_CHECK)
+MEMORY_BUDGET_ROWS = 200_000  # Свапов в части, 0 - без ограничения
+MEMORY_BUDGET_MB = 0  # Предел RSS процесса, под который подбирается кол-во частей, 0 - без ограничения
+SWAP_MEMORY_ESTIMATE_KB = (
+    4  # Память на свап при создании объектов и импорте (~3 КБ без буферов импорта, benchmarks/memory_budget.py)
+)
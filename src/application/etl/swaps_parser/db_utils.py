@@ -1,16 +1,19 @@
 import asyncio
 import datetime
-from collections import defaultdict
-from itertools import chain
+import math
+import time
+from decimal import Decimal
 from typing import List
 
 import numpy as np
-from tortoise import Model
+from tortoise import Model, Tortoise
 from tortoise.transactions import in_transaction
 
+from src.infra.db import partitions, queries
 from src.infra.db.models.tortoise import (
     FlipsideCryptoAccount,
     FlipsideCryptoConfig,
+    Swap,
     Token,
     TokenPrice,
     Wallet,
@@ -26,8 +29,10 @@ from src.infra.db.repositories.tortoise import (
     TortoiseWalletStatisticAllRepository,
     TortoiseWalletTokenRepository,
 )
+from src.infra.db.utils import model_copy_records
 
 from . import utils
+from .address_cache import CachedWallet, tokens_cache, wallets_cache
 from .config import *
 
 
@@ -35,6 +40,10 @@ async def get_flipside_account():
     return await FlipsideCryptoAccount.filter(is_active=True).first()
 
 
+async def get_flipside_accounts():
+    return await FlipsideCryptoAccount.filter(is_active=True).all()
+
+
 async def get_flipside_config():
     return await FlipsideCryptoConfig.first()
 
@@ -51,6 +60,29 @@ async def update_flipside_config_swaps_parsed_untill(flipside_config, parsed_unt
     await flipside_config.save()
 
 
+async def update_flipside_config_realtime_parsed_untill(flipside_config, parsed_untill, last_block_timestamp=None):
+    flipside_config.swaps_realtime_parsed_untill_inserted_timestamp = parsed_untill
+    if last_block_timestamp and (
+        flipside_config.swaps_last_block_timestamp is None
+        or last_block_timestamp > flipside_config.swaps_last_block_timestamp
+    ):
+        flipside_config.swaps_last_block_timestamp = last_block_timestamp
+    await flipside_config.save()
+
+
+async def set_flipside_config_realtime_from(flipside_config, from_block_timestamp):
+    flipside_config.swaps_realtime_from_block_timestamp = from_block_timestamp
+    await flipside_config.save()
+
+
+async def get_swaps_freshness() -> datetime.timedelta | None:
+    """Отставание импортированных свапов от текущего времени - для мониторинга и алертов"""
+    flipside_config = await get_flipside_config()
+    if not flipside_config or not flipside_config.swaps_last_block_timestamp:
+        return None
+    return datetime.datetime.now(datetime.timezone.utc) - flipside_config.swaps_last_block_timestamp
+
+
 async def get_sol_prices(
     minute_from: datetime,
     minute_to: datetime,
@@ -67,109 +99,529 @@ async def get_sol_prices(
     return sol_prices
 
 
-async def import_wallets_data(wallets, chunks_count=10) -> list[Wallet]:
-    """Создаем кошельки и все их связи в несколько тасков"""
-    chunks = np.array_split(wallets, chunks_count)
-    results = await asyncio.gather(*[import_wallets_data_chunk(chunks[i].tolist()) for i in range(chunks_count)])
-    created_wallets = [wallet for result in results for wallet in result]
-    return created_wallets
+async def import_wallets_data(wallets) -> list[Wallet]:
+    """
+    Импортируем кошельки со всеми связями в одной транзакции.
+    Закэшированные кошельки в БД не отправляются, id остальных приходят из того же upsert-запроса
+    """
+    missing_wallets = []
+    for wallet in wallets:
+        cached: CachedWallet | None = wallets_cache.get(wallet.address)
+        if cached and cached.relations_exist:
+            wallet.id = cached.id
+        else:
+            missing_wallets.append(wallet)
+    if not missing_wallets:
+        return wallets
 
-
-async def import_wallets_data_chunk(
-    wallets,
-) -> list[Wallet]:
-    """Импортируем кошельки со всеми связями в одной транзакции"""
-    repository = TortoiseWalletRepository()
-    async with in_transaction() as conn:
-        await repository.bulk_create(objects=wallets, ignore_conflicts=True)
-        created_addresses = list({wallet.address for wallet in wallets})
-        created_wallets: list[Wallet] = await repository.get_list(filter_by={"address__in": created_addresses})
+    async with in_transaction():
+        wallets_rows = await TortoiseWalletRepository().bulk_upsert_returning(
+            missing_wallets,
+            unique_field="address",
+        )
+        for wallet in missing_wallets:
+            wallet.id = wallets_rows[wallet.address]["id"]
         (
             wallet_details,
             wallet_stats_7d,
             wallet_stats_30d,
             wallet_stats_all,
-        ) = utils.create_wallets_relations(created_wallets)
-        await asyncio.gather(
-            TortoiseWalletStatistic7dRepository().bulk_create(wallet_stats_7d),
-            TortoiseWalletStatistic30dRepository().bulk_create(wallet_stats_30d),
-            TortoiseWalletStatisticAllRepository().bulk_create(wallet_stats_all),
-            TortoiseWalletDetailRepository().bulk_create(wallet_details),
-        )
-        return created_wallets
+        ) = utils.create_wallets_relations(missing_wallets)
+        for repository, objects in (
+            (TortoiseWalletStatistic7dRepository(), wallet_stats_7d),
+            (TortoiseWalletStatistic30dRepository(), wallet_stats_30d),
+            (TortoiseWalletStatisticAllRepository(), wallet_stats_all),
+            (TortoiseWalletDetailRepository(), wallet_details),
+        ):
+            await repository.bulk_upsert_returning(objects, unique_field="wallet_id")
+    cache_wallets(missing_wallets)
+    return wallets
 
 
-async def import_tokens(tokens, chunks_count=5) -> list[Token]:
-    chunks = np.array_split(tokens, chunks_count)
-    results = await asyncio.gather(*[import_tokens_chunk(chunks[i].tolist()) for i in range(chunks_count)])
-    return [token for result in results for token in result]
+async def import_tokens(tokens) -> list[Token]:
+    missing_tokens = []
+    for token in tokens:
+        token_id = tokens_cache.get(token.address)
+        if token_id:
+            token.id = token_id
+        else:
+            missing_tokens.append(token)
+    if missing_tokens:
+        tokens_rows = await TortoiseTokenRepository().bulk_upsert_returning(missing_tokens, unique_field="address")
+        for token in missing_tokens:
+            token.id = tokens_rows[token.address]["id"]
+            tokens_cache.put(token.address, token.id)
+    return tokens
 
 
-async def import_tokens_chunk(
-    tokens,
-) -> list[Token]:
-    repository = TortoiseTokenRepository()
-    await repository.bulk_create(tokens)
-    return await repository.get_list(filter_by={"address__in": [token.address for token in tokens]})
+def cache_wallets(wallets: list[Wallet]) -> None:
+    """Запоминает сохраненные в БД кошельки (со связями) в кэше процесса"""
+    for wallet in wallets:
+        wallets_cache.put(wallet.address, CachedWallet(id=wallet.id, relations_exist=True))
 
 
 async def update_wallets(records: List[Model], chunks_count: int = 10) -> None:
-    chunks = np.array_split(records, chunks_count)
+    """Сводит время первой/последней активности кошельков периода со значениями в БД (UPDATE_WALLETS_ACTIVITY)"""
+    records = [record for record in records if record.last_activity_timestamp]
+    if not records:
+        return
+    chunks = np.array_split(records, min(chunks_count, len(records)))
     await asyncio.gather(
         *[
-            TortoiseWalletRepository().bulk_update(
-                objects=chunks[i].tolist(),
-                fields=[
-                    "first_activity_timestamp",
-                    "last_activity_timestamp",
+            Tortoise.get_connection("default").execute_query(
+                queries.UPDATE_WALLETS_ACTIVITY,
+                [
+                    [record.id for record in chunk],
+                    [record.first_activity_timestamp for record in chunk],
+                    [record.last_activity_timestamp for record in chunk],
                 ],
             )
-            for i in range(chunks_count)
+            for chunk in chunks
         ]
     )
 
 
+async def bulk_create_parallel(
+    repository,
+    records: List[Model],
+    chunks_count: int = INGESTION_PARALLEL_CHUNKS,
+    **kwargs,
+) -> None:
+    """Части записей вставляются одновременно, каждая на своем соединении пула - вне транзакции"""
+    chunks = [records[i::chunks_count] for i in range(chunks_count)]
+    await asyncio.gather(*[repository.bulk_create(chunk, **kwargs) for chunk in chunks if chunk])
+
+
 async def import_activities(
     activities: List[Model],
+    mode: str = INGESTION_MODE,
 ) -> None:
-    await TortoiseSwapRepository().bulk_create(activities)
-
-
-async def load_wallet_tokens(token_wallet_list, chunks_count: int = 5) -> list[Model]:
-    # Загружаем записи WalletToken параллельно
-    async def _load(token_wallet_list_):
-        token_wallet_ids = defaultdict(list)
-        for item in token_wallet_list_:
-            token_wallet_ids[item["token_id"]].append(item["wallet_id"])
-        all_wt_stats = []
-        for (
-            token_id,
-            wallet_ids,
-        ) in token_wallet_ids.items():
-            existing_wallet_token_stats = await WalletToken.filter(
-                token_id=token_id,
-                wallet_id__in=wallet_ids,
-            ).all()
-            if existing_wallet_token_stats:
-                all_wt_stats.extend(existing_wallet_token_stats)
-        return all_wt_stats
-
-    token_wallet_list_chunks = np.array_split(token_wallet_list, chunks_count)
-    results = await asyncio.gather(*[_load(token_wallet_list_chunks[i]) for i in range(chunks_count)])
-    return list(chain(*results))
+    repository = TortoiseSwapRepository()
+    if mode == INGESTION_COPY:
+        columns, records = model_copy_records(Swap, activities)
+        await repository.bulk_copy(records, columns)
+    elif mode == INGESTION_PARALLEL:
+        await bulk_create_parallel(repository, activities)
+    else:
+        await repository.bulk_create(activities)
+
+
+async def has_imported_swaps(activities: List[Model]) -> bool:
+    """Есть ли в БД свапы за диапазон времени активностей - тогда без проверки дублей вставка упадет на ключе"""
+    if not activities:
+        return False
+    timestamps = [activity.timestamp for activity in activities]
+    return await TortoiseSwapRepository().has_swaps(math.floor(min(timestamps)), math.ceil(max(timestamps)))
+
+
+async def filter_new_activities(
+    activities: List[Model],
+    wallets_map: dict,
+    tokens_map: dict,
+    chunk_size: int = SWAP_DEDUP_CHECK_CHUNK_SIZE,
+) -> List[Model]:
+    """Отбрасывает активности, которые уже сохранены в БД (повторный импорт после падения)"""
+    if not activities:
+        return activities
+    keys = [
+        (
+            activity.tx_hash,
+            wallets_map[activity.wallet_address].id,
+            tokens_map[activity.token_address].id,
+            activity.event_type,
+            activity.swap_index,
+        )
+        for activity in activities
+    ]
+    timestamps = [activity.timestamp for activity in activities]
+    existing_keys = await TortoiseSwapRepository().get_existing_keys(
+        keys,
+        math.floor(min(timestamps)),
+        math.ceil(max(timestamps)),
+        chunk_size,
+    )
+    if not existing_keys:
+        return activities
+    return [activity for activity, key in zip(activities, keys) if key not in existing_keys]
+
+
+async def log_wallet_changes(mapped_data: dict) -> None:
+    """Записывает кошельки периода с временем их самого раннего свапа в журнал изменений для пересчета статистик"""
+    if not mapped_data:
+        return
+    wallet_ids = list(mapped_data)
+    min_timestamps = [
+        math.floor(
+            min(
+                activity.timestamp
+                for token_data in mapped_data[wallet_id]["tokens"].values()
+                for activity in token_data["activities"]
+            )
+        )
+        for wallet_id in wallet_ids
+    ]
+    await Tortoise.get_connection("default").execute_query(
+        queries.UPSERT_WALLET_CHANGE_LOG,
+        [wallet_ids, min_timestamps],
+    )
+
+
+async def get_imported_tx_hashes(
+    tx_hashes: list[str],
+    timestamp_from: int,
+    timestamp_to: int,
+    chunk_size: int = SWAP_DEDUP_CHECK_CHUNK_SIZE,
+) -> set[str]:
+    """Транзакции, свапы которых уже импортированы (поиск по диапазону времени блоков)"""
+    if not tx_hashes:
+        return set()
+    return await TortoiseSwapRepository().get_existing_tx_hashes(tx_hashes, timestamp_from, timestamp_to, chunk_size)
+
+
+async def load_wallet_tokens(
+    token_wallet_list,
+    chunk_size: int = WALLET_TOKENS_LOAD_CHUNK_SIZE,
+) -> list[Model]:
+    """Загружаем существующие WalletToken set-based запросами - по одному на chunk_size пар"""
+    pairs = [(item["wallet_id"], item["token_id"]) for item in token_wallet_list]
+    wallet_tokens = []
+    async for chunk in TortoiseWalletTokenRepository().iter_by_wallet_token_pairs(pairs, chunk_size):
+        wallet_tokens.extend(chunk)
+    return wallet_tokens
 
 
 async def import_wallet_tokens(
     records: List[Model],
+    mode: str = INGESTION_MODE,
 ):
     fields_to_update = WalletToken._meta.db_fields.copy()
     fields_to_update.remove("id")
     fields_to_update.remove("wallet_id")
     fields_to_update.remove("token_id")
     fields_to_update.remove("created_at")
-    await TortoiseWalletTokenRepository().bulk_create(
-        records,
-        ignore_conflicts=False,
-        on_conflict=["wallet_id", "token_id"],
-        update_fields=fields_to_update,
+    repository = TortoiseWalletTokenRepository()
+    if mode == INGESTION_COPY:
+        columns, copy_records = model_copy_records(WalletToken, records)
+        await repository.bulk_copy_upsert(
+            copy_records,
+            columns,
+            on_conflict=["wallet_id", "token_id"],
+            update_fields=fields_to_update,
+        )
+    elif mode == INGESTION_PARALLEL:
+        # Пары (wallet_id, token_id) в частях не пересекаются - параллельные upsert-ы не блокируют друг друга
+        await bulk_create_parallel(
+            repository,
+            records,
+            ignore_conflicts=False,
+            on_conflict=["wallet_id", "token_id"],
+            update_fields=fields_to_update,
+        )
+    else:
+        await repository.bulk_create(
+            records,
+            ignore_conflicts=False,
+            on_conflict=["wallet_id", "token_id"],
+            update_fields=fields_to_update,
+        )
+
+
+async def merge_wallet_token_deltas(
+    records: List[Model],
+    mode: str = INGESTION_MODE,
+):
+    repository = TortoiseWalletTokenRepository()
+    if mode == INGESTION_PARALLEL:
+        chunks = [records[i::INGESTION_PARALLEL_CHUNKS] for i in range(INGESTION_PARALLEL_CHUNKS)]
+        await asyncio.gather(*[repository.merge_deltas(chunk) for chunk in chunks if chunk])
+    else:
+        await repository.merge_deltas(records)
+
+
+async def recompute_wallet_tokens(mapped_data: dict, chunk_size: int = WALLET_TOKENS_LOAD_CHUNK_SIZE) -> None:
+    """Пересчитывает WalletToken пар периода с нуля по таблице swap (повтор прерванного параллельного импорта)"""
+    pairs = [
+        (wallet_id, token_id) for wallet_id, wallet_data in mapped_data.items() for token_id in wallet_data["tokens"]
+    ]
+    connection = Tortoise.get_connection("default")
+    await connection.execute_script(queries.CREATE_FUNC_UUID_GENERATE_V7)
+    for i in range(0, len(pairs), chunk_size):
+        wallet_ids, token_ids = zip(*pairs[i : i + chunk_size])
+        await connection.execute_query(queries.RECOMPUTE_WALLET_TOKENS, [list(wallet_ids), list(token_ids)])
+
+
+async def create_backfill_staging_table(staging_table: str = BACKFILL_STAGING_TABLE) -> None:
+    connection = Tortoise.get_connection("default")
+    await connection.execute_script(queries.DROP_STAGING_TABLE.format(staging_table=staging_table))
+    await connection.execute_script(queries.CREATE_BACKFILL_STAGING_TABLE.format(staging_table=staging_table))
+    await connection.execute_script(queries.CREATE_FUNC_UUID_GENERATE_V7)
+
+
+async def copy_to_backfill_staging(
+    activities: List[Model],
+    staging_table: str = BACKFILL_STAGING_TABLE,
+) -> None:
+    """COPY созданных активностей в staging - с адресами вместо id кошельков и токенов, они проставляются при слиянии"""
+    records = [
+        (
+            activity.id,
+            activity.wallet_address,
+            activity.token_address,
+            activity.tx_hash,
+            activity.block_id,
+            activity.timestamp,
+            activity.event_type,
+            activity.quote_amount,
+            activity.token_amount,
+            activity.cost_usd,
+            activity.price_usd,
+            activity.is_part_of_transaction_with_mt_3_swappers,
+            activity.is_part_of_arbitrage_swap_event,
+            activity.swap_index,
+        )
+        for activity in activities
+    ]
+    async with Tortoise.get_connection("default").acquire_connection() as conn:
+        await conn.copy_records_to_table(
+            staging_table,
+            records=records,
+            columns=queries.BACKFILL_STAGING_COLUMNS,
+        )
+
+
+async def index_backfill_staging(staging_table: str = BACKFILL_STAGING_TABLE) -> None:
+    connection = Tortoise.get_connection("default")
+    await connection.execute_script(queries.CREATE_BACKFILL_STAGING_INDEX.format(staging_table=staging_table))
+    await connection.execute_script(queries.ANALYZE_TABLE.format(table_name=staging_table))
+
+
+async def get_backfill_staging_addresses(
+    column: str,
+    staging_table: str = BACKFILL_STAGING_TABLE,
+) -> list[str]:
+    rows = await Tortoise.get_connection("default").execute_query_dict(
+        queries.GET_BACKFILL_STAGING_ADDRESSES.format(column=column, staging_table=staging_table)
     )
+    return [row["address"] for row in rows]
+
+
+async def merge_backfill_staging(
+    timestamp_from: float,
+    timestamp_to: float,
+    staging_table: str = BACKFILL_STAGING_TABLE,
+) -> None:
+    """Свапы staging за [timestamp_from, timestamp_to) -> swap, дельты -> wallet_token, активность -> wallet"""
+    async with in_transaction() as connection:
+        await connection.execute_query(
+            queries.BACKFILL_MERGE_SWAPS_AND_WALLET_TOKENS.format(staging_table=staging_table),
+            [timestamp_from, timestamp_to],
+        )
+        await connection.execute_query(
+            queries.BACKFILL_UPDATE_WALLETS_LAST_ACTIVITY.format(staging_table=staging_table),
+            [timestamp_from, timestamp_to],
+        )
+        await connection.execute_query(
+            queries.BACKFILL_LOG_WALLET_CHANGES.format(staging_table=staging_table),
+            [timestamp_from, timestamp_to],
+        )
+
+
+async def drop_secondary_indexes(table_name: str) -> list[str]:
+    """Удаляет вторичные индексы таблицы, возвращает их определения для пересоздания"""
+    connection = Tortoise.get_connection("default")
+    rows = await connection.execute_query_dict(queries.GET_SECONDARY_INDEXES, [table_name])
+    for row in rows:
+        await connection.execute_script(queries.DROP_INDEX.format(index_name=row["index_name"]))
+    return [row["index_definition"] for row in rows]
+
+
+async def create_indexes(index_definitions: list[str]) -> None:
+    connection = Tortoise.get_connection("default")
+    for index_definition in index_definitions:
+        await connection.execute_script(index_definition)
+
+
+async def analyze_tables(table_names: list[str]) -> None:
+    connection = Tortoise.get_connection("default")
+    for table_name in table_names:
+        await connection.execute_script(queries.ANALYZE_TABLE.format(table_name=table_name))
+
+
+async def verify_backfill(
+    tolerance: str = BACKFILL_VERIFY_TOLERANCE,
+    staging_table: str = BACKFILL_STAGING_TABLE,
+) -> tuple[int, int]:
+    """Кол-во затронутых бэкфиллом пар кошелек-токен и пар, WalletToken которых не сходится с пересчетом по swap"""
+    rows = await Tortoise.get_connection("default").execute_query_dict(
+        queries.VERIFY_BACKFILL_WALLET_TOKENS.format(staging_table=staging_table),
+        [Decimal(tolerance)],
+    )
+    return rows[0]["pairs_count"], rows[0]["mismatches_count"]
+
+
+async def drop_backfill_staging_table(staging_table: str = BACKFILL_STAGING_TABLE) -> None:
+    await Tortoise.get_connection("default").execute_script(
+        queries.DROP_STAGING_TABLE.format(staging_table=staging_table)
+    )
+
+
+async def get_rollback_report(timestamp_from: int, timestamp_to: int) -> dict:
+    """Что удалит откат свапов за [timestamp_from, timestamp_to) - без изменений в БД"""
+    rows = await Tortoise.get_connection("default").execute_query_dict(
+        queries.GET_ROLLBACK_SWAPS_REPORT,
+        [timestamp_from, timestamp_to],
+    )
+    return rows[0]
+
+
+async def rollback_swaps(timestamp_from: int, timestamp_to: int) -> dict:
+    """
+    Удаляет свапы за [timestamp_from, timestamp_to), пересчитывает WalletToken затронутых пар
+    и время последней активности их кошельков в одной транзакции
+    """
+    async with in_transaction() as connection:
+        await connection.execute_script(queries.CREATE_FUNC_UUID_GENERATE_V7)
+        rows = await connection.execute_query_dict(
+            queries.ROLLBACK_SWAPS_AND_WALLET_TOKENS,
+            [timestamp_from, timestamp_to],
+        )
+        result = rows[0]
+        wallet_ids = result.pop("wallet_ids") or []
+        if wallet_ids:
+            await connection.execute_query(queries.ROLLBACK_UPDATE_WALLETS, [wallet_ids])
+            await connection.execute_query(
+                queries.UPSERT_WALLET_CHANGE_LOG,
+                [wallet_ids, [timestamp_from] * len(wallet_ids)],
+            )
+    result["wallets_count"] = len(wallet_ids)
+    return result
+
+
+# Секции swap, существование которых уже проверено этим процессом
+_swap_partitions: set[str] = set()
+# Когда swap в последний раз оказалась несекционированной (time.monotonic()). Проверка повторяется через
+# SWAP_PARTITION_RECHECK_SECONDS: парсер, запущенный до partition_swaps migrate, начнет создавать секции без перезапуска
+_swap_unpartitioned_at: float | None = None
+
+
+async def ensure_swap_partitions(
+    start_time: datetime.datetime,
+    end_time: datetime.datetime | None = None,
+    interval: str = SWAP_PARTITION_INTERVAL,
+    ahead: int = SWAP_PARTITIONS_AHEAD,
+    recheck_seconds: float = SWAP_PARTITION_RECHECK_SECONDS,
+) -> list[str]:
+    """
+    Создает недостающие секции swap от периода start_time до ahead периодов после end_time (по умолчанию - сейчас).
+    Ничего не делает, если swap не секционирована (тип таблицы перепроверяется раз в recheck_seconds).
+    Возвращает созданные секции
+    """
+    global _swap_unpartitioned_at
+    if _swap_unpartitioned_at is not None and time.monotonic() - _swap_unpartitioned_at < recheck_seconds:
+        return []
+    end_time = partitions.partitions_ahead(end_time or datetime.datetime.now(datetime.timezone.utc), interval, ahead)
+    required = {
+        partitions.partition_name(Swap._meta.db_table, start, interval)
+        for start, _ in partitions.split_into_partitions(start_time, end_time, interval)
+    }
+    if required <= _swap_partitions:
+        return []
+    repository = TortoiseSwapRepository()
+    existing = await repository.get_partitions()
+    if existing is None:
+        _swap_unpartitioned_at = time.monotonic()
+        return []
+    _swap_unpartitioned_at = None
+    created = await repository.create_partitions(start_time, end_time, interval, existing)
+    _swap_partitions.update(existing, created)
+    return created
+
+
+async def get_table_kind(table_name: str) -> str | None:
+    """relkind таблицы: 'r' - обычная, 'p' - секционированная, None - таблицы нет"""
+    rows = await Tortoise.get_connection("default").execute_query_dict(queries.GET_TABLE_PARTITIONS, [table_name])
+    return rows[0]["relkind"] if rows else None
+
+
+async def create_partitioned_swap_table(source_table: str) -> None:
+    """
+    Переименовывает swap в source_table (вместе с индексами - их имена заняты бы новой таблицей)
+    и создает на ее месте пустую секционированную swap. В одной транзакции
+    """
+    table_name = Swap._meta.db_table
+    async with in_transaction() as connection:
+        rows = await connection.execute_query_dict(queries.GET_INDEX_NAMES, [table_name])
+        await connection.execute_script(queries.RENAME_TABLE.format(table_name=table_name, new_table_name=source_table))
+        for row in rows:
+            index_name = row["index_name"]
+            new_index_name = (
+                index_name.replace(table_name, source_table, 1)
+                if index_name.startswith(table_name)
+                else f"{source_table}_{index_name}"
+            )
+            await connection.execute_script(
+                queries.RENAME_INDEX.format(index_name=index_name, new_index_name=new_index_name[:63])
+            )
+        await connection.execute_script(queries.CREATE_PARTITIONED_SWAP_TABLE.format(source_table=source_table))
+        await connection.execute_script(queries.CREATE_DEFAULT_PARTITION.format(table_name=table_name))
+
+
+async def get_timestamps_range(table_name: str) -> dict:
+    rows = await Tortoise.get_connection("default").execute_query_dict(
+        queries.GET_TIMESTAMPS_RANGE.format(table_name=table_name)
+    )
+    return rows[0]
+
+
+async def copy_swaps_to_partitioned(source_table: str, timestamp_from: int, timestamp_to: int) -> int:
+    """Переносит свапы за [timestamp_from, timestamp_to) из source_table в swap, возвращает кол-во вставленных"""
+    inserted, _ = await Tortoise.get_connection("default").execute_query(
+        queries.COPY_SWAPS_TO_PARTITIONED.format(source_table=source_table),
+        [timestamp_from, timestamp_to],
+    )
+    return inserted
+
+
+async def drop_table(table_name: str) -> None:
+    await Tortoise.get_connection("default").execute_script(queries.DROP_TABLE.format(table_name=table_name))
+
+
+async def get_column_is_nullable(table_name: str, column_name: str) -> bool | None:
+    """Допускает ли колонка NULL, None - колонки нет"""
+    rows = await Tortoise.get_connection("default").execute_query_dict(
+        queries.GET_COLUMN_IS_NULLABLE,
+        [table_name, column_name],
+    )
+    return rows[0]["is_nullable"] if rows else None
+
+
+async def add_swap_index_column() -> int:
+    """Добавляет swap.swap_index и нумерует уже сохраненные свапы в одной транзакции, возвращает кол-во ненулевых"""
+    async with in_transaction() as connection:
+        await connection.execute_script(queries.ADD_SWAP_INDEX_COLUMN)
+        numbered, _ = await connection.execute_query(queries.NUMBER_EXISTING_SWAPS)
+    return numbered
+
+
+async def has_unique_index(table_name: str, columns: list[str]) -> bool:
+    rows = await Tortoise.get_connection("default").execute_query_dict(
+        queries.HAS_UNIQUE_INDEX,
+        [table_name, columns],
+    )
+    return rows[0]["has_index"]
+
+
+async def add_flipside_config_columns() -> None:
+    await Tortoise.get_connection("default").execute_script(queries.ADD_FLIPSIDE_CONFIG_COLUMNS)
+
+
+async def create_wallet_change_log_table() -> None:
+    await Tortoise.get_connection("default").execute_script(queries.CREATE_WALLET_CHANGE_LOG_TABLE)
+
+
+async def set_swap_timestamp_not_null() -> None:
+    await Tortoise.get_connection("default").execute_script(queries.SET_SWAP_TIMESTAMP_NOT_NULL)
+
+
+async def add_swap_dedup_constraint() -> None:
+    await Tortoise.get_connection("default").execute_script(queries.ADD_SWAP_DEDUP_CONSTRAINT)
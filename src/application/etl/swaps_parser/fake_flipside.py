@@ -0,0 +1,149 @@
+import hashlib
+import random
+import re
+import time
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+
+from .config import OKX_ROUTER_ADDRESS, SOL_ADDRESS
+
+EZ_DEX_SWAPS_TABLE = "solana.defi.ez_dex_swaps"
+JUPITER_SWAPS_TABLE = "solana.defi.fact_swaps_jupiter_summary"
+
+
+@dataclass
+class FakeQueryRunStats:
+    query_exec_seconds: float
+    elapsed_seconds: float
+
+
+@dataclass
+class FakeQueryResultSet:
+    records: list[dict]
+    run_stats: FakeQueryRunStats
+
+
+def _fake_address(prefix: str, number: int) -> str:
+    return hashlib.sha256(f"{prefix}{number}".encode()).hexdigest()[:44]
+
+
+def generate_minute_swaps(
+    minute: datetime,
+    count: int,
+    table: str = EZ_DEX_SWAPS_TABLE,
+    wallets_count: int = 5000,
+    tokens_count: int = 500,
+    seed: int = 0,
+) -> list[dict]:
+    """Детерминированно генерирует свапы за минуту в формате записей Flipside"""
+    minute_ts = int(minute.timestamp())
+    rnd = random.Random(f"{seed}-{table}-{minute_ts}")
+    # Jupiter-свапы частично повторяют транзакции ez_dex_swaps, как и в реальных данных
+    tx_prefix = "tx" if table == EZ_DEX_SWAPS_TABLE or rnd.random() < 0.5 else "jup"
+    swaps = []
+    for i in range(count):
+        tx_number = minute_ts * 100000 + (i // 2 if rnd.random() < 0.3 else i)
+        token = _fake_address("token", rnd.randrange(tokens_count))
+        sol_amount = round(rnd.uniform(0.01, 50), 9)
+        token_amount = round(rnd.uniform(1, 10_000_000), 6)
+        is_buy = rnd.random() < 0.55
+        swapper = _fake_address("wallet", rnd.randrange(wallets_count)) if rnd.random() > 0.01 else None
+        if rnd.random() < 0.005:
+            swapper = OKX_ROUTER_ADDRESS
+        block_datetime = minute + timedelta(seconds=rnd.randrange(60), milliseconds=rnd.randrange(1000))
+        swaps.append(
+            {
+                "tx_id": _fake_address(tx_prefix, tx_number),
+                "block_id": 300_000_000 + minute_ts // 60 * 150 + i % 150,
+                "swapper": swapper,
+                "swap_from_mint": SOL_ADDRESS if is_buy else token,
+                "swap_to_mint": token if is_buy else SOL_ADDRESS,
+                "swap_from_amount": sol_amount if is_buy else token_amount,
+                "swap_to_amount": token_amount if is_buy else sol_amount,
+                "block_timestamp": block_datetime.strftime("%Y-%m-%dT%H:%M:%S.%f")[:-3] + "Z",
+                "cursor_id": hashlib.md5(f"{table}{minute_ts}{i}".encode()).hexdigest(),
+            }
+        )
+    return swaps
+
+
+class FakeFlipside:
+    """
+    Офлайн-имитация клиента Flipside для бенчмарков и отладки без сети.
+    Разбирает SQL из flipside_queries, отдает сгенерированные свапы и считает, сколько строк
+    хранилищу пришлось отсортировать и пропустить ради каждой страницы.
+    """
+
+    def __init__(
+        self,
+        swaps_per_minute: int = 1000,
+        jupiter_swaps_per_minute: int | None = None,
+        seed: int = 0,
+    ):
+        self.swaps_per_minute = {
+            EZ_DEX_SWAPS_TABLE: swaps_per_minute,
+            JUPITER_SWAPS_TABLE: (
+                jupiter_swaps_per_minute if jupiter_swaps_per_minute is not None else swaps_per_minute // 3
+            ),
+        }
+        self.seed = seed
+        self.queries_count = 0
+        self.rows_sorted = 0
+        self.rows_skipped = 0
+        self.rows_returned = 0
+        self._minutes_cache = {}
+
+    def query(self, sql: str) -> FakeQueryResultSet:
+        start = time.perf_counter()
+        table = JUPITER_SWAPS_TABLE if JUPITER_SWAPS_TABLE in sql else EZ_DEX_SWAPS_TABLE
+        # Время вставки в Flipside имитируется временем блока
+        start_time = datetime.fromisoformat(re.search(r"(?:BLOCK|INSERTED)_TIMESTAMP >= '([^']+)'", sql).group(1))
+        end_time = datetime.fromisoformat(re.search(r"(?:BLOCK|INSERTED)_TIMESTAMP < '([^']+)'", sql).group(1))
+        after_id = re.search(r"_ID > '([^']+)'", sql)
+        limit = int(re.search(r"LIMIT (\d+)", sql).group(1))
+        offset = int(re.search(r"OFFSET (\d+)", sql).group(1))
+
+        rows = self._get_rows(table, start_time, end_time)
+        if after_id:
+            rows = [row for row in rows if row["cursor_id"] > after_id.group(1)]
+        # Как и хранилище, сортируем все подходящие строки заново для каждой страницы
+        rows = sorted(rows, key=lambda row: row["cursor_id"])
+        records = [row.copy() for row in rows[offset : offset + limit]]
+
+        self.queries_count += 1
+        self.rows_sorted += len(rows)
+        self.rows_skipped += min(offset, len(rows))
+        self.rows_returned += len(records)
+        elapsed = time.perf_counter() - start
+        return FakeQueryResultSet(
+            records=records,
+            run_stats=FakeQueryRunStats(query_exec_seconds=elapsed, elapsed_seconds=elapsed),
+        )
+
+    def _get_rows(self, table: str, start_time: datetime, end_time: datetime) -> list[dict]:
+        rows = []
+        minute = start_time.replace(second=0, microsecond=0)
+        while minute < end_time:
+            key = (table, minute)
+            if key not in self._minutes_cache:
+                self._minutes_cache[key] = generate_minute_swaps(
+                    minute,
+                    self.swaps_per_minute[table],
+                    table=table,
+                    seed=self.seed,
+                )
+            rows.extend(self._minutes_cache[key])
+            minute += timedelta(minutes=1)
+        start_iso = start_time.strftime("%Y-%m-%dT%H:%M:%S.%f")[:-3] + "Z"
+        end_iso = end_time.strftime("%Y-%m-%dT%H:%M:%S.%f")[:-3] + "Z"
+        return [row for row in rows if start_iso <= row["block_timestamp"] < end_iso]
+
+    def warm_up(self, start_time: datetime, end_time: datetime) -> None:
+        for table in self.swaps_per_minute:
+            self._get_rows(table, start_time, end_time)
+
+    def reset_stats(self) -> None:
+        self.queries_count = 0
+        self.rows_sorted = 0
+        self.rows_skipped = 0
+        self.rows_returned = 0
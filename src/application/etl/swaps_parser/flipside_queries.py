@@ -1,20 +1,70 @@
 import datetime
+import threading
 
+import requests
 from flipside import Flipside
+from flipside.integrations.query_integration.compass_query_integration import (
+    CompassQueryIntegration,
+)
+from flipside.rpc import RPC
 
-from .config import SOL_ADDRESS
+from .config import FLIPSIDE_API_URL, FLIPSIDE_PAGE_LIMIT, SOL_ADDRESS, TIME_COLUMN_BLOCK
 from .logger import logger
 
 
+class SessionReusingRPC(RPC):
+    """RPC Flipside с одной HTTP-сессией на клиента (SDK создает новую сессию на каждый запрос)"""
+
+    _session: requests.Session | None = None
+
+    @property
+    def session(self) -> requests.Session:
+        if self._session is None:
+            self._session = super().session
+        return self._session
+
+
+def create_flipside_client(flipside_apikey):
+    client = Flipside(
+        flipside_apikey,
+        FLIPSIDE_API_URL,
+    )
+    client.rpc = SessionReusingRPC(FLIPSIDE_API_URL, flipside_apikey)
+    client.query_integration = CompassQueryIntegration(client.rpc)
+    return client
+
+
+_thread_clients = threading.local()
+
+
+def get_flipside_client(flipside_apikey):
+    """Клиент текущего потока: соединения с Flipside переиспользуются между страницами и периодами"""
+    clients = getattr(_thread_clients, "clients", None)
+    if clients is None:
+        clients = _thread_clients.clients = {}
+    if flipside_apikey not in clients:
+        clients[flipside_apikey] = create_flipside_client(flipside_apikey)
+    return clients[flipside_apikey]
+
+
+def sql_keyset_condition(cursor_column: str, after_id: str | None = None) -> str:
+    """Условие keyset-пагинации: продолжаем выборку после последнего полученного ID"""
+    if after_id is None:
+        return ""
+    return f"AND {cursor_column} > '{after_id}'"
+
+
 def sql_get_swaps(
     start_time: datetime,
     end_time: datetime,
     offset: int = 0,
     limit: int | None = None,
+    after_id: str | None = None,
+    time_column: str = TIME_COLUMN_BLOCK,
 ):
     """SQL-запрос для получения swaps с Flipside-crypto"""
     if limit is None:
-        limit = 100000
+        limit = FLIPSIDE_PAGE_LIMIT
     sql = f"""
     SELECT
       tx_id,
@@ -25,15 +75,17 @@ def sql_get_swaps(
       swap_from_amount,
       swap_to_amount,
       BLOCK_TIMESTAMP,
+      EZ_SWAPS_ID AS cursor_id,
     FROM
       solana.defi.ez_dex_swaps
     WHERE
-      BLOCK_TIMESTAMP >= '{start_time}'
-      AND BLOCK_TIMESTAMP < '{end_time}'
+      {time_column} >= '{start_time}'
+      AND {time_column} < '{end_time}'
       AND (
         SWAP_FROM_MINT = '{SOL_ADDRESS}'
         OR SWAP_TO_MINT = '{SOL_ADDRESS}'
       )
+      {sql_keyset_condition("EZ_SWAPS_ID", after_id)}
     ORDER BY EZ_SWAPS_ID ASC
       LIMIT {limit} OFFSET {offset}
     """
@@ -45,10 +97,12 @@ def sql_get_swaps_jupiter(
     end_time: datetime,
     offset: int = 0,
     limit: int | None = None,
+    after_id: str | None = None,
+    time_column: str = TIME_COLUMN_BLOCK,
 ):
     """SQL-запрос для получения Jupiter-swaps с Flipside-crypto"""
     if limit is None:
-        limit = 100000
+        limit = FLIPSIDE_PAGE_LIMIT
     sql = f"""
     SELECT
       tx_id,
@@ -59,15 +113,17 @@ def sql_get_swaps_jupiter(
       swap_from_amount,
       swap_to_amount,
       BLOCK_TIMESTAMP,
+      FACT_SWAPS_JUPITER_SUMMARY_ID AS cursor_id,
     FROM
       solana.defi.fact_swaps_jupiter_summary
     WHERE
-      BLOCK_TIMESTAMP >= '{start_time}'
-      AND BLOCK_TIMESTAMP < '{end_time}'
+      {time_column} >= '{start_time}'
+      AND {time_column} < '{end_time}'
       AND (
         SWAP_FROM_MINT = '{SOL_ADDRESS}'
         OR SWAP_TO_MINT = '{SOL_ADDRESS}'
       )
+      {sql_keyset_condition("FACT_SWAPS_JUPITER_SUMMARY_ID", after_id)}
     ORDER BY FACT_SWAPS_JUPITER_SUMMARY_ID ASC
       LIMIT {limit} OFFSET {offset}
     """
@@ -80,16 +136,18 @@ def get_swaps(
     end_time,
     offset=0,
     limit=None,
+    after_id=None,
+    client=None,
+    time_column=TIME_COLUMN_BLOCK,
 ):
-    flipside = Flipside(
-        flipside_apikey,
-        "https://api-v2.flipsidecrypto.xyz",
-    )
+    flipside = client or get_flipside_client(flipside_apikey)
     _query = sql_get_swaps(
         start_time,
         end_time,
         offset=offset,
         limit=limit,
+        after_id=after_id,
+        time_column=time_column,
     )
     query_result_set = flipside.query(_query)
     swaps = query_result_set.records if query_result_set.records else []
@@ -106,16 +164,18 @@ def get_swaps_jupiter(
     end_time,
     offset=0,
     limit=None,
+    after_id=None,
+    client=None,
+    time_column=TIME_COLUMN_BLOCK,
 ):
-    flipside = Flipside(
-        flipside_apikey,
-        "https://api-v2.flipsidecrypto.xyz",
-    )
+    flipside = client or get_flipside_client(flipside_apikey)
     _query = sql_get_swaps_jupiter(
         start_time,
         end_time,
         offset=offset,
         limit=limit,
+        after_id=after_id,
+        time_column=time_column,
     )
     query_result_set = flipside.query(_query)
     swaps = query_result_set.records if query_result_set.records else []
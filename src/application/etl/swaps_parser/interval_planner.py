@@ -0,0 +1,93 @@
+import json
+import math
+import os
+from datetime import datetime
+from pathlib import Path
+
+from . import utils
+from .config import (
+    INTERVAL_TARGET_ROWS,
+    INTERVALS_MAX_COUNT,
+    INTERVALS_MIN_COUNT,
+    INTERVALS_STATS_FILE,
+)
+from .logger import logger
+
+SOURCE_EZ_DEX_SWAPS = "ez_dex_swaps"
+SOURCE_JUPITER = "jupiter"
+
+# Разбивка, пока для источника еще нет статистики
+DEFAULT_INTERVALS_COUNT = {
+    SOURCE_EZ_DEX_SWAPS: 12,
+    SOURCE_JUPITER: 4,
+}
+
+
+class IntervalOverflowException(Exception):
+    """Интервал не уместился в допустимое кол-во страниц запроса"""
+
+    def __init__(self, start_time: datetime, end_time: datetime, rows_count: int):
+        self.start_time = start_time
+        self.end_time = end_time
+        self.rows_count = rows_count
+        super().__init__(f"Интервал {start_time} - {end_time} не уместился в {rows_count} записей")
+
+
+class IntervalPlanner:
+    """
+    Подбирает кол-во интервалов запросов к источнику так, чтобы в каждый попадало около target_rows записей.
+    Объем источника - скользящее среднее свапов в минуту по прошлым периодам, хранится в локальном файле
+    """
+
+    def __init__(
+        self,
+        stats_file: str = INTERVALS_STATS_FILE,
+        target_rows: int = INTERVAL_TARGET_ROWS,
+        smoothing: float = 0.3,
+    ):
+        self.stats_file = Path(stats_file)
+        self.target_rows = target_rows
+        self.smoothing = smoothing
+        self._swaps_per_minute: dict[str, float] | None = None
+
+    @property
+    def swaps_per_minute(self) -> dict[str, float]:
+        if self._swaps_per_minute is None:
+            try:
+                self._swaps_per_minute = json.loads(self.stats_file.read_text())
+            except (FileNotFoundError, ValueError):
+                self._swaps_per_minute = {}
+        return self._swaps_per_minute
+
+    def intervals_count(self, source: str, start_time: datetime, end_time: datetime) -> int:
+        swaps_per_minute = self.swaps_per_minute.get(source)
+        if swaps_per_minute is None:
+            return DEFAULT_INTERVALS_COUNT[source]
+        minutes = (end_time - start_time).total_seconds() / 60
+        count = math.ceil(swaps_per_minute * minutes / self.target_rows)
+        return min(max(count, INTERVALS_MIN_COUNT), INTERVALS_MAX_COUNT)
+
+    def plan(self, source: str, start_time: datetime, end_time: datetime) -> list[tuple]:
+        return utils.split_time_range(start_time, end_time, self.intervals_count(source, start_time, end_time))
+
+    def overflow_parts(self, rows_count: int) -> int:
+        """На сколько частей делить переполненный интервал (записей в нем как минимум rows_count)"""
+        return max(2, math.ceil(rows_count / self.target_rows))
+
+    def record(self, source: str, start_time: datetime, end_time: datetime, rows_count: int) -> None:
+        """Учитывает объем собранного периода и сохраняет статистику"""
+        minutes = (end_time - start_time).total_seconds() / 60
+        if minutes <= 0:
+            return
+        observed = rows_count / minutes
+        previous = self.swaps_per_minute.get(source)
+        self.swaps_per_minute[source] = (
+            observed if previous is None else previous + self.smoothing * (observed - previous)
+        )
+        logger.debug(f"Свапов в минуту {source}: {observed:.0f}, среднее {self.swaps_per_minute[source]:.0f}")
+        tmp_path = self.stats_file.with_suffix(f".{os.getpid()}.tmp")
+        tmp_path.write_text(json.dumps(self.swaps_per_minute))
+        os.replace(tmp_path, self.stats_file)
+
+
+interval_planner = IntervalPlanner()
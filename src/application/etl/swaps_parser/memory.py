@@ -0,0 +1,96 @@
+"""
+Память процесса по стадиям обработки периода и планирование частей периода под бюджет памяти.
+
+RSS и пиковый RSS читаются из /proc/self/status (VmRSS, VmHWM), пик сбрасывается записью "5"
+в /proc/self/clear_refs. Без /proc (не Linux) пик - максимум за все время процесса (ru_maxrss).
+Пик процессный: если стадии идут одновременно (потоковый режим), пик сбрасывает только первая
+из них, поэтому у остальных он может быть завышен, но не занижен.
+"""
+
+import math
+import resource
+import sys
+import threading
+from contextlib import contextmanager
+from pathlib import Path
+
+from .config import MEMORY_BUDGET_MB, MEMORY_BUDGET_ROWS, SWAP_MEMORY_ESTIMATE_KB
+from .logger import logger
+
+PROC_STATUS = Path("/proc/self/status")
+PROC_CLEAR_REFS = Path("/proc/self/clear_refs")
+
+_lock = threading.Lock()
+_active_stages = 0
+
+
+def _read_status_mb(field: str) -> float | None:
+    try:
+        for line in PROC_STATUS.read_text().splitlines():
+            if line.startswith(f"{field}:"):
+                return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    return None
+
+
+def _max_rss_mb() -> float:
+    max_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # На macOS ru_maxrss в байтах, на Linux - в килобайтах
+    return max_rss / 1024**2 if sys.platform == "darwin" else max_rss / 1024
+
+
+def rss_mb() -> float:
+    rss = _read_status_mb("VmRSS")
+    return round(rss if rss is not None else _max_rss_mb(), 1)
+
+
+def peak_rss_mb() -> float:
+    peak = _read_status_mb("VmHWM")
+    return round(peak if peak is not None else _max_rss_mb(), 1)
+
+
+def reset_peak_rss() -> bool:
+    try:
+        PROC_CLEAR_REFS.write_text("5")
+        return True
+    except OSError:
+        return False
+
+
+@contextmanager
+def track_stage(stage: str, peaks: dict | None = None):
+    """Логирует RSS в начале и конце стадии и ее пиковый RSS. peaks - словарь максимумов пика по стадиям"""
+    global _active_stages
+    with _lock:
+        if not _active_stages:
+            reset_peak_rss()
+        _active_stages += 1
+    rss_before = rss_mb()
+    try:
+        yield
+    finally:
+        with _lock:
+            _active_stages -= 1
+        peak = peak_rss_mb()
+        if peaks is not None:
+            peaks[stage] = max(peaks.get(stage, 0), peak)
+        logger.info(f"Память | {stage} | RSS: {rss_before} -> {rss_mb()} МБ | пик: {peak} МБ")
+
+
+def plan_parts_count(
+    rows_count: int,
+    max_rows: int = MEMORY_BUDGET_ROWS,
+    budget_mb: float = MEMORY_BUDGET_MB,
+    row_kb: float = SWAP_MEMORY_ESTIMATE_KB,
+) -> int:
+    """
+    На сколько частей делить rows_count свапов: не больше max_rows свапов в части и оценка памяти части
+    (row_kb на свап) не выше свободного до budget_mb остатка. Нулевые ограничения не действуют
+    """
+    parts_count = math.ceil(rows_count / max_rows) if max_rows else 1
+    if budget_mb:
+        # Не меньше 10% бюджета на часть, даже если процесс уже занял почти весь бюджет
+        available_mb = max(budget_mb - rss_mb(), budget_mb / 10)
+        parts_count = max(parts_count, math.ceil(rows_count * row_kb / 1024 / available_mb))
+    return max(parts_count, 1)
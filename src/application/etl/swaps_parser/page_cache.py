@@ -0,0 +1,87 @@
+import hashlib
+import mmap
+import os
+import tempfile
+from datetime import datetime
+from pathlib import Path
+
+import orjson
+
+from .config import PAGE_CACHE_DIR, PAGE_CACHE_MAX_BYTES
+from .logger import logger
+
+PAGE_SUFFIX = ".page"
+
+
+def page_key(
+    source: str,
+    start_time: datetime,
+    end_time: datetime,
+    offset: int,
+    after_id: str | None,
+    limit: int,
+) -> str:
+    """Ключ страницы: источник, интервал и курсор (offset/after_id) запроса"""
+    raw_key = "|".join([source, start_time.isoformat(), end_time.isoformat(), str(offset), after_id or "", str(limit)])
+    return hashlib.sha256(raw_key.encode()).hexdigest()
+
+
+def _page_path(key: str, cache_dir: str) -> Path:
+    return Path(cache_dir) / key[:2] / f"{key}{PAGE_SUFFIX}"
+
+
+def read_page(key: str, cache_dir: str = PAGE_CACHE_DIR) -> list[dict] | None:
+    """Записи страницы из кэша или None, если страницы нет"""
+    path = _page_path(key, cache_dir)
+    try:
+        with open(path, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            with memoryview(mm) as view:
+                records = orjson.loads(view)
+    except (FileNotFoundError, ValueError) as e:
+        # ValueError - пустой или поврежденный файл, такую страницу просто запросим заново
+        if not isinstance(e, FileNotFoundError):
+            logger.warning(f"Поврежденная страница в кэше {path}: {e}")
+        return None
+    # Время доступа обновляем вручную (atime часто отключен) - по нему выбираются страницы для удаления
+    os.utime(path)
+    return records
+
+
+def write_page(key: str, records: list[dict], cache_dir: str = PAGE_CACHE_DIR) -> None:
+    path = _page_path(key, cache_dir)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    # Пишем во временный файл и переименовываем - параллельные процессы не увидят недописанную страницу.
+    # Имя временного файла уникально на каждую запись: одну страницу могут писать несколько потоков сбора
+    tmp_file = tempfile.NamedTemporaryFile(dir=path.parent, prefix=f"{key}.", suffix=".tmp", delete=False)
+    try:
+        with tmp_file:
+            tmp_file.write(orjson.dumps(records))
+        os.replace(tmp_file.name, path)
+    except BaseException:
+        Path(tmp_file.name).unlink(missing_ok=True)
+        raise
+
+
+def evict(max_bytes: int = PAGE_CACHE_MAX_BYTES, cache_dir: str = PAGE_CACHE_DIR) -> int:
+    """Удаляет давно не читанные страницы, пока размер кэша больше max_bytes. Возвращает кол-во удаленных"""
+    pages = []
+    total_size = 0
+    for path in Path(cache_dir).glob(f"*/*{PAGE_SUFFIX}"):
+        try:
+            stat = path.stat()
+        except FileNotFoundError:
+            continue
+        pages.append((stat.st_mtime, stat.st_size, path))
+        total_size += stat.st_size
+    if total_size <= max_bytes:
+        return 0
+
+    removed = 0
+    for _, size, path in sorted(pages):
+        if total_size <= max_bytes:
+            break
+        path.unlink(missing_ok=True)
+        total_size -= size
+        removed += 1
+    logger.info(f"Кэш страниц Flipside: удалено {removed} страниц, размер {total_size} байт")
+    return removed
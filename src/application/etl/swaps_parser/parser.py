@@ -1,6 +1,8 @@
 import asyncio
-from concurrent.futures import ProcessPoolExecutor
-from datetime import datetime, timedelta
+import math
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta, timezone
 from functools import partial
 from pathlib import Path
 
@@ -21,15 +23,55 @@ from src.infra.db.setup_tortoise import (
 
 from . import (
     calculations,
+    columnar,
     db_utils,
     mappers,
+    memory,
+    page_cache,
     utils,
 )
-from .flipside_queries import (
-    get_swaps,
-    get_swaps_jupiter,
+from .account_pool import FlipsideAccountPool, NoActiveFlipsideAccountsException
+from .address_cache import tokens_cache, wallets_cache
+from .config import (
+    COLUMNAR_TRANSFORM,
+    FETCH_WORKERS,
+    FLIPSIDE_PAGE_LIMIT,
+    INGESTION_MODE,
+    INGESTION_PARALLEL,
+    INTERVAL_MAX_PAGES,
+    INTERVAL_MIN_SECONDS,
+    PAGE_CACHE_ENABLED,
+    PAGINATION_KEYSET,
+    PREFETCH_DEPTH,
+    REALTIME_LAG_MINUTES,
+    REALTIME_OVERLAP_MINUTES,
+    REALTIME_POLL_SECONDS,
+    REALTIME_TX_HOLD_MINUTES,
+    REALTIME_WINDOW_MINUTES,
+    STREAMING_CHUNKS_COUNT,
+    STREAMING_INTERVALS_PER_CHUNK,
+    STREAMING_QUEUE_SIZE,
+    SWAP_DEDUP_CHECK,
+    TIME_COLUMN_BLOCK,
+    TIME_COLUMN_INSERTED,
+    WALLET_TOKEN_AGGREGATION,
+    WALLET_TOKEN_AGGREGATION_DB,
+)
+from .interval_planner import (
+    SOURCE_EZ_DEX_SWAPS,
+    SOURCE_JUPITER,
+    IntervalOverflowException,
+    interval_planner,
 )
 from .logger import logger
+from .swap_sources import FlipsideSwapSource, SwapSource
+
+# Ошибки, после которых запрос повторяется на другой учетке Flipside
+FLIPSIDE_ACCOUNT_ERRORS = (
+    QueryRunExecutionError,
+    QueryRunCancelledError,
+    ValidationError,
+)
 
 BASE_DIR = Path(__file__).parent
 
@@ -42,44 +84,91 @@ def fetch_data_for_period(
     end_time,
     flipside_apikey,
     is_jupiter=False,
+    pagination=PAGINATION_KEYSET,
+    source=None,
+    limit=None,
+    use_page_cache=PAGE_CACHE_ENABLED,
+    max_pages=None,
+    time_column=TIME_COLUMN_BLOCK,
 ):
     offset = 0
-    limit = 100000
+    after_id = None
+    limit = limit or FLIPSIDE_PAGE_LIMIT
     all_swaps = []
     all_count = 0
     stop = False
+    source = source or FlipsideSwapSource()
+    use_page_cache = use_page_cache and source.cacheable
+    table = SOURCE_JUPITER if is_jupiter else SOURCE_EZ_DEX_SWAPS
+    cache_source = f"{table}:{pagination}:{time_column}"
+    pages_count = 0
     while not stop:
-        if is_jupiter:
-            logger.debug(f"Собираем данные Jupiter за {start_time} - {end_time} | offset: {offset}")
-            swaps, count = get_swaps_jupiter(
-                flipside_apikey,
-                start_time,
-                end_time,
-                offset=offset,
-                limit=limit,
-            )
+        key = page_cache.page_key(cache_source, start_time, end_time, offset, after_id, limit)
+        swaps = page_cache.read_page(key) if use_page_cache else None
+        if swaps is not None:
+            logger.debug(f"Страница {cache_source} за {start_time} - {end_time} взята из кэша | after_id: {after_id}")
+            count = len(swaps)
         else:
-            logger.debug(f"Собираем данные за {start_time} - {end_time} | offset: {offset}")
-            swaps, count = get_swaps(
-                flipside_apikey,
+            logger.debug(
+                f"Собираем данные {table} ({source.name}) за {start_time} - {end_time} "
+                f"| offset: {offset} | after_id: {after_id}"
+            )
+            swaps, count = source.get_page(
                 start_time,
                 end_time,
+                is_jupiter=is_jupiter,
                 offset=offset,
                 limit=limit,
+                after_id=after_id,
+                time_column=time_column,
+                apikey=flipside_apikey,
             )
+            if use_page_cache:
+                page_cache.write_page(key, swaps)
 
         all_swaps.extend(swaps)
         all_count += count
+        pages_count += 1
         if count < limit:
             stop = True
+        elif max_pages and pages_count >= max_pages:
+            # Интервал слишком велик - вызывающий код разделит его на части
+            raise IntervalOverflowException(start_time, end_time, all_count)
+        elif pagination == PAGINATION_KEYSET:
+            # Следующая страница начинается после последнего полученного ID - без пересортировки пропущенных строк
+            after_id = swaps[-1]["cursor_id"]
         else:
             offset += limit
 
     return all_swaps, all_count, is_jupiter
 
 
-async def import_data_to_db(wallets, tokens, activities):
-    # async with in_transaction() as conn:
+async def import_wallet_token_stats(wt_stats, aggregation, ingestion):
+    if aggregation == WALLET_TOKEN_AGGREGATION_DB:
+        await db_utils.merge_wallet_token_deltas(wt_stats, mode=ingestion)
+    else:
+        await db_utils.import_wallet_tokens(wt_stats, mode=ingestion)
+
+
+async def import_data_to_db(
+    wallets,
+    tokens,
+    activities,
+    ingestion=INGESTION_MODE,
+    aggregation=WALLET_TOKEN_AGGREGATION,
+    dedup_check=SWAP_DEDUP_CHECK,
+    checkpoint=None,
+):
+    """
+    Импорт объектов периода. checkpoint - корутина-функция сдвига отметки собранного периода.
+    Режимы ingestion:
+    - transactional/copy: активности, статистики, время активности кошельков и checkpoint в одной транзакции -
+      после падения период не импортируется повторно;
+    - parallel: части вставляются параллельно на разных соединениях без общей транзакции:
+      сначала свапы, затем статистики, checkpoint - после успешного импорта. После падения период собирается
+      заново; свапы всегда проверяются на дубли, и если часть из них уже сохранена, WalletToken пар периода
+      пересчитываются с нуля по таблице swap, а не дополняются - статистики не учитываются дважды
+    """
     created_wallets, created_tokens = await asyncio.gather(
         db_utils.import_wallets_data(wallets),
         db_utils.import_tokens(tokens),
@@ -88,111 +177,259 @@ async def import_data_to_db(wallets, tokens, activities):
     created_tokens_map = mappers.map_objects_by_address(created_tokens)
     logger.info("Кошельки импортированы")
     logger.info("Токены импортированы")
+    logger.info(f"Кэш кошельков: {wallets_cache}")
+    logger.info(f"Кэш токенов: {tokens_cache}")
 
-    token_wallet_list = mappers.create_wallet_token_ids_list(activities)
-    wallet_tokens = await db_utils.load_wallet_tokens(token_wallet_list)
-    logger.info(f"WalletToken-статистики загружены")
+    if activities:
+        # Секции swap на период свапов (если таблица секционирована)
+        await db_utils.ensure_swap_partitions(
+            datetime.fromtimestamp(min(activity.timestamp for activity in activities), timezone.utc)
+        )
+
+    new_activities = activities
+    # Диапазон периода мог заполнить бэкфилл: тогда свапы проверяются на дубли и без SWAP_DEDUP_CHECK.
+    # Если бэкфилл вставит свапы после проверки, импорт упадет на ключе, а повтор уже найдет их
+    if dedup_check or ingestion == INGESTION_PARALLEL or await db_utils.has_imported_swaps(activities):
+        # Уже сохраненные свапы не должны второй раз попасть в WalletToken-статистики
+        new_activities = await db_utils.filter_new_activities(activities, created_wallets_map, created_tokens_map)
+        if len(new_activities) != len(activities):
+            logger.info(f"Пропущено уже импортированных свапов: {len(activities) - len(new_activities)}")
+    # Повтор прерванного параллельного импорта: неизвестно, чьи статистики уже записаны - пары пересчитываются
+    recompute_wallet_tokens = ingestion == INGESTION_PARALLEL and len(new_activities) != len(activities)
+    if not recompute_wallet_tokens:
+        activities = new_activities
 
     mapped_data = mappers.map_data_by_wallets(
         created_wallets_map,
         created_tokens_map,
         activities,
     )
-    for stats in wallet_tokens:
-        mapped_data[stats.wallet_id]["tokens"][stats.token_id]["stats"] = stats
-    calculations.recalculate_wallet_token_stats(mapped_data)
-    logger.info(f"WalletToken-статистики пересчитаны")
-
-    wt_stats = [
-        token_data["stats"] for wallet_data in mapped_data.values() for token_data in wallet_data["tokens"].values()
-    ]
-
-    # Импортируем активности и статистики обязательно в транзакции!
-    async with in_transaction():
-        await db_utils.import_activities(activities)
-        await db_utils.import_wallet_tokens(wt_stats)
-    logger.info(f"Активности импортированы")
-    logger.info(f"WalletToken-статистики импортированы")
-
-    # После полуения кошельков из БД пересчитываем последн. активность и обновляем
+    if recompute_wallet_tokens:
+        wt_stats = []
+        logger.info("WalletToken-статистики будут пересчитаны по таблице swap")
+    elif aggregation == WALLET_TOKEN_AGGREGATION_DB:
+        # Существующие записи не читаем - дельты периода сливаются с ними в БД
+        wt_stats = calculations.calculate_wallet_token_deltas(mapped_data)
+        logger.info("WalletToken-дельты рассчитаны")
+    else:
+        # wallet_id/token_id активностям проставляются при маппинге, поэтому пары собираем после него
+        token_wallet_list = mappers.create_wallet_token_ids_list(activities)
+        wallet_tokens = await db_utils.load_wallet_tokens(token_wallet_list)
+        logger.info("WalletToken-статистики загружены")
+        for stats in wallet_tokens:
+            mapped_data[stats.wallet_id]["tokens"][stats.token_id]["stats"] = stats
+        calculations.recalculate_wallet_token_stats(mapped_data)
+        logger.info("WalletToken-статистики пересчитаны")
+        wt_stats = [
+            token_data["stats"] for wallet_data in mapped_data.values() for token_data in wallet_data["tokens"].values()
+        ]
+
+    # Время первой/последней активности по периоду, со значениями в БД сводится в запросе (идемпотентно)
     calculations.calculate_wallet_first_last_activity_timestamps(
         created_wallets,
         mapped_data,
     )
-    await db_utils.update_wallets(created_wallets)
+
+    if ingestion == INGESTION_PARALLEL:
+        # Соединение транзакции не допускает параллельных запросов, поэтому без in_transaction.
+        # Статистики - только после всех свапов: пересчет при повторе должен видеть все свапы периода
+        await db_utils.import_activities(new_activities, mode=ingestion)
+        await asyncio.gather(
+            (
+                db_utils.recompute_wallet_tokens(mapped_data)
+                if recompute_wallet_tokens
+                else import_wallet_token_stats(wt_stats, aggregation, ingestion)
+            ),
+            db_utils.log_wallet_changes(mapped_data),
+            db_utils.update_wallets(created_wallets),
+        )
+        if checkpoint:
+            await checkpoint()
+    else:
+        # Импортируем активности и статистики обязательно в транзакции!
+        async with in_transaction():
+            await db_utils.import_activities(new_activities, mode=ingestion)
+            await import_wallet_token_stats(wt_stats, aggregation, ingestion)
+            # Журнал изменений - в той же транзакции, иначе после падения кошельки не попадут в пересчет
+            await db_utils.log_wallet_changes(mapped_data)
+            # Время активности кошельков - до чекпоинта: после него период повторно не импортируется
+            await db_utils.update_wallets(created_wallets)
+            if checkpoint:
+                await checkpoint()
+    logger.info("Активности импортированы")
+    logger.info("WalletToken-статистики импортированы")
     logger.info("Кошельки обновлены")
 
-    logger.info(f"Импортировали данные")
+    logger.info("Импортировали данные")
     logger.info(f"Свапов: {len(activities)}")
     logger.info(f"Кошельков: {len(wallets)}")
     logger.info(f"Токенов: {len(tokens)}")
     logger.info(f"Кошелек-токен стат.: {len(wt_stats)}")
 
-    # await conn.rollback()
-
 
 async def process_period(
     start_time,
     end_time,
     sol_prices,
-    flipside_account,
+    source,
+    flipside_config=None,
 ):
     start_parsing = datetime.now()
-    logger.info(f"-" * 50)
-    logger.info(f"-" * 50)
+    logger.info("-" * 50)
+    logger.info("-" * 50)
     logger.info(f"Начинаем сбор свапов за {start_time} - {end_time}")
 
-    intervals = utils.split_time_range(start_time, end_time, 12)
-    intervals_jupiter = utils.split_time_range(start_time, end_time, 4)
-    swaps = []
-    swaps_jupiter = []
-    try:
-        loop = asyncio.get_running_loop()
-        with ProcessPoolExecutor(max_workers=16) as executor:
-            # Создаем задачи для каждого интервала
-            tasks = [
-                loop.run_in_executor(
+    with memory.track_stage("Сбор"):
+        swaps, swaps_jupiter = await fetch_period(get_fetch_executor(), start_time, end_time, source)
+    fetched_counts = len(swaps), len(swaps_jupiter)
+    await build_and_import_period(
+        swaps,
+        swaps_jupiter,
+        sol_prices,
+        start_parsing,
+        checkpoint=parsed_untill_checkpoint(flipside_config, end_time),
+    )
+    record_period_volume(source, start_time, end_time, *fetched_counts)
+
+
+def parsed_untill_checkpoint(flipside_config, parsed_untill):
+    """Сдвиг swaps_parsed_untill для выполнения в транзакции импорта"""
+    if not flipside_config:
+        return None
+    return partial(db_utils.update_flipside_config_swaps_parsed_untill, flipside_config, parsed_untill=parsed_untill)
+
+
+_fetch_executor: ThreadPoolExecutor | None = None
+
+
+def get_fetch_executor() -> ThreadPoolExecutor:
+    """
+    Общий пул потоков сбора на все периоды. Запросы к Flipside - I/O, поэтому потоков достаточно:
+    нет запуска процессов на каждый период и сериализации собранных записей между процессами
+    """
+    global _fetch_executor
+    if _fetch_executor is None:
+        _fetch_executor = ThreadPoolExecutor(max_workers=FETCH_WORKERS, thread_name_prefix="flipside-fetch")
+    return _fetch_executor
+
+
+def shutdown_fetch_executor() -> None:
+    global _fetch_executor
+    if _fetch_executor is not None:
+        _fetch_executor.shutdown(cancel_futures=True)
+        _fetch_executor = None
+
+
+async def fetch_period(
+    executor,
+    start_time,
+    end_time,
+    source,
+    time_column=TIME_COLUMN_BLOCK,
+):
+    """Собирает свапы за период, кол-во интервалов по каждому источнику подбирает interval_planner"""
+    tables = (
+        (SOURCE_EZ_DEX_SWAPS, False),
+        (SOURCE_JUPITER, True),
+    )
+    results = await asyncio.gather(
+        *[
+            asyncio.gather(
+                *[
+                    fetch_interval(executor, start, end, source, is_jupiter=is_jupiter, time_column=time_column)
+                    for start, end in interval_planner.plan(table, start_time, end_time)
+                ]
+            )
+            for table, is_jupiter in tables
+        ]
+    )
+    swaps, swaps_jupiter = [[swap for interval_swaps in result for swap in interval_swaps] for result in results]
+    return swaps, swaps_jupiter
+
+
+def record_period_volume(source, start_time, end_time, swaps_count, swaps_jupiter_count) -> None:
+    """
+    Учитывает объем периода в статистике разбивки на интервалы. Вызывается только после успешного импорта:
+    период, собранный и не импортированный из-за ошибки, будет собран заново и не должен учитываться дважды
+    """
+    if source.account_pool is None:
+        # Объем локальных источников не говорит о нагрузке на Flipside - статистику не портим
+        return
+    interval_planner.record(SOURCE_EZ_DEX_SWAPS, start_time, end_time, swaps_count)
+    interval_planner.record(SOURCE_JUPITER, start_time, end_time, swaps_jupiter_count)
+
+
+async def fetch_interval(
+    executor,
+    start_time,
+    end_time,
+    source,
+    is_jupiter=False,
+    time_column=TIME_COLUMN_BLOCK,
+) -> list[dict]:
+    """
+    Собирает свапы за интервал из источника. Для Flipside - на свободном ключе из пула: при ошибке учетки
+    интервал повторяется на другом ключе, переполненный интервал делится на части, которые собираются параллельно
+    """
+    loop = asyncio.get_running_loop()
+    fetch = partial(
+        fetch_data_for_period,
+        start_time,
+        end_time,
+        is_jupiter=is_jupiter,
+        source=source,
+        # Окна по времени вставки не переигрываются, а перечитываются ради опоздавших строк
+        use_page_cache=PAGE_CACHE_ENABLED and time_column == TIME_COLUMN_BLOCK,
+        time_column=time_column,
+    )
+    account_pool = source.account_pool
+    if account_pool is None:
+        # Локальным источникам ключи не нужны, а страницы дешевые - интервал не делим
+        swaps, _, _ = await loop.run_in_executor(executor, partial(fetch, None))
+        return swaps
+
+    splittable = (end_time - start_time).total_seconds() >= 2 * INTERVAL_MIN_SECONDS
+    while True:
+        async with account_pool.account() as flipside_account:
+            try:
+                swaps, _, _ = await loop.run_in_executor(
                     executor,
                     partial(
-                        fetch_data_for_period,
-                        start,
-                        end,
+                        fetch,
                         flipside_account.api_key,
+                        max_pages=INTERVAL_MAX_PAGES if splittable else None,
                     ),
                 )
-                for start, end in intervals
-            ]
-            tasks.extend(
-                [
-                    loop.run_in_executor(
-                        executor,
-                        partial(
-                            fetch_data_for_period,
-                            start,
-                            end,
-                            flipside_account.api_key,
-                            is_jupiter=True,
-                        ),
-                    )
-                    for start, end in intervals_jupiter
-                ]
-            )
-            # Ждем завершения всех задач
-            results = await asyncio.gather(*tasks)
-    except ValidationError as e:
-        logger.error(e)
-        raise ValueError("Flipside Error")
-
-    for (
-        _swaps,
-        _swaps_count,
-        is_jupiter,
-    ) in results:
-        if is_jupiter:
-            swaps_jupiter.extend(_swaps)
-        else:
-            swaps.extend(_swaps)
+            except FLIPSIDE_ACCOUNT_ERRORS as e:
+                await account_pool.mark_failed(flipside_account, e)
+                continue
+            except IntervalOverflowException as e:
+                account_pool.mark_success(flipside_account)
+                overflow = e
+                break
+            account_pool.mark_success(flipside_account)
+            return swaps
+
+    parts = interval_planner.overflow_parts(overflow.rows_count)
+    logger.info(
+        f"Интервал {start_time} - {end_time} переполнен ({overflow.rows_count}+ записей), делим на {parts} частей"
+    )
+    results = await asyncio.gather(
+        *[
+            fetch_interval(executor, start, end, source, is_jupiter=is_jupiter, time_column=time_column)
+            for start, end in utils.split_time_range(start_time, end_time, parts)
+        ]
+    )
+    return [swap for interval_swaps in results for swap in interval_swaps]
+
 
+async def build_and_import_period(
+    swaps,
+    swaps_jupiter,
+    sol_prices,
+    start_parsing,
+    checkpoint=None,
+):
     ez_dex_count = len(swaps)
     jup_count = len(swaps_jupiter)
     logger.info(f"Собрано свапов: ez_dex - {ez_dex_count} | Jupiter - {jup_count}")
@@ -200,37 +437,247 @@ async def process_period(
     if total_count == 0:
         return
 
-    logger.info(f"Начинаем создание обьектов")
+    logger.info("Начинаем создание обьектов")
     start_building = datetime.now()
-    all_swaps = utils.combine_swaps(swaps, swaps_jupiter)
-    filtered_swaps = utils.filter_swaps(all_swaps, BLACKLISTED_TOKENS)
-    extracted = utils.extract_and_build_objects(filtered_swaps, sol_prices)
-
-    logger.info(f"Начинаем импорт данных в БД")
-    start_import = datetime.now()
-    await import_data_to_db(*extracted)
-    end = datetime.now()
+    building_time = import_time = timedelta()
+    peaks = {}
+    with memory.track_stage("Объединение свапов", peaks):
+        prepared = prepare_swaps(swaps, swaps_jupiter)
+        parts = split_prepared_swaps(prepared, memory.plan_parts_count(len(prepared)))
+        del prepared
+    if len(parts) > 1:
+        logger.info(f"Период разбит на {len(parts)} частей по кошелькам (бюджет памяти)")
+    building_time += datetime.now() - start_building
+
+    for number in range(1, len(parts) + 1):
+        # Часть освобождается до создания объектов: в памяти только объекты текущей части
+        part, parts[number - 1] = parts[number - 1], None
+        stage_started = datetime.now()
+        with memory.track_stage("Создание объектов", peaks):
+            extracted = build_part_objects(part, sol_prices)
+            del part
+        import_started = datetime.now()
+        building_time += import_started - stage_started
+        with memory.track_stage("Импорт", peaks):
+            # swaps_parsed_untill сдвигается вместе с последней частью, поэтому после падения посреди периода
+            # уже импортированные части придут повторно - для нескольких частей проверка дублей обязательна
+            await import_data_to_db(
+                *extracted,
+                dedup_check=SWAP_DEDUP_CHECK or len(parts) > 1,
+                checkpoint=checkpoint if number == len(parts) else None,
+            )
+            del extracted
+        import_time += datetime.now() - import_started
     logger.info(
         " | ".join(
             [
-                f"Время общее: {end - start_parsing}",
+                f"Время общее: {datetime.now() - start_parsing}",
                 f"Парсинг: {start_building - start_parsing}",
-                f"Создание объектов: {start_import - start_building}",
-                f"Импорт: {end - start_import}",
+                f"Создание объектов: {building_time}",
+                f"Импорт: {import_time}",
+                f"Пик RSS по стадиям, МБ: {peaks}",
             ]
         )
     )
 
 
-async def _process():
+async def fetch_chunk(
+    executor,
+    start_time,
+    end_time,
+    source,
+    intervals_count=STREAMING_INTERVALS_PER_CHUNK,
+):
+    """Собирает свапы обоих источников за часть периода, интервалы Jupiter совпадают с границами части"""
+    intervals = utils.split_time_range(start_time, end_time, intervals_count)
+    swaps_results, swaps_jupiter = await asyncio.gather(
+        asyncio.gather(*[fetch_interval(executor, start, end, source) for start, end in intervals]),
+        fetch_interval(executor, start_time, end_time, source, is_jupiter=True),
+    )
+    swaps = [swap for interval_swaps in swaps_results for swap in interval_swaps]
+    return start_time, end_time, swaps, swaps_jupiter
+
+
+async def stream_fetch_chunks(
+    chunks,
+    fetched_queue: asyncio.Queue,
+    source,
+    max_chunks_in_flight: int = 2,
+):
+    """Собирает части периода по порядку и помещает их в очередь, не опережая потребителя более чем на очередь"""
+    executor = get_fetch_executor()
+    pending = deque()
+    try:
+        for start, end in chunks:
+            pending.append(asyncio.create_task(fetch_chunk(executor, start, end, source)))
+            if len(pending) >= max_chunks_in_flight:
+                await fetched_queue.put(await pending.popleft())
+        while pending:
+            await fetched_queue.put(await pending.popleft())
+        await fetched_queue.put(None)
+    finally:
+        # При ошибке другой стадии TaskGroup отменяет только эту корутину - уже запущенные сборы отменяем сами
+        await cancel_fetch_tasks(pending)
+
+
+async def stream_build_objects(
+    fetched_queue: asyncio.Queue,
+    built_queue: asyncio.Queue,
+    sol_prices,
+):
+    """Создает объекты из собранных частей периода и передает их на импорт"""
+    while True:
+        chunk = await fetched_queue.get()
+        if chunk is None:
+            await built_queue.put(None)
+            return
+        start_time, end_time, swaps, swaps_jupiter = chunk
+        logger.info(
+            f"Собрано свапов за {start_time} - {end_time}: ez_dex - {len(swaps)} | Jupiter - {len(swaps_jupiter)}"
+        )
+        if not swaps and not swaps_jupiter:
+            continue
+        # Сборка объектов - CPU-работа, выносим в поток, чтобы не блокировать импорт предыдущей части
+        prepared = await asyncio.to_thread(prepare_swaps, swaps, swaps_jupiter)
+        del chunk, swaps, swaps_jupiter
+        parts = split_prepared_swaps(prepared, memory.plan_parts_count(len(prepared)))
+        del prepared
+        for number in range(1, len(parts) + 1):
+            part, parts[number - 1] = parts[number - 1], None
+            with memory.track_stage("Создание объектов"):
+                extracted = await asyncio.to_thread(build_part_objects, part, sol_prices)
+                del part
+            # Очередь ограничена - следующая часть создается, только когда импорт ее догоняет
+            await built_queue.put((start_time, end_time, extracted, len(parts), number == len(parts)))
+            del extracted
+
+
+async def stream_import_objects(built_queue: asyncio.Queue, flipside_config=None) -> int:
+    """
+    Импортирует части периода строго по порядку, чтобы WalletToken-статистики пересчитывались последовательно.
+    Конец каждой части фиксируется в swaps_parsed_untill - перезапуск продолжит с последней импортированной части
+    """
+    activities_count = 0
+    while True:
+        chunk = await built_queue.get()
+        if chunk is None:
+            return activities_count
+        start_time, end_time, extracted, parts_count, is_last_part = chunk
+        del chunk
+        logger.info(f"Начинаем импорт данных за {start_time} - {end_time}")
+        with memory.track_stage("Импорт"):
+            # Конец части периода фиксируется только вместе с последней частью по кошелькам
+            await import_data_to_db(
+                *extracted,
+                dedup_check=SWAP_DEDUP_CHECK or parts_count > 1,
+                checkpoint=parsed_untill_checkpoint(flipside_config, end_time) if is_last_part else None,
+            )
+        activities_count += len(extracted[2])
+        del extracted
+
+
+def prepare_swaps(swaps, swaps_jupiter):
+    """Объединенные, размеченные и отфильтрованные свапы: SwapBatch или список словарей"""
+    if COLUMNAR_TRANSFORM:
+        return columnar.SwapBatch.combine(swaps, swaps_jupiter).filter(BLACKLISTED_TOKENS)
+    return utils.filter_swaps(utils.combine_swaps(swaps, swaps_jupiter), BLACKLISTED_TOKENS)
+
+
+def split_prepared_swaps(prepared, parts_count: int) -> list:
+    """Части по хэшу кошелька без пустых, но не меньше одной"""
+    if COLUMNAR_TRANSFORM:
+        parts = prepared.split_by_wallet(parts_count)
+    else:
+        parts = utils.split_swaps_by_wallet(prepared, parts_count)
+    return [part for part in parts if len(part)] or parts[:1]
+
+
+def build_part_objects(prepared, sol_prices):
+    if COLUMNAR_TRANSFORM:
+        extracted = prepared.build_objects(sol_prices)
+    else:
+        extracted = utils.extract_and_build_objects(prepared, sol_prices)
+    utils.assign_swap_indexes(extracted[2])
+    return extracted
+
+
+def build_objects(swaps, swaps_jupiter, sol_prices):
+    return build_part_objects(prepare_swaps(swaps, swaps_jupiter), sol_prices)
+
+
+async def process_period_streaming(
+    start_time,
+    end_time,
+    sol_prices,
+    source,
+    chunks_count: int = STREAMING_CHUNKS_COUNT,
+    queue_size: int = STREAMING_QUEUE_SIZE,
+    flipside_config=None,
+):
+    """
+    Потоковая обработка периода: период делится на части, которые проходят через ограниченные очереди
+    сбор -> создание объектов -> импорт. Сбор, обработка и запись в БД идут одновременно,
+    а в памяти держится не более нескольких частей периода.
+    """
+    start_parsing = datetime.now()
+    logger.info("-" * 50)
+    logger.info("-" * 50)
+    logger.info(f"Начинаем потоковый сбор свапов за {start_time} - {end_time}")
+
+    fetched_queue = asyncio.Queue(maxsize=queue_size)
+    built_queue = asyncio.Queue(maxsize=queue_size)
+    # Границы частей - целые минуты: конец части становится swaps_parsed_untill, а цены SOL хранятся поминутно
+    chunk_minutes = max(1, math.ceil((end_time - start_time) / timedelta(minutes=1) / chunks_count))
+    chunks = utils.split_time_range_by_minutes(start_time, end_time, chunk_minutes)
+    try:
+        async with asyncio.TaskGroup() as tg:
+            tg.create_task(stream_fetch_chunks(chunks, fetched_queue, source))
+            tg.create_task(stream_build_objects(fetched_queue, built_queue, sol_prices))
+            import_task = tg.create_task(stream_import_objects(built_queue, flipside_config))
+    except ExceptionGroup as e:
+        # Пробрасываем первую ошибку, чтобы сработала обработка смены учетки Flipside, остальные - в ее причине
+        raise e.exceptions[0] from e
+
+    logger.info(
+        " | ".join(
+            [
+                f"Время общее: {datetime.now() - start_parsing}",
+                f"Свапов импортировано: {import_task.result()}",
+            ]
+        )
+    )
+
+
+async def create_flipside_source() -> FlipsideSwapSource | None:
+    account_pool = await FlipsideAccountPool.create()
+    if not account_pool:
+        logger.error("Нету активных аккаунтов FlipsideCrypto в БД")
+        return None
+    logger.info(f"Активных аккаунтов FlipsideCrypto: {len(account_pool)}")
+    return FlipsideSwapSource(account_pool)
+
+
+async def _process(
+    streaming: bool = False,
+    prefetch_depth: int = PREFETCH_DEPTH,
+    source: SwapSource | None = None,
+):
     try:
         flipside_config = await db_utils.get_flipside_config()
         if not flipside_config:
-            logger.error(f"Не найден FlipsideCrypto-конфиг в БД")
+            logger.error("Не найден FlipsideCrypto-конфиг в БД")
+            return
+
+        source = source or await create_flipside_source()
+        if not source:
             return
 
         start_time, end_time = get_start_end_time(flipside_config)
         logger.info(f"Запущен сбор данных за период: {start_time} | {end_time}")
+        if prefetch_depth and not streaming:
+            await process_periods_pipelined(flipside_config, start_time, end_time, source, prefetch_depth)
+            return
+        _process_period = process_period_streaming if streaming else process_period
 
         current_time = start_time
         while current_time < end_time:
@@ -238,11 +685,6 @@ async def _process():
             if next_time > end_time:
                 next_time = end_time
 
-            flipside_account = await db_utils.get_flipside_account()
-            if not flipside_account:
-                logger.error(f"Нету активных аккаунтов FlipsideCrypto в БД")
-                return
-
             sol_prices = await db_utils.get_sol_prices(
                 minute_from=current_time - timedelta(minutes=1),
                 minute_to=next_time + timedelta(minutes=1),
@@ -252,38 +694,108 @@ async def _process():
                 return
 
             try:
-                await process_period(
+                await _process_period(
                     current_time,
                     next_time,
                     sol_prices,
-                    flipside_account,
-                )
-                await db_utils.update_flipside_config_swaps_parsed_untill(
-                    flipside_config,
-                    parsed_untill=next_time,
+                    source,
+                    flipside_config=flipside_config,
                 )
-                current_time = next_time
-            except (
-                QueryRunExecutionError,
-                QueryRunCancelledError,
-                ValueError,
-            ) as e:
-                if isinstance(e, ValueError) and "Flipside Error" not in str(e):
-                    raise e
-                logger.error(type(e))
-                logger.error(f"Меняем учетку Flipside - {str(e)}")
-                await db_utils.set_flipside_account_inactive(flipside_account)
+            except NoActiveFlipsideAccountsException as e:
+                logger.error(e)
+                return
+            await db_utils.update_flipside_config_swaps_parsed_untill(
+                flipside_config,
+                parsed_untill=next_time,
+            )
+            current_time = next_time
+            page_cache.evict()
     except Exception as e:
         logger.error(f"Error: {e}")
         raise e
 
 
+async def process_periods_pipelined(
+    flipside_config,
+    start_time,
+    end_time,
+    source,
+    prefetch_depth: int = PREFETCH_DEPTH,
+):
+    """
+    Конвейерная обработка: пока период N создается и импортируется, периоды N+1..N+prefetch_depth уже собираются.
+    Импорт и сдвиг swaps_parsed_untill идут строго по порядку, поэтому при падении данные не пропускаются
+    """
+    periods = deque(utils.split_time_range_by_minutes(start_time, end_time, 60))
+    in_flight = deque()  # (начало, конец, цены SOL, задача сбора) - по порядку периодов
+    executor = get_fetch_executor()
+    try:
+        while periods:
+            # Досылаем сборку следующих периодов до глубины предвыборки
+            while len(in_flight) < min(len(periods), prefetch_depth + 1):
+                start, end = periods[len(in_flight)]
+                sol_prices = await db_utils.get_sol_prices(
+                    minute_from=start - timedelta(minutes=1),
+                    minute_to=end + timedelta(minutes=1),
+                )
+                if not sol_prices.get(end):
+                    logger.error(f"Ошибка: Нету данных о цене соланы в {end}!")
+                    # Дальше этого периода не идем, но уже собираемые периоды импортируем
+                    while len(periods) > len(in_flight):
+                        periods.pop()
+                    break
+                logger.info(f"Начинаем сбор свапов за {start} - {end}")
+                fetch_task = asyncio.create_task(fetch_period(executor, start, end, source))
+                in_flight.append((start, end, sol_prices, fetch_task))
+            if not in_flight:
+                return
+
+            start, end, sol_prices, fetch_task = in_flight[0]
+            start_parsing = datetime.now()
+            swaps, swaps_jupiter = await fetch_task
+            in_flight.popleft()
+            logger.info("-" * 50)
+            logger.info(f"Обрабатываем период {start} - {end}, собирается следующих: {len(in_flight)}")
+            fetched_counts = len(swaps), len(swaps_jupiter)
+            await build_and_import_period(
+                swaps,
+                swaps_jupiter,
+                sol_prices,
+                start_parsing,
+                checkpoint=parsed_untill_checkpoint(flipside_config, end),
+            )
+            record_period_volume(source, start, end, *fetched_counts)
+            await db_utils.update_flipside_config_swaps_parsed_untill(
+                flipside_config,
+                parsed_untill=end,
+            )
+            periods.popleft()
+            page_cache.evict()
+    except NoActiveFlipsideAccountsException as e:
+        logger.error(e)
+    finally:
+        await cancel_fetch_tasks([fetch_task for *_, fetch_task in in_flight])
+
+
+async def cancel_fetch_tasks(tasks) -> None:
+    """Отменяет задачи сбора и дожидается их, чтобы их ошибки не остались неполученными"""
+    tasks = list(tasks)
+    for task in tasks:
+        task.cancel()
+    await asyncio.gather(*tasks, return_exceptions=True)
+
+
 def get_start_end_time(flipside_config):
     utc_tz = pytz.timezone("UTC")
     last_tx_inserted_timestamp = flipside_config.swaps_parsed_untill_inserted_timestamp
     start_time = last_tx_inserted_timestamp.astimezone(utc_tz)
     end_time = datetime.now(utc_tz) - timedelta(minutes=1440)
     end_time = end_time.replace(second=0, microsecond=0)
+    realtime_from = flipside_config.swaps_realtime_from_block_timestamp
+    if realtime_from and realtime_from.astimezone(utc_tz) < end_time:
+        # Блоки с этого времени собирает режим реального времени - один диапазон не пишут оба режима
+        end_time = realtime_from.astimezone(utc_tz)
+        logger.info(f"Период ограничен началом режима реального времени: {end_time}")
     return start_time, end_time
 
 
@@ -297,13 +809,160 @@ def get_start_end_time(flipside_config):
 #     return start_time, end_time
 
 
-# TODO: в идеале переделать парсинг по INSERTED_TMESTAMP а не по BLOCK_TIMESTAMP
-#  чтобы исключить пропуски
+def get_realtime_start_end_time(flipside_config):
+    utc_tz = pytz.timezone("UTC")
+    end_time = datetime.now(utc_tz) - timedelta(minutes=REALTIME_LAG_MINUTES)
+    end_time = end_time.replace(second=0, microsecond=0)
+    parsed_untill = flipside_config.swaps_realtime_parsed_untill_inserted_timestamp
+    if parsed_untill is None:
+        # Первый запуск режима: начинаем с последнего окна, историю собирает основной режим
+        return end_time - timedelta(minutes=REALTIME_WINDOW_MINUTES), end_time
+    return parsed_untill.astimezone(utc_tz), end_time
+
+
+async def process_realtime_window(
+    flipside_config,
+    start_time,
+    end_time,
+    source,
+) -> bool:
+    """
+    Собирает и импортирует свапы, вставленные в Flipside за окно [start_time, end_time).
+    Окно захватывает REALTIME_OVERLAP_MINUTES предыдущего: строки, вставленные с опозданием, не теряются.
+    Транзакция импортируется целиком и один раз, строки ez_dex и Jupiter которой могут попасть в разные окна:
+    - найденная только в одной таблице транзакция со свежим блоком откладывается до следующего окна;
+    - транзакция, свапы которой уже есть в БД, пропускается целиком.
+    Свапы с блоками раньше swaps_realtime_from_block_timestamp - диапазон основного режима.
+    Возвращает False, если окно пока не собрать
+    """
+    start_parsing = datetime.now()
+    logger.info("-" * 50)
+    logger.info(f"Начинаем сбор свапов, вставленных за {start_time} - {end_time}")
+    fetch_start_time = start_time - timedelta(minutes=REALTIME_OVERLAP_MINUTES)
+    swaps, swaps_jupiter = await fetch_period(
+        get_fetch_executor(),
+        fetch_start_time,
+        end_time,
+        source,
+        time_column=TIME_COLUMN_INSERTED,
+    )
+    fetched_counts = len(swaps), len(swaps_jupiter)
+    swaps, swaps_jupiter = await filter_realtime_transactions(flipside_config, swaps, swaps_jupiter, end_time)
+    block_timestamps_range = utils.get_block_timestamps_range(swaps + swaps_jupiter)
+    if not block_timestamps_range:
+        await db_utils.update_flipside_config_realtime_parsed_untill(flipside_config, parsed_untill=end_time)
+        record_period_volume(source, fetch_start_time, end_time, *fetched_counts)
+        return True
+
+    # Опоздавшие строки относятся к более ранним блокам - цены SOL берем по всему диапазону времени блоков
+    first_block_timestamp, last_block_timestamp = block_timestamps_range
+    last_minute = last_block_timestamp.replace(second=0, microsecond=0)
+    sol_prices = await db_utils.get_sol_prices(
+        minute_from=first_block_timestamp.replace(second=0, microsecond=0) - timedelta(minutes=1),
+        minute_to=last_minute + timedelta(minutes=1),
+    )
+    if not sol_prices.get(last_minute):
+        logger.error(f"Ошибка: Нету данных о цене соланы в {last_minute}!")
+        return False
+
+    await build_and_import_period(
+        swaps,
+        swaps_jupiter,
+        sol_prices,
+        start_parsing,
+        checkpoint=partial(
+            db_utils.update_flipside_config_realtime_parsed_untill,
+            flipside_config,
+            parsed_untill=end_time,
+            last_block_timestamp=last_block_timestamp,
+        ),
+    )
+    record_period_volume(source, fetch_start_time, end_time, *fetched_counts)
+    return True
 
 
-async def process():
+async def filter_realtime_transactions(flipside_config, swaps, swaps_jupiter, end_time):
+    """Свапы окна, которые импортирует режим реального времени (см. process_realtime_window)"""
+    realtime_from = flipside_config.swaps_realtime_from_block_timestamp
+    swaps = utils.filter_swaps_from_block_timestamp(swaps, realtime_from)
+    swaps_jupiter = utils.filter_swaps_from_block_timestamp(swaps_jupiter, realtime_from)
+
+    swaps, swaps_jupiter, held_tx_ids = utils.hold_incomplete_transactions(
+        swaps,
+        swaps_jupiter,
+        hold_from=end_time - timedelta(minutes=REALTIME_TX_HOLD_MINUTES),
+    )
+    if held_tx_ids:
+        logger.info(f"Отложено до следующего окна транзакций без строк второй таблицы: {len(held_tx_ids)}")
+
+    block_timestamps_range = utils.get_block_timestamps_range(swaps + swaps_jupiter)
+    if not block_timestamps_range:
+        return swaps, swaps_jupiter
+    first_block_timestamp, last_block_timestamp = block_timestamps_range
+    imported_tx_ids = await db_utils.get_imported_tx_hashes(
+        list({swap["tx_id"] for swap in (*swaps, *swaps_jupiter)}),
+        math.floor(first_block_timestamp.timestamp()),
+        math.ceil(last_block_timestamp.timestamp()),
+    )
+    if imported_tx_ids:
+        logger.info(f"Пропущено уже импортированных транзакций: {len(imported_tx_ids)}")
+    return utils.drop_transactions(swaps, imported_tx_ids), utils.drop_transactions(swaps_jupiter, imported_tx_ids)
+
+
+async def _process_realtime():
+    flipside_config = await db_utils.get_flipside_config()
+    if not flipside_config:
+        logger.error("Не найден FlipsideCrypto-конфиг в БД")
+        return
+
+    source = await create_flipside_source()
+    if not source:
+        return
+
+    start_time, end_time = get_realtime_start_end_time(flipside_config)
+    if flipside_config.swaps_realtime_from_block_timestamp is None:
+        # Граница режимов: блоки раньше нее собирает основной режим, с нее - только этот
+        await db_utils.set_flipside_config_realtime_from(flipside_config, start_time)
+        logger.info(f"Режим реального времени собирает блоки с {start_time}")
+    for start, end in utils.split_time_range_by_minutes(start_time, end_time, REALTIME_WINDOW_MINUTES):
+        try:
+            if not await process_realtime_window(flipside_config, start, end, source):
+                break
+        except NoActiveFlipsideAccountsException as e:
+            logger.error(e)
+            break
+
+    freshness = await db_utils.get_swaps_freshness()
+    if freshness is not None:
+        logger.info(
+            f"Свежесть данных: последний свап {flipside_config.swaps_last_block_timestamp} | отставание {freshness}"
+        )
+
+
+async def process_realtime(poll_seconds: float = REALTIME_POLL_SECONDS):
+    """
+    Режим близкий к реальному времени: каждые poll_seconds собираются небольшие окна по INSERTED_TIMESTAMP
+    с отставанием REALTIME_LAG_MINUTES, отметка - swaps_realtime_parsed_untill_inserted_timestamp
+    """
+    await init_db_async()
+    try:
+        while True:
+            await _process_realtime()
+            await asyncio.sleep(poll_seconds)
+    finally:
+        shutdown_fetch_executor()
+        await Tortoise.close_connections()
+
+
+async def process(
+    streaming: bool = False,
+    prefetch_depth: int = PREFETCH_DEPTH,
+    source: SwapSource | None = None,
+):
+    """source - источник свапов (по умолчанию Flipside), например FileSwapSource для загрузки из выгрузок"""
     await init_db_async()
     try:
-        await _process()
+        await _process(streaming=streaming, prefetch_depth=prefetch_depth, source=source)
     finally:
+        shutdown_fetch_executor()
         await Tortoise.close_connections()
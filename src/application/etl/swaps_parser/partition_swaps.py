@@ -0,0 +1,134 @@
+"""
+Секционирование таблицы swap по timestamp (PARTITION BY RANGE) и создание будущих секций.
+
+migrate: swap переименовывается в SOURCE_TABLE, на ее месте создается секционированная swap
+с секциями от первого свапа до SWAP_PARTITIONS_AHEAD периодов вперед и DEFAULT-секцией,
+свапы переносятся посекционно, количество сверяется, прежняя таблица удаляется (кроме --keep-old).
+Свапы без timestamp в секционированную таблицу не попадают - при их наличии миграция не начинается.
+Прерванная миграция продолжается повторным запуском: перенос идет с ON CONFLICT DO NOTHING.
+Парсер и бэкфилл на время миграции остановить. Перед migrate схема swap приводится к моделям (update_schema):
+секционированная таблица создается по образцу прежней, включая swap_index.
+
+ensure: создает секции будущих периодов - запускать по расписанию (парсер создает их и сам перед импортом).
+
+Запуск: python -m src.application.etl.swaps_parser.partition_swaps migrate [--interval week] [--keep-old]
+        python -m src.application.etl.swaps_parser.partition_swaps ensure
+"""
+
+import argparse
+import asyncio
+from datetime import datetime, timezone
+
+from tortoise import Tortoise
+
+from src.infra.db import partitions
+from src.infra.db.models.tortoise import Swap
+from src.infra.db.setup_tortoise import init_db_async
+
+from . import db_utils
+from .config import SWAP_PARTITION_INTERVAL, SWAP_PARTITIONS_AHEAD
+from .logger import logger
+
+SOURCE_TABLE = "swap_unpartitioned"
+
+
+class PartitionMigrationNullTimestampsException(Exception):
+    def __init__(self, table_name, null_timestamps_count):
+        super().__init__(
+            f"Свапов без timestamp в {table_name}: {null_timestamps_count} - заполните timestamp или удалите их "
+            f"и повторите migrate"
+        )
+
+
+class PartitionMigrationException(Exception):
+    def __init__(self, source_rows_count, rows_count):
+        super().__init__(
+            f"Перенесено свапов: {rows_count} из {source_rows_count} - {SOURCE_TABLE} не удалена, " f"повторите migrate"
+        )
+
+
+async def migrate(
+    interval: str = SWAP_PARTITION_INTERVAL,
+    ahead: int = SWAP_PARTITIONS_AHEAD,
+    keep_old: bool = False,
+) -> None:
+    table_name = Swap._meta.db_table
+    table_kind = await db_utils.get_table_kind(table_name)
+    if table_kind == "p":
+        if not await db_utils.get_table_kind(SOURCE_TABLE):
+            logger.info(f"{table_name} уже секционирована")
+            return
+        logger.info(f"{table_name} уже секционирована - продолжаем перенос из {SOURCE_TABLE}")
+        source_range = await db_utils.get_timestamps_range(SOURCE_TABLE)
+        if source_range["null_timestamps_count"]:
+            raise PartitionMigrationNullTimestampsException(SOURCE_TABLE, source_range["null_timestamps_count"])
+    else:
+        # Проверяем до переименования: timestamp входит в ключ секционированной таблицы
+        source_range = await db_utils.get_timestamps_range(table_name)
+        if source_range["null_timestamps_count"]:
+            raise PartitionMigrationNullTimestampsException(table_name, source_range["null_timestamps_count"])
+        await db_utils.create_partitioned_swap_table(SOURCE_TABLE)
+        logger.info(f"{table_name} переименована в {SOURCE_TABLE}, создана секционированная {table_name}")
+    now = datetime.now(timezone.utc)
+    start_time = (
+        datetime.fromtimestamp(source_range["min_timestamp"], timezone.utc)
+        if source_range["min_timestamp"] is not None
+        else now
+    )
+    created = await db_utils.ensure_swap_partitions(start_time, now, interval, ahead)
+    logger.info(f"Создано секций: {len(created)}")
+
+    started = datetime.now()
+    periods = partitions.split_into_partitions(start_time, now, interval)
+    for number, (start, end) in enumerate(periods, 1):
+        if source_range["max_timestamp"] is None or start.timestamp() > source_range["max_timestamp"]:
+            break
+        period_started = datetime.now()
+        inserted = await db_utils.copy_swaps_to_partitioned(SOURCE_TABLE, int(start.timestamp()), int(end.timestamp()))
+        logger.info(
+            f"[{number}/{len(periods)}] {partitions.partition_name(table_name, start, interval)} "
+            f"| перенесено свапов: {inserted} | {datetime.now() - period_started}"
+        )
+
+    rows_count = (await db_utils.get_timestamps_range(table_name))["rows_count"]
+    if rows_count < source_range["rows_count"]:
+        raise PartitionMigrationException(source_range["rows_count"], rows_count)
+    await db_utils.analyze_tables([table_name])
+    logger.info(f"Перенесено свапов: {rows_count} | {datetime.now() - started}")
+    if not keep_old:
+        await db_utils.drop_table(SOURCE_TABLE)
+        logger.info(f"{SOURCE_TABLE} удалена")
+
+
+async def ensure(interval: str = SWAP_PARTITION_INTERVAL, ahead: int = SWAP_PARTITIONS_AHEAD) -> None:
+    now = datetime.now(timezone.utc)
+    if await db_utils.get_table_kind(Swap._meta.db_table) != "p":
+        logger.warning(f"{Swap._meta.db_table} не секционирована - сначала migrate")
+        return
+    created = await db_utils.ensure_swap_partitions(now, now, interval, ahead)
+    logger.info(f"Создано секций: {len(created)} {created}")
+
+
+async def main(command: str, interval: str, ahead: int, keep_old: bool = False) -> None:
+    await init_db_async()
+    try:
+        if command == "migrate":
+            await migrate(interval, ahead, keep_old)
+        else:
+            await ensure(interval, ahead)
+    finally:
+        await Tortoise.close_connections()
+
+
+if __name__ == "__main__":
+    arg_parser = argparse.ArgumentParser(description="Секционирование swap по timestamp")
+    arg_parser.add_argument("command", choices=("migrate", "ensure"))
+    arg_parser.add_argument(
+        "--interval",
+        choices=(partitions.PARTITION_MONTH, partitions.PARTITION_WEEK),
+        default=SWAP_PARTITION_INTERVAL,
+    )
+    arg_parser.add_argument("--ahead", type=int, default=SWAP_PARTITIONS_AHEAD, help="Будущих периодов")
+    arg_parser.add_argument("--keep-old", action="store_true", help=f"Не удалять {SOURCE_TABLE} после переноса")
+    args = arg_parser.parse_args()
+    asyncio.run(main(args.command, args.interval, args.ahead, args.keep_old))
@@ -1,60 +1,104 @@
+"""
+Откат свапов за диапазон времени.
+
+Диапазон делится на батчи по ROLLBACK_BATCH_MINUTES, каждый откатывается одной транзакцией:
+свапы удаляются, WalletToken затронутых пар пересчитываются с нуля по оставшимся свапам
+(пары без свапов удаляются), время последней активности кошельков берется из оставшихся WalletToken,
+а их статистики ставятся в начало очереди пересчета.
+
+Запуск: python -m src.application.etl.swaps_parser.rollback 2025-02-18T10:00 2025-02-18T11:00 [--dry-run]
+"""
+
+import argparse
 import asyncio
-import logging
+from datetime import datetime
 
-import aiohttp
 from tortoise import Tortoise
 
-from src.infra.db.models.tortoise import (
-    Swap,
-    WalletToken,
-)
-from src.infra.db.setup_tortoise import (
-    init_db_async,
-)
-from src.settings import config
-
-logger = logging.getLogger()
-logger.setLevel(logging.INFO)
-
-TIMESTAMP_FROM: int = "timestamp_from"
-
-
-async def process():
-    swaps = await Swap.filter(timestamp__gte=TIMESTAMP_FROM).order_by("timestamp").all()
-    print(len(swaps))
-    processed = 0
-    for activity in swaps[1:]:
-        stats = await WalletToken.filter(
-            token_id=activity.token_id,
-            wallet_id=activity.wallet_id,
-        ).first()
-        if activity.event_type == "buy":
-            stats.total_buys_count -= 1
-            stats.total_buy_amount_usd -= activity.cost_usd if activity.cost_usd else 0
-            stats.total_buy_amount_token -= activity.token_amount if activity.token_amount else 0
-        else:
-            stats.total_sales_count -= 1
-            stats.total_sell_amount_usd -= activity.cost_usd if activity.cost_usd else 0
-            stats.total_sell_amount_token -= activity.token_amount if activity.token_amount else 0
-
-        if activity.is_part_of_transaction_with_mt_3_swappers:
-            stats.total_swaps_from_txs_with_mt_3_swappers -= 1
-        if activity.is_part_of_arbitrage_swap_event:
-            stats.total_swaps_from_arbitrage_swap_events -= 1
-        await stats.save()
-        # print(activity.__dict__)
-        # print(stats.__dict__)
-        processed += 1
-        print(processed)
-
-
-async def main():
+from src.infra.db.setup_tortoise import init_db_async
+
+from . import db_utils, utils
+from .config import ROLLBACK_BATCH_MINUTES
+from .logger import logger
+
+REPORT_FIELDS = ("swaps_count", "pairs_count", "removed_pairs_count", "wallets_count", "tokens_count")
+ROLLBACK_FIELDS = ("swaps_count", "updated_pairs_count", "removed_pairs_count", "wallets_count")
+
+
+async def report(start_time, end_time, batch_minutes: int = ROLLBACK_BATCH_MINUTES) -> dict:
+    """Dry-run: что будет удалено по батчам. Кол-во кошельков и токенов суммируется по батчам"""
+    total = dict.fromkeys(REPORT_FIELDS, 0)
+    for start, end in utils.split_time_range_by_minutes(start_time, end_time, batch_minutes):
+        batch = await db_utils.get_rollback_report(int(start.timestamp()), int(end.timestamp()))
+        if not batch["swaps_count"]:
+            continue
+        for field in REPORT_FIELDS:
+            total[field] += batch[field]
+        logger.info(
+            f"[dry-run] {start} - {end} | свапов: {batch['swaps_count']} | пар: {batch['pairs_count']} "
+            f"(удалится: {batch['removed_pairs_count']}) | кошельков: {batch['wallets_count']} "
+            f"| токенов: {batch['tokens_count']}"
+        )
+    return total
+
+
+async def rollback(start_time, end_time, batch_minutes: int = ROLLBACK_BATCH_MINUTES) -> dict:
+    total = dict.fromkeys(ROLLBACK_FIELDS, 0)
+    batches = utils.split_time_range_by_minutes(start_time, end_time, batch_minutes)
+    started = datetime.now()
+    for number, (start, end) in enumerate(batches, 1):
+        batch_started = datetime.now()
+        batch = await db_utils.rollback_swaps(int(start.timestamp()), int(end.timestamp()))
+        for field in ROLLBACK_FIELDS:
+            total[field] += batch[field]
+        elapsed = datetime.now() - batch_started
+        logger.info(
+            f"[{number}/{len(batches)}] Откат {start} - {end} | свапов: {batch['swaps_count']} "
+            f"| WalletToken пересчитано: {batch['updated_pairs_count']}, удалено: {batch['removed_pairs_count']} "
+            f"| кошельков: {batch['wallets_count']} | {elapsed} "
+            f"| свапов/сек: {round(batch['swaps_count'] / max(elapsed.total_seconds(), 1e-9))}"
+        )
+    logger.info(f"Откат за {start_time} - {end_time} завершен: {total} | {datetime.now() - started}")
+    return total
+
+
+async def reset_parsed_untill(start_time) -> None:
+    """Сдвигает отметку собранного периода на начало отката, чтобы парсер собрал диапазон заново"""
+    flipside_config = await db_utils.get_flipside_config()
+    if flipside_config.swaps_parsed_untill_inserted_timestamp > start_time:
+        await db_utils.update_flipside_config_swaps_parsed_untill(flipside_config, start_time)
+        logger.info(f"swaps_parsed_untill сдвинут на {start_time}")
+
+
+async def main(
+    start_time,
+    end_time,
+    batch_minutes: int = ROLLBACK_BATCH_MINUTES,
+    dry_run: bool = False,
+    reparse: bool = False,
+) -> None:
+    """
+    Откат свапов за [start_time, end_time). Не запускать одновременно с парсером
+    """
     await init_db_async()
     try:
-        await process()
+        if dry_run:
+            total = await report(start_time, end_time, batch_minutes)
+            logger.info(f"[dry-run] Откат за {start_time} - {end_time}: {total}")
+            return
+        await rollback(start_time, end_time, batch_minutes)
+        if reparse:
+            await reset_parsed_untill(start_time)
     finally:
         await Tortoise.close_connections()
 
 
 if __name__ == "__main__":
-    asyncio.run(main())
+    arg_parser = argparse.ArgumentParser(description="Откат свапов за диапазон с пересчетом WalletToken и кошельков")
+    arg_parser.add_argument("start_time", type=utils.parse_datetime)
+    arg_parser.add_argument("end_time", type=utils.parse_datetime)
+    arg_parser.add_argument("--batch-minutes", type=int, default=ROLLBACK_BATCH_MINUTES)
+    arg_parser.add_argument("--dry-run", action="store_true", help="Только отчет, без изменений")
+    arg_parser.add_argument("--reparse", action="store_true", help="Сдвинуть swaps_parsed_untill на начало диапазона")
+    args = arg_parser.parse_args()
+    asyncio.run(main(args.start_time, args.end_time, args.batch_minutes, args.dry_run, args.reparse))
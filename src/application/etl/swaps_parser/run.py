@@ -1,6 +1,7 @@
 import asyncio
+import sys
 
-from .parser import process
+from .parser import process, process_realtime
 
 
 async def main():
@@ -10,4 +11,5 @@ async def main():
 
 
 if __name__ == "__main__":
-    asyncio.run(main())
+    # --realtime - сбор по INSERTED_TIMESTAMP с отставанием в минуты вместо суток
+    asyncio.run(process_realtime() if "--realtime" in sys.argv else main())
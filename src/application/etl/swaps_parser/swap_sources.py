@@ -0,0 +1,261 @@
+import bisect
+import importlib.util
+import threading
+from abc import ABC, abstractmethod
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+
+import orjson
+
+from .config import FLIPSIDE_PAGE_LIMIT, TIME_COLUMN_BLOCK, TIME_COLUMN_INSERTED
+from .fake_flipside import EZ_DEX_SWAPS_TABLE, JUPITER_SWAPS_TABLE, generate_minute_swaps
+from .flipside_queries import get_swaps, get_swaps_jupiter
+from .interval_planner import SOURCE_EZ_DEX_SWAPS, SOURCE_JUPITER
+from .logger import logger
+from .utils import parse_block_timestamp
+
+NDJSON_SUFFIX = ".ndjson"
+PARQUET_SUFFIX = ".parquet"
+
+
+class SwapSource(ABC):
+    """
+    Источник свапов для fetch_data_for_period: отдает одну страницу записей в формате Flipside
+    (tx_id, block_id, swapper, swap_from_mint, swap_to_mint, swap_from_amount, swap_to_amount,
+    block_timestamp, cursor_id), упорядоченных по cursor_id
+    """
+
+    name: str
+    # Пул учеток Flipside, если источнику нужны API-ключи (запросы ограничиваются и распределяются пулом)
+    account_pool = None
+    # Имеет ли смысл кэшировать страницы на диске (page_cache)
+    cacheable = False
+
+    @abstractmethod
+    def get_page(
+        self,
+        start_time: datetime,
+        end_time: datetime,
+        is_jupiter: bool = False,
+        offset: int = 0,
+        limit: int | None = None,
+        after_id: str | None = None,
+        time_column: str = TIME_COLUMN_BLOCK,
+        apikey: str | None = None,
+    ) -> tuple[list[dict], int]:
+        """Записи страницы и их кол-во"""
+
+
+class FlipsideSwapSource(SwapSource):
+    """Запросы к Flipside. client - подменный клиент (например, FakeFlipside), иначе клиент по API-ключу"""
+
+    name = "flipside"
+    cacheable = True
+
+    def __init__(self, account_pool=None, client=None):
+        self.account_pool = account_pool
+        self.client = client
+
+    def get_page(
+        self,
+        start_time,
+        end_time,
+        is_jupiter=False,
+        offset=0,
+        limit=None,
+        after_id=None,
+        time_column=TIME_COLUMN_BLOCK,
+        apikey=None,
+    ):
+        get_page = get_swaps_jupiter if is_jupiter else get_swaps
+        return get_page(
+            apikey,
+            start_time,
+            end_time,
+            offset=offset,
+            limit=limit,
+            after_id=after_id,
+            client=self.client,
+            time_column=time_column,
+        )
+
+
+class InMemorySwapSource(SwapSource):
+    """
+    Источник, у которого все записи интервала доступны локально.
+    Записи интервала сортируются по cursor_id один раз, страницы нарезаются из отсортированного списка
+    """
+
+    def __init__(self, max_cached_intervals: int = 64):
+        self.max_cached_intervals = max_cached_intervals
+        self._intervals = {}
+        self._lock = threading.Lock()
+
+    @abstractmethod
+    def get_rows(self, table: str, start_time: datetime, end_time: datetime, time_column: str) -> list[dict]:
+        """Все записи таблицы за [start_time, end_time) по колонке времени time_column"""
+
+    def get_page(
+        self,
+        start_time,
+        end_time,
+        is_jupiter=False,
+        offset=0,
+        limit=None,
+        after_id=None,
+        time_column=TIME_COLUMN_BLOCK,
+        apikey=None,
+    ):
+        limit = limit or FLIPSIDE_PAGE_LIMIT
+        rows, cursor_ids = self._get_sorted_rows(
+            SOURCE_JUPITER if is_jupiter else SOURCE_EZ_DEX_SWAPS,
+            start_time,
+            end_time,
+            time_column,
+        )
+        first = bisect.bisect_right(cursor_ids, after_id) if after_id is not None else offset
+        # Сборка объектов изменяет записи, поэтому отдаем копии
+        records = [row.copy() for row in rows[first : first + limit]]
+        return records, len(records)
+
+    def _get_sorted_rows(self, table, start_time, end_time, time_column):
+        key = (table, start_time, end_time, time_column)
+        with self._lock:
+            cached = self._intervals.get(key)
+        if cached is not None:
+            return cached
+        rows = sorted(self.get_rows(table, start_time, end_time, time_column), key=lambda row: row["cursor_id"])
+        cached = rows, [row["cursor_id"] for row in rows]
+        with self._lock:
+            if len(self._intervals) >= self.max_cached_intervals:
+                self._intervals.pop(next(iter(self._intervals)))
+            self._intervals[key] = cached
+        return cached
+
+
+class SyntheticSwapSource(InMemorySwapSource):
+    """Детерминированно сгенерированные свапы - воспроизводимые бенчмарки всего конвейера без сети"""
+
+    name = "synthetic"
+
+    def __init__(
+        self,
+        swaps_per_minute: int = 1000,
+        jupiter_swaps_per_minute: int | None = None,
+        seed: int = 0,
+        max_cached_intervals: int = 64,
+    ):
+        super().__init__(max_cached_intervals)
+        self.swaps_per_minute = {
+            SOURCE_EZ_DEX_SWAPS: swaps_per_minute,
+            SOURCE_JUPITER: (
+                jupiter_swaps_per_minute if jupiter_swaps_per_minute is not None else swaps_per_minute // 3
+            ),
+        }
+        self.seed = seed
+
+    def get_rows(self, table, start_time, end_time, time_column):
+        # Время вставки имитируется временем блока
+        flipside_table = JUPITER_SWAPS_TABLE if table == SOURCE_JUPITER else EZ_DEX_SWAPS_TABLE
+        rows = []
+        minute = start_time.replace(second=0, microsecond=0)
+        while minute < end_time:
+            rows.extend(
+                generate_minute_swaps(minute, self.swaps_per_minute[table], table=flipside_table, seed=self.seed)
+            )
+            minute += timedelta(minutes=1)
+        return [row for row in rows if start_time <= parse_block_timestamp(row["block_timestamp"]) < end_time]
+
+
+class FileSwapSource(InMemorySwapSource):
+    """
+    Выгрузки свапов на диске: {directory}/ez_dex_swaps/*.ndjson|*.parquet и {directory}/jupiter/*.
+    Файлы таблицы читаются целиком при первом обращении и индексируются по времени -
+    интервалы выбираются бинарным поиском без сети и без кэша страниц
+    """
+
+    name = "file"
+
+    def __init__(self, directory: str | Path, max_cached_intervals: int = 64):
+        super().__init__(max_cached_intervals)
+        self.directory = Path(directory)
+        # pyarrow не входит в зависимости парсера - выгрузки Parquet отклоняются до начала сбора
+        parquet_files_count = len(list(self.directory.glob(f"*/*{PARQUET_SUFFIX}")))
+        if parquet_files_count and importlib.util.find_spec("pyarrow") is None:
+            raise RuntimeError(
+                f"В {self.directory} выгрузок Parquet: {parquet_files_count} - для их чтения установите pyarrow "
+                f"или выгрузите свапы в NDJSON"
+            )
+        self._tables = {}
+        self._tables_lock = threading.Lock()
+
+    def get_rows(self, table, start_time, end_time, time_column):
+        timestamps, rows = self._load_table(table, time_column)
+        first = bisect.bisect_left(timestamps, start_time.timestamp())
+        last = bisect.bisect_left(timestamps, end_time.timestamp())
+        return rows[first:last]
+
+    def _load_table(self, table: str, time_column: str) -> tuple[list[float], list[dict]]:
+        key = (table, time_column)
+        with self._tables_lock:
+            if key not in self._tables:
+                self._tables[key] = self._index_rows(self._read_table(table), time_column)
+            return self._tables[key]
+
+    def _read_table(self, table: str) -> list[dict]:
+        rows = []
+        paths = sorted(
+            path for path in (self.directory / table).glob("*") if path.suffix in (NDJSON_SUFFIX, PARQUET_SUFFIX)
+        )
+        for file_number, path in enumerate(paths):
+            file_rows = read_parquet(path) if path.suffix == PARQUET_SUFFIX else read_ndjson(path)
+            for row_number, row in enumerate(file_rows):
+                # Выгрузки без ID Flipside: курсор - позиция строки в файлах
+                row.setdefault("cursor_id", f"{file_number:06d}{row_number:012d}")
+            rows.extend(file_rows)
+        logger.info(f"Прочитано {len(rows)} свапов {table} из {len(paths)} файлов {self.directory / table}")
+        return rows
+
+    @staticmethod
+    def _index_rows(rows: list[dict], time_column: str) -> tuple[list[float], list[dict]]:
+        column = time_column.lower()
+        if time_column == TIME_COLUMN_INSERTED and rows and column not in rows[0]:
+            column = TIME_COLUMN_BLOCK.lower()
+        timestamps = [parse_block_timestamp(row[column]).timestamp() for row in rows]
+        order = sorted(range(len(rows)), key=timestamps.__getitem__)
+        return [timestamps[i] for i in order], [rows[i] for i in order]
+
+
+def read_ndjson(path: Path) -> list[dict]:
+    with open(path, "rb") as f:
+        return [orjson.loads(line) for line in f if line.strip()]
+
+
+def write_ndjson(path: str | Path, records: list[dict]) -> None:
+    """Записывает свапы в NDJSON - формат выгрузок для FileSwapSource"""
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with open(path, "wb") as f:
+        for record in records:
+            f.write(orjson.dumps(record))
+            f.write(b"\n")
+
+
+def read_parquet(path: Path) -> list[dict]:
+    try:
+        import pyarrow.parquet as pq
+    except ImportError as e:
+        raise RuntimeError(f"Для чтения {path} нужен pyarrow") from e
+    rows = pq.read_table(path).to_pylist()
+    # Колонки времени в Parquet - timestamp, приводим к ISO-строкам как в ответах Flipside
+    for row in rows:
+        for column, value in row.items():
+            if isinstance(value, datetime):
+                row[column] = format_timestamp(value)
+    return rows
+
+
+def format_timestamp(value: datetime) -> str:
+    if value.tzinfo is not None:
+        value = value.astimezone(timezone.utc)
+    return value.strftime("%Y-%m-%dT%H:%M:%S.%f")[:-3] + "Z"
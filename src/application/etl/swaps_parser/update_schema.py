@@ -0,0 +1,73 @@
+"""
+Приведение схемы существующей БД к моделям парсера: схемы не генерируются (generate_schemas=False),
+а миграций в репозитории нет. Обновление идемпотентно - выполненные шаги при повторном запуске пропускаются:
+1. flipsidecrypto_config: колонки режима реального времени и свежести данных;
+2. wallet_change_log: журнал изменившихся кошельков для пересчета статистик;
+3. swap.swap_index: колонка добавляется вместе с нумерацией уже сохраненных свапов в одной транзакции -
+   номер среди свапов транзакции с тем же кошельком, токеном и типом в порядке utils.assign_swap_indexes,
+   поэтому повторный сбор сохраненного периода дает те же ключи дедупликации;
+4. swap.timestamp NOT NULL - при свапах без timestamp обновление останавливается;
+5. ключ дедупликации swap (tx_hash, wallet_id, token_id, event_type, swap_index, timestamp).
+
+Запускать до первого запуска новой версии парсера и бэкфилла и до partition_swaps migrate (секционированная swap
+создается по образцу существующей, включая swap_index). Парсер на время обновления остановить:
+шаги 3-5 блокируют запись в swap.
+
+Запуск: python -m src.application.etl.swaps_parser.update_schema
+"""
+
+import asyncio
+
+from tortoise import Tortoise
+
+from src.infra.db import queries
+from src.infra.db.models.tortoise import Swap
+from src.infra.db.setup_tortoise import init_db_async
+
+from . import db_utils
+from .logger import logger
+
+
+class SchemaUpdateNullTimestampsException(Exception):
+    def __init__(self, table_name, null_timestamps_count):
+        super().__init__(
+            f"Свапов без timestamp в {table_name}: {null_timestamps_count} - заполните timestamp или удалите их "
+            f"и повторите обновление схемы"
+        )
+
+
+async def update_schema() -> None:
+    table_name = Swap._meta.db_table
+
+    await db_utils.add_flipside_config_columns()
+    await db_utils.create_wallet_change_log_table()
+    logger.info("Колонки flipsidecrypto_config и таблица wallet_change_log на месте")
+
+    if await db_utils.get_column_is_nullable(table_name, "swap_index") is None:
+        numbered = await db_utils.add_swap_index_column()
+        logger.info(f"Добавлена {table_name}.swap_index, пронумеровано свапов с общим ключом: {numbered}")
+
+    if await db_utils.get_column_is_nullable(table_name, "timestamp"):
+        null_timestamps_count = (await db_utils.get_timestamps_range(table_name))["null_timestamps_count"]
+        if null_timestamps_count:
+            raise SchemaUpdateNullTimestampsException(table_name, null_timestamps_count)
+        await db_utils.set_swap_timestamp_not_null()
+        logger.info(f"{table_name}.timestamp - NOT NULL")
+
+    if not await db_utils.has_unique_index(table_name, queries.SWAP_DEDUP_KEY_COLUMNS):
+        await db_utils.add_swap_dedup_constraint()
+        logger.info(f"Создан ключ дедупликации {table_name}")
+
+    logger.info("Схема соответствует моделям")
+
+
+async def main() -> None:
+    await init_db_async()
+    try:
+        await update_schema()
+    finally:
+        await Tortoise.close_connections()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -1,6 +1,5 @@
-import uuid
 from collections import defaultdict
-from datetime import datetime
+from datetime import datetime, timedelta, timezone
 from decimal import Decimal
 from typing import List, Tuple
 
@@ -13,14 +12,18 @@ from src.infra.db.models.tortoise import (
     WalletStatistic30d,
     WalletStatisticAll,
 )
+from src.infra.db.uuid7 import uuid7_batch
 
-from .config import SOL_ADDRESS
+from . import columnar
+from .config import COLUMNAR_TRANSFORM, ROUTER_ADDRESSES, SOL_ADDRESS
 from .logger import logger
 
 
-def populate_swaps_data(mapped_swaps: dict):
-    """Дополняет данные свапов дополнительной информацией"""
-    okx_wallet = "HV1KXxWFaSeriyFvXyx48FqG9BoFbfinB8njCJonqP7K"
+def populate_swaps_data(mapped_swaps: dict, router_addresses=ROUTER_ADDRESSES):
+    """
+    Дополняет данные свапов дополнительной информацией.
+    Пакетный аналог - columnar.annotate_swaps (при COLUMNAR_TRANSFORM)
+    """
     for tx_id, _swaps in mapped_swaps.items():
         swappers = defaultdict(lambda: defaultdict(list))
         swaps_count = len(_swaps)
@@ -41,8 +44,9 @@ def populate_swaps_data(mapped_swaps: dict):
                         if len(events) >= 2 and ("buy" in events and "sell" in events):
                             swap["is_part_of_arbitrage_swap_event"] = True
             elif swappers_count == 2:
-                if okx_wallet in swappers_list:
-                    real_swapper = swappers_list[0] if swappers_list[1] == okx_wallet else swappers_list[1]
+                routers = [swapper for swapper in swappers_list if swapper in router_addresses]
+                if len(routers) == 1:
+                    real_swapper = swappers_list[0] if swappers_list[1] == routers[0] else swappers_list[1]
                     for swap in _swaps:
                         swap["swapper"] = real_swapper
             elif swappers_count >= 3:
@@ -67,8 +71,12 @@ def combine_swaps(swaps: list[dict], swaps_jupiter: list[dict]):
 
     mapped_swaps = mapped_swaps_all | mapped_swaps_jupiter
 
-    populate_swaps_data(mapped_swaps)
-    combined_swaps = [swap for _swaps in mapped_swaps.values() for swap in _swaps]
+    if COLUMNAR_TRANSFORM:
+        combined_swaps = [swap for _swaps in mapped_swaps.values() for swap in _swaps]
+        columnar.annotate_swaps(combined_swaps)
+    else:
+        populate_swaps_data(mapped_swaps)
+        combined_swaps = [swap for _swaps in mapped_swaps.values() for swap in _swaps]
 
     logger.debug(
         f"\nСвапов - Всего: {len(swaps)} | Юпитер: {len(swaps_jupiter)}"
@@ -103,6 +111,19 @@ def filter_swaps(
     return filtered_swaps
 
 
+def split_swaps_by_wallet(swaps: list[dict], parts_count: int) -> list[list[dict]]:
+    """
+    Делит свапы на parts_count частей по хэшу адреса кошелька: все свапы кошелька попадают в одну часть.
+    Делить после combine_swaps - разметка уровня транзакции требует всех свапов транзакции
+    """
+    if parts_count <= 1:
+        return [swaps]
+    parts = [[] for _ in range(parts_count)]
+    for swap in swaps:
+        parts[columnar.wallet_part(swap["swapper"], parts_count)].append(swap)
+    return parts
+
+
 def extract_and_build_objects(
     swaps: list,
     sol_prices: dict,
@@ -113,6 +134,8 @@ def extract_and_build_objects(
     tokens = []
     unique_wallet_addresses = set()
     unique_token_addresses = set()
+    # ID пачкой: возрастают по времени создания - вставки идут в правый край индекса первичного ключа
+    ids = uuid7_batch(len(swaps))
 
     for swap in swaps:
         if not all([swap["swapper"], swap["tx_id"]]):
@@ -141,7 +164,7 @@ def extract_and_build_objects(
         price_usd = Decimal(str(cost_usd / token_amount)) if token_amount else None
 
         activity = Swap(
-            id=uuid.uuid1(),
+            id=ids[len(activities)],
             tx_hash=swap["tx_id"],
             block_id=swap["block_id"],
             timestamp=swap_datetime.timestamp(),
@@ -176,6 +199,78 @@ def extract_and_build_objects(
     return wallets, tokens, activities
 
 
+def parse_block_timestamp(iso_string: str) -> datetime:
+    return datetime.fromisoformat(iso_string.replace("Z", "+00:00"))
+
+
+def parse_datetime(value: str) -> datetime:
+    """Время из аргумента командной строки, без часового пояса - UTC"""
+    parsed = datetime.fromisoformat(value)
+    return parsed if parsed.tzinfo else parsed.replace(tzinfo=timezone.utc)
+
+
+def get_block_timestamps_range(swaps: list[dict]) -> Tuple[datetime, datetime] | None:
+    """Мин. и макс. время блока среди свапов (строки Flipside в одном формате, сравниваются как строки)"""
+    if not swaps:
+        return None
+    block_timestamps = [swap["block_timestamp"] for swap in swaps]
+    return parse_block_timestamp(min(block_timestamps)), parse_block_timestamp(max(block_timestamps))
+
+
+def filter_swaps_from_block_timestamp(swaps: list[dict], from_block_timestamp: datetime) -> list[dict]:
+    """Свапы с временем блока не раньше from_block_timestamp"""
+    return [swap for swap in swaps if parse_block_timestamp(swap["block_timestamp"]) >= from_block_timestamp]
+
+
+def hold_incomplete_transactions(
+    swaps: list[dict],
+    swaps_jupiter: list[dict],
+    hold_from: datetime,
+) -> Tuple[list[dict], list[dict], set[str]]:
+    """
+    Откладывает транзакции, найденные только в одной из таблиц, с блоком не раньше hold_from:
+    строки второй таблицы могут появиться в Flipside позже. Возвращает оставшиеся свапы и отложенные tx_id
+    """
+    tx_ids = {swap["tx_id"] for swap in swaps}
+    tx_ids_jupiter = {swap["tx_id"] for swap in swaps_jupiter}
+    held_tx_ids = {
+        swap["tx_id"]
+        for swap in (*swaps, *swaps_jupiter)
+        if (swap["tx_id"] in tx_ids) != (swap["tx_id"] in tx_ids_jupiter)
+        and parse_block_timestamp(swap["block_timestamp"]) >= hold_from
+    }
+    return (
+        drop_transactions(swaps, held_tx_ids),
+        drop_transactions(swaps_jupiter, held_tx_ids),
+        held_tx_ids,
+    )
+
+
+def drop_transactions(swaps: list[dict], tx_ids: set[str]) -> list[dict]:
+    if not tx_ids:
+        return swaps
+    return [swap for swap in swaps if swap["tx_id"] not in tx_ids]
+
+
+def assign_swap_indexes(activities: List[Swap]) -> None:
+    """
+    Проставляет swap_index - номер свапа среди свапов транзакции с тем же кошельком, токеном и типом.
+    Порядок внутри группы задается суммами, а не порядком записей Flipside,
+    поэтому повторный сбор того же периода дает те же ключи дедупликации
+    """
+    groups = defaultdict(list)
+    for activity in activities:
+        key = (activity.tx_hash, activity.wallet_address, activity.token_address, activity.event_type)
+        groups[key].append(activity)
+    for group in groups.values():
+        if len(group) == 1:
+            group[0].swap_index = 0
+            continue
+        group.sort(key=lambda activity: (activity.quote_amount, activity.token_amount, activity.block_id))
+        for index, activity in enumerate(group):
+            activity.swap_index = index
+
+
 def split_time_range(start_time, end_time, parts):
     """Разбивает временной промежуток на равные части"""
     delta = (end_time - start_time) / parts
@@ -196,6 +291,17 @@ def split_time_range(start_time, end_time, parts):
     return intervals
 
 
+def split_time_range_by_minutes(start_time, end_time, minutes):
+    """Разбивает временной промежуток на части по minutes минут, последняя часть может быть короче"""
+    intervals = []
+    current_time = start_time
+    while current_time < end_time:
+        next_time = min(current_time + timedelta(minutes=minutes), end_time)
+        intervals.append((current_time, next_time))
+        current_time = next_time
+    return intervals
+
+
 def create_wallets_relations(wallets):
     wallet_details = []
     wallet_stats_7d = []
@@ -37,6 +37,10 @@ from .utils import (
 
 logger = logging.getLogger("tasks.update_wallet_statistics")
 
+WALLETS_COUNT = 100_000  # Кошельков на один проход
+SHIFTED_WINDOWS_LOOKBACK_DAYS = 2  # Глубина поиска токенов, покинувших окна 7d/30d, от последнего пересчета
+IDLE_SLEEP_SECONDS = 60  # Пауза, если пересчитывать нечего
+
 
 async def update_single_wallet_statistics(
     wallet_id,
@@ -56,14 +60,43 @@ async def update_single_wallet_statistics(
     #     await Tortoise.close_connections()
 
 
+async def get_wallets_for_update(
+    count: int,
+    lookback_days: int = SHIFTED_WINDOWS_LOOKBACK_DAYS,
+) -> tuple[list[WalletEntity], list[tuple]]:
+    """
+    Кошельки для пересчета: сначала из журнала изменений, который пишет парсер свапов,
+    остаток - кошельки без новых свапов, у которых токены покинули окна 7d/30d.
+    Возвращает кошельки и прочитанные записи журнала
+    """
+    repository = TortoiseWalletRepository()
+    wallets, changes = await repository.get_changed_wallets_for_update_stats(count=count)
+    # Изменение из журнала (в т.ч. бэкфилл старой истории или откат) требует пересчета статистики за все время
+    for wallet in wallets:
+        wallet.last_stats_check = None
+    changed_count = len(wallets)
+    if len(changes) < count:
+        changed_ids = {wallet.id for wallet in wallets}
+        shifted_wallets = await repository.get_wallets_with_shifted_windows(
+            count=count - len(changes),
+            lookback_days=lookback_days,
+        )
+        wallets.extend(wallet for wallet in shifted_wallets if wallet.id not in changed_ids)
+    if changes:
+        earliest_change = datetime.fromtimestamp(min(change[1] for change in changes), tz=timezone.utc)
+        logger.info(f"Из журнала изменений: {changed_count} кошельков | самый ранний свап: {earliest_change}")
+    logger.info(f"Со сдвигом окон 7d/30d: {len(wallets) - changed_count} кошельков")
+    return wallets, changes
+
+
 async def receive_wallets_from_db(
     received_wallets_queue: Queue,
     count: int,
-):
-    """Загрузка данных из БД и помещение в очередь"""
+) -> tuple[int, list[tuple]]:
+    """Загрузка данных из БД и помещение в очередь. Возвращает кол-во кошельков и прочитанные записи журнала"""
     logger.info(f"Начинаем получение кошельков из БД")
     t1 = datetime.now()
-    wallets: list[WalletEntity] = await TortoiseWalletRepository().get_wallets_for_update_stats(count=count)
+    wallets, changes = await get_wallets_for_update(count=count)
     t2 = datetime.now()
     logger.info(f"Получили {len(wallets)} кошельков из БД | Время: {t2 - t1}")
     # Вместо того чтобы фетчить с БД просто создаем временные обьекты
@@ -77,6 +110,7 @@ async def receive_wallets_from_db(
     for wallet in wallets:
         await received_wallets_queue.put(wallet)
     await received_wallets_queue.put(None)
+    return len(wallets), changes
 
 
 async def fetch_wallet_tokens(
@@ -443,17 +477,24 @@ async def process_update_wallet_statistics():
         received_wallets_queue = Queue()
         fetched_wallets_queue = Queue()
         calculated_wallets_queue = Queue()
-        wallets_count = 100_000
+        await TortoiseWalletRepository().create_window_anchor_index()
         total_wallets_processed = 0
         total_tokens_processed = 0
         total_elapsed_time = 0
         while True:
             start = datetime.now()
             # Получаем кошельки для обновления из БД
-            await receive_wallets_from_db(
+            wallets_count, changes = await receive_wallets_from_db(
                 received_wallets_queue,
-                count=wallets_count,
+                count=WALLETS_COUNT,
             )
+            if not wallets_count:
+                await received_wallets_queue.get()  # Сигнал завершения пустой очереди
+                if changes:
+                    # Записи журнала только удаленных кошельков
+                    await TortoiseWalletRepository().delete_wallet_changes(changes)
+                await asyncio.sleep(IDLE_SLEEP_SECONDS)
+                continue
             # Запускаем обработку кошельков
             async with asyncio.TaskGroup() as tg:
                 tg.create_task(
@@ -477,6 +518,8 @@ async def process_update_wallet_statistics():
                         max_parallel=3,
                     )
                 )
+            # Пересчитанные изменения удаляем из журнала только после записи статистик
+            await TortoiseWalletRepository().delete_wallet_changes(changes)
             end = datetime.now()
             tokens_count = calc_task.result()
             elapsed_time = (end - start).total_seconds()
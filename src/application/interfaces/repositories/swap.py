@@ -28,6 +28,10 @@ class BaseSwapRepository(BaseGenericRepository[SwapEntity], ABC):
         blocks_before: int = 3,
         blocks_after: int = 3,
         exclude_wallets: Optional[List] = None,
+        timestamp: int | None = None,
     ) -> List[SwapEntity]:
-        """Возвращает соседние сделки (buy/sell) по токену в заданном диапазоне блоков"""
+        """
+        Возвращает соседние сделки (buy/sell) по токену в заданном диапазоне блоков.
+        timestamp - время свапа в блоке block_id, сужает поиск по времени
+        """
         raise NotImplementedError
@@ -81,6 +81,20 @@ class BaseWalletRepository(BaseGenericRepository[WalletEntity], ABC):
     async def get_wallets_for_update_stats(self, count: int = 1) -> list[WalletEntity]:
         raise NotImplementedError
 
+    @abstractmethod
+    async def get_changed_wallets_for_update_stats(self, count: int = 1) -> tuple[list[WalletEntity], list[tuple]]:
+        """Кошельки из журнала изменений и прочитанные записи журнала"""
+        raise NotImplementedError
+
+    @abstractmethod
+    async def get_wallets_with_shifted_windows(self, count: int = 1, lookback_days: int = 2) -> list[WalletEntity]:
+        """Кошельки без новых свапов, статистики 7d/30d которых изменились со сдвигом окон"""
+        raise NotImplementedError
+
+    @abstractmethod
+    async def delete_wallet_changes(self, changes: list[tuple]) -> int:
+        raise NotImplementedError
+
     @abstractmethod
     async def get_wallets_by_token_addresses(
         self,
@@ -70,6 +70,7 @@ class GetWalletRelatedWalletsHandler:
                     block_id=first_buy_block_id,
                     event_type="buy",
                     exclude_wallets=[wallet_id],
+                    timestamp=first_buy_activity.timestamp,
                 )
                 # print(neighbor_buy_activities)
                 neighbor_sell_activities = await self._swap_repository.get_neighbors_by_token(
@@ -77,6 +78,7 @@ class GetWalletRelatedWalletsHandler:
                     block_id=first_sell_block_id,
                     event_type="sell",
                     exclude_wallets=[wallet_id],
+                    timestamp=first_sell_activity.timestamp,
                 )
                 # print(neighbor_sell_activities)
 
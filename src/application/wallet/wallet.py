@@ -86,6 +86,7 @@ class WalletService:
                     block_id=first_buy_block_id,
                     event_type="buy",
                     exclude_wallets=[wallet_id],
+                    timestamp=first_buy_activity.timestamp,
                 )
                 # print(neighbor_buy_activities)
                 neighbor_sell_activities = await self.swap_repository.get_neighbors_by_token(
@@ -93,6 +94,7 @@ class WalletService:
                     block_id=first_sell_block_id,
                     event_type="sell",
                     exclude_wallets=[wallet_id],
+                    timestamp=first_sell_activity.timestamp,
                 )
                 # print(neighbor_sell_activities)
 
@@ -9,6 +9,7 @@ from .user import User
 from .wallet import (
     TgSentWallet,
     Wallet,
+    WalletChangeLog,
     WalletDetail,
     WalletStatistic7d,
     WalletStatistic30d,
@@ -13,6 +13,8 @@ from sqlalchemy.orm import (
     mapped_column,
 )
 
+from src.infra.db.uuid7 import uuid7
+
 
 # declarative base class
 class Base(DeclarativeBase):
@@ -31,7 +33,7 @@ class UUIDIDMixin:
     id: Mapped[uuid.UUID] = mapped_column(
         UUID(as_uuid=True),
         primary_key=True,
-        default=uuid.uuid1,
+        default=uuid7,
     )
 
 
@@ -14,6 +14,9 @@ class FlipsideCryptoConfig(Base, IntIDMixin):
 
     # TODO: swaps_parsed_untill_inserted_timestamp - сейчас это BLOCK_TIMESTAMP
     swaps_parsed_untill_inserted_timestamp: Mapped[datetime | None] = mapped_column(DateTime, nullable=True)
+    swaps_realtime_parsed_untill_inserted_timestamp: Mapped[datetime | None] = mapped_column(DateTime, nullable=True)
+    swaps_realtime_from_block_timestamp: Mapped[datetime | None] = mapped_column(DateTime, nullable=True)
+    swaps_last_block_timestamp: Mapped[datetime | None] = mapped_column(DateTime, nullable=True)
 
     __table_args__ = {"comment": "Конфиг FlipsideCrypto"}
 
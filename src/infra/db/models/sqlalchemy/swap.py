@@ -8,7 +8,9 @@ from sqlalchemy import (
     Boolean,
     ForeignKey,
     Index,
+    SmallInteger,
     String,
+    UniqueConstraint,
 )
 from sqlalchemy.orm import (
     Mapped,
@@ -28,7 +30,8 @@ class Swap(Base, UUIDIDMixin, TimestampsMixin):
 
     tx_hash: Mapped[str | None] = mapped_column(String(90), nullable=True)
     block_id: Mapped[int | None] = mapped_column(BigInteger, nullable=True)
-    timestamp: Mapped[int | None] = mapped_column(BigInteger, nullable=True)
+    # Ключ секционирования таблицы, входит в первичный ключ (id, timestamp)
+    timestamp: Mapped[int] = mapped_column(BigInteger, primary_key=True)
 
     event_type: Mapped[str | None] = mapped_column(String(15), nullable=True)
 
@@ -39,6 +42,7 @@ class Swap(Base, UUIDIDMixin, TimestampsMixin):
 
     is_part_of_transaction_with_mt_3_swappers: Mapped[bool] = mapped_column(Boolean, default=False)
     is_part_of_arbitrage_swap_event: Mapped[bool] = mapped_column(Boolean, default=False)
+    swap_index: Mapped[int] = mapped_column(SmallInteger, default=0)
 
     wallet_id: Mapped[uuid.UUID] = mapped_column(
         UUID(as_uuid=True),
@@ -58,4 +62,14 @@ class Swap(Base, UUIDIDMixin, TimestampsMixin):
         Index("idx_tx_hash", "tx_hash"),
         Index("idx_block_id", "block_id"),
         Index("idx_timestamp", "timestamp"),
+        UniqueConstraint(
+            "tx_hash",
+            "wallet_id",
+            "token_id",
+            "event_type",
+            "swap_index",
+            "timestamp",
+            name="uid_swap_tx_hash_wallet_token_event_index_timestamp",
+        ),
+        {"postgresql_partition_by": "RANGE (timestamp)"},
     )
@@ -280,6 +280,14 @@ class WalletToken(Base, UUIDIDMixin, TimestampsMixin):
     )
 
 
+class WalletChangeLog(Base):
+    __tablename__ = "wallet_change_log"
+
+    wallet_id: Mapped[uuid.UUID] = mapped_column(UUID(as_uuid=True), primary_key=True)
+    min_timestamp: Mapped[int] = mapped_column(BigInteger)
+    changed_at: Mapped[datetime] = mapped_column(DateTime, index=True)
+
+
 class TgSentWallet(Base, IntIDMixin, TimestampsMixin):
     __tablename__ = "tg_sent_wallet"
 
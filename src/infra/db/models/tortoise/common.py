@@ -1,14 +1,14 @@
-import uuid
-
 from tortoise import fields
 
+from src.infra.db.uuid7 import uuid7
+
 
 class IntIDMixin:
     id = fields.IntField(primary_key=True)
 
 
 class UUIDIDMixin:
-    id = fields.UUIDField(primary_key=True, default=uuid.uuid1)
+    id = fields.UUIDField(primary_key=True, default=uuid7)
 
 
 class TimestampsMixin:
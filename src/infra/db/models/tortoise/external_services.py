@@ -11,6 +11,21 @@ class FlipsideCryptoConfig(Model, IntIDMixin):
         blank=True,
         verbose_name="INSERTED_TIMESTAMP до которого собраны транзакции",
     )
+    swaps_realtime_parsed_untill_inserted_timestamp = fields.DatetimeField(
+        null=True,
+        blank=True,
+        verbose_name="INSERTED_TIMESTAMP до которого собраны транзакции в режиме реального времени",
+    )
+    swaps_realtime_from_block_timestamp = fields.DatetimeField(
+        null=True,
+        blank=True,
+        verbose_name="BLOCK_TIMESTAMP, с которого свапы собирает режим реального времени, а основной режим - до него",
+    )
+    swaps_last_block_timestamp = fields.DatetimeField(
+        null=True,
+        blank=True,
+        verbose_name="BLOCK_TIMESTAMP последнего импортированного свапа (свежесть данных)",
+    )
 
     class Meta:
         table = "flipsidecrypto_config"
@@ -17,7 +17,8 @@ class Swap(Model, UUIDIDMixin, TimestampsMixin):
     )
     tx_hash = fields.CharField(max_length=90, null=True, blank=True)
     block_id = fields.BigIntField(null=True)
-    timestamp = fields.BigIntField(null=True, blank=True)
+    # Ключ секционирования таблицы (PARTITION BY RANGE), входит в первичный ключ (id, timestamp)
+    timestamp = fields.BigIntField()
     event_type = fields.CharField(max_length=15, null=True, blank=True)
     quote_amount = MyDecimalField(
         max_digits=40,
@@ -51,9 +52,16 @@ class Swap(Model, UUIDIDMixin, TimestampsMixin):
         default=False,
         verbose_name="Является ли свап частью арбитраж свапа",
     )
+    swap_index = fields.SmallIntField(
+        default=0,
+        verbose_name="Порядковый номер свапа с тем же кошельком, токеном и типом в транзакции",
+    )
 
     class Meta:
         table = "swap"
+        # Ключ дедупликации: повторный импорт тех же свапов не создает дублей.
+        # timestamp в ключе - уникальность в секционированной таблице требует ключа секционирования
+        unique_together = ("tx_hash", "wallet", "token", "event_type", "swap_index", "timestamp")
         indexes = [
             ("tx_hash",),
             ("block_id",),
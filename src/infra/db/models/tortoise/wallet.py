@@ -356,6 +356,23 @@ class WalletToken(Model, UUIDIDMixin, TimestampsMixin):
         ]
 
 
+class WalletChangeLog(Model):
+    """
+    Журнал кошельков с новыми или удаленными свапами для пересчета статистик.
+    Без внешнего ключа: записи пишутся при каждом импорте, а записи удаленных кошельков отбрасываются при чтении
+    """
+
+    wallet_id = fields.UUIDField(pk=True)
+    min_timestamp = fields.BigIntField(description="Время самого раннего затронутого свапа")
+    changed_at = fields.DatetimeField(description="Время последнего изменения - версия записи")
+
+    class Meta:
+        table = "wallet_change_log"
+        indexes = [
+            ("changed_at",),
+        ]
+
+
 class TgSentWallet(Model, IntIDMixin, TimestampsMixin):
     wallet = fields.OneToOneField(
         "models.Wallet",
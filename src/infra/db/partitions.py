@@ -0,0 +1,51 @@
+"""Периоды диапазонного секционирования таблиц по колонке Unix-времени в секундах (UTC)"""
+
+from datetime import datetime, timedelta, timezone
+
+PARTITION_WEEK = "week"
+PARTITION_MONTH = "month"
+
+
+def partition_start(moment: datetime, interval: str) -> datetime:
+    """Начало периода секции, в который попадает moment: понедельник недели или 1-е число месяца"""
+    moment = moment.astimezone(timezone.utc)
+    if interval == PARTITION_WEEK:
+        day = datetime(moment.year, moment.month, moment.day, tzinfo=timezone.utc)
+        return day - timedelta(days=day.weekday())
+    if interval == PARTITION_MONTH:
+        return datetime(moment.year, moment.month, 1, tzinfo=timezone.utc)
+    raise ValueError(f"Неизвестный период секционирования: {interval}")
+
+
+def next_partition_start(start: datetime, interval: str) -> datetime:
+    if interval == PARTITION_WEEK:
+        return start + timedelta(days=7)
+    if interval == PARTITION_MONTH:
+        return datetime(start.year + start.month // 12, start.month % 12 + 1, 1, tzinfo=timezone.utc)
+    raise ValueError(f"Неизвестный период секционирования: {interval}")
+
+
+def partition_name(table_name: str, start: datetime, interval: str) -> str:
+    if interval == PARTITION_WEEK:
+        iso_calendar = start.isocalendar()
+        return f"{table_name}_p{iso_calendar.year}w{iso_calendar.week:02d}"
+    return f"{table_name}_p{start:%Y_%m}"
+
+
+def split_into_partitions(start_time: datetime, end_time: datetime, interval: str) -> list[tuple[datetime, datetime]]:
+    """Периоды секций, покрывающие [start_time, end_time]"""
+    periods = []
+    start = partition_start(start_time, interval)
+    while start <= end_time:
+        end = next_partition_start(start, interval)
+        periods.append((start, end))
+        start = end
+    return periods
+
+
+def partitions_ahead(moment: datetime, interval: str, count: int) -> datetime:
+    """Момент внутри count-го периода после периода moment - до него создаются будущие секции"""
+    start = partition_start(moment, interval)
+    for _ in range(count):
+        start = next_partition_start(start, interval)
+    return start
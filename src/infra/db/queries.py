@@ -48,3 +48,755 @@ GET_COUNT_ESTIMATE_FULL = """
     FROM pg_class
     WHERE relname = '{table_name}'
 """
+
+# Временная staging-таблица для COPY с последующим слиянием в основную таблицу
+CREATE_STAGING_TABLE = """
+    CREATE TEMP TABLE {staging_table} (LIKE {table_name} INCLUDING DEFAULTS) ON COMMIT DROP
+"""
+
+MERGE_FROM_STAGING_TABLE = """
+    INSERT INTO {table_name} ({columns})
+    SELECT {columns} FROM {staging_table}
+    ON CONFLICT ({conflict_columns}) DO UPDATE SET {set_clause}
+"""
+
+DROP_STAGING_TABLE = "DROP TABLE IF EXISTS {staging_table}"
+
+# Вставка с возвратом полей как новых, так и существующих строк одним запросом.
+# DO UPDATE (а не DO NOTHING + JOIN) возвращает и строку, вставленную параллельной транзакцией
+# после снимка запроса: JOIN ее не видит, а конфликт ждет ее фиксации и блокирует ее.
+# Строки упорядочены по ключу, чтобы параллельные upsert-ы блокировали их в одном порядке
+UPSERT_RETURNING = """
+    INSERT INTO {table_name} ({columns})
+    SELECT {columns} FROM unnest({unnest_params}) AS input_rows ({columns})
+    ORDER BY {unique_column}
+    ON CONFLICT ({unique_column}) DO UPDATE SET {unique_column} = EXCLUDED.{unique_column}
+    RETURNING {returning}
+"""
+
+# Существующие записи для набора пар (wallet_id, token_id), переданных массивами
+GET_WALLET_TOKENS_BY_PAIRS = """
+    SELECT {table_name}.*
+    FROM {table_name}
+    JOIN unnest($1::uuid[], $2::uuid[]) AS pairs (wallet_id, token_id)
+      ON {table_name}.wallet_id = pairs.wallet_id AND {table_name}.token_id = pairs.token_id
+"""
+
+# Транзакции из $1, у которых уже есть свапы в БД (режим реального времени не импортирует их повторно).
+# Диапазон времени свапов [$2, $3] ограничивает поиск секциями окна
+GET_EXISTING_SWAP_TX_HASHES = """
+    SELECT DISTINCT swap.tx_hash
+    FROM swap
+    WHERE swap.tx_hash = ANY($1::varchar[]) AND swap.timestamp >= $2 AND swap.timestamp <= $3
+"""
+
+# Ключи дедупликации свапов (tx_hash, wallet_id, token_id, event_type, swap_index), уже сохраненные в БД.
+# Диапазон времени свапов [$6, $7] ограничивает поиск секциями периода
+GET_EXISTING_SWAP_KEYS = """
+    SELECT swap.tx_hash, swap.wallet_id, swap.token_id, swap.event_type, swap.swap_index
+    FROM swap
+    JOIN unnest($1::varchar[], $2::uuid[], $3::uuid[], $4::varchar[], $5::smallint[])
+      AS keys (tx_hash, wallet_id, token_id, event_type, swap_index)
+      ON swap.tx_hash = keys.tx_hash
+      AND swap.wallet_id = keys.wallet_id
+      AND swap.token_id = keys.token_id
+      AND swap.event_type = keys.event_type
+      AND swap.swap_index = keys.swap_index
+    WHERE swap.timestamp >= $6 AND swap.timestamp <= $7
+"""
+
+# Есть ли уже свапы за [$1, $2] - импорт в диапазон, заполненный бэкфиллом или прерванным импортом
+HAS_SWAPS_IN_RANGE = """
+    SELECT EXISTS (SELECT 1 FROM swap WHERE swap.timestamp >= $1 AND swap.timestamp <= $2) AS has_swaps
+"""
+
+# Слияние дельт WalletToken-статистик за период с существующими записями без их чтения.
+# В SET доступны только старые значения (wt) и дельты (EXCLUDED), поэтому производные поля
+# пересчитываются из их сумм/минимумов
+WALLET_TOKEN_DELTAS_SET_CLAUSE = """
+      updated_at = EXCLUDED.updated_at,
+      total_buys_count = wt.total_buys_count + EXCLUDED.total_buys_count,
+      total_buy_amount_usd = wt.total_buy_amount_usd + EXCLUDED.total_buy_amount_usd,
+      total_buy_amount_token = wt.total_buy_amount_token + EXCLUDED.total_buy_amount_token,
+      total_sales_count = wt.total_sales_count + EXCLUDED.total_sales_count,
+      total_sell_amount_usd = wt.total_sell_amount_usd + EXCLUDED.total_sell_amount_usd,
+      total_sell_amount_token = wt.total_sell_amount_token + EXCLUDED.total_sell_amount_token,
+      first_buy_timestamp = LEAST(wt.first_buy_timestamp, EXCLUDED.first_buy_timestamp),
+      first_buy_price_usd = CASE
+        WHEN EXCLUDED.first_buy_timestamp IS NOT NULL
+          AND (wt.first_buy_timestamp IS NULL OR EXCLUDED.first_buy_timestamp <= wt.first_buy_timestamp)
+        THEN EXCLUDED.first_buy_price_usd
+        ELSE wt.first_buy_price_usd
+      END,
+      first_sell_timestamp = LEAST(wt.first_sell_timestamp, EXCLUDED.first_sell_timestamp),
+      first_sell_price_usd = CASE
+        WHEN EXCLUDED.first_sell_timestamp IS NOT NULL
+          AND (wt.first_sell_timestamp IS NULL OR EXCLUDED.first_sell_timestamp <= wt.first_sell_timestamp)
+        THEN EXCLUDED.first_sell_price_usd
+        ELSE wt.first_sell_price_usd
+      END,
+      last_activity_timestamp = GREATEST(wt.last_activity_timestamp, EXCLUDED.last_activity_timestamp),
+      total_swaps_from_txs_with_mt_3_swappers =
+        wt.total_swaps_from_txs_with_mt_3_swappers + EXCLUDED.total_swaps_from_txs_with_mt_3_swappers,
+      total_swaps_from_arbitrage_swap_events =
+        wt.total_swaps_from_arbitrage_swap_events + EXCLUDED.total_swaps_from_arbitrage_swap_events,
+      first_buy_sell_duration = CASE
+        WHEN LEAST(wt.first_buy_timestamp, EXCLUDED.first_buy_timestamp)
+          <= LEAST(wt.first_sell_timestamp, EXCLUDED.first_sell_timestamp)
+        THEN LEAST(wt.first_sell_timestamp, EXCLUDED.first_sell_timestamp)
+          - LEAST(wt.first_buy_timestamp, EXCLUDED.first_buy_timestamp)
+        ELSE wt.first_buy_sell_duration
+      END,
+      total_profit_usd = CASE
+        WHEN wt.total_buys_count + EXCLUDED.total_buys_count > 0
+        THEN (wt.total_sell_amount_usd + EXCLUDED.total_sell_amount_usd)
+          - (wt.total_buy_amount_usd + EXCLUDED.total_buy_amount_usd)
+        ELSE wt.total_profit_usd
+      END,
+      total_profit_percent = CASE
+        WHEN wt.total_buys_count + EXCLUDED.total_buys_count = 0 THEN wt.total_profit_percent
+        WHEN wt.total_buy_amount_usd + EXCLUDED.total_buy_amount_usd = 0 THEN NULL
+        ELSE round(
+          ((wt.total_sell_amount_usd + EXCLUDED.total_sell_amount_usd)
+            - (wt.total_buy_amount_usd + EXCLUDED.total_buy_amount_usd))
+          / (wt.total_buy_amount_usd + EXCLUDED.total_buy_amount_usd) * 100,
+          2
+        )::double precision
+      END
+"""
+
+MERGE_WALLET_TOKEN_DELTAS = (
+    """
+    INSERT INTO {table_name} AS wt ({columns})
+    SELECT * FROM unnest({unnest_params})
+    ON CONFLICT (wallet_id, token_id) DO UPDATE SET"""
+    + WALLET_TOKEN_DELTAS_SET_CLAUSE
+)
+
+# WalletToken-статистики пары по ее свапам: список агрегатов для SELECT ... GROUP BY wallet_id, token_id.
+# Общий для пересчета с нуля, бэкфилла, его сверки и отката - статистики во всех путях считаются одинаково
+WALLET_TOKEN_SWAP_AGGREGATES = """
+        count(*) FILTER (WHERE event_type = 'buy') AS total_buys_count,
+        coalesce(sum(cost_usd) FILTER (WHERE event_type = 'buy'), 0) AS total_buy_amount_usd,
+        coalesce(sum(token_amount) FILTER (WHERE event_type = 'buy'), 0) AS total_buy_amount_token,
+        min(timestamp) FILTER (WHERE event_type = 'buy') AS first_buy_timestamp,
+        (array_agg(price_usd ORDER BY timestamp) FILTER (WHERE event_type = 'buy'))[1] AS first_buy_price_usd,
+        count(*) FILTER (WHERE event_type IS DISTINCT FROM 'buy') AS total_sales_count,
+        coalesce(sum(cost_usd) FILTER (WHERE event_type IS DISTINCT FROM 'buy'), 0) AS total_sell_amount_usd,
+        coalesce(sum(token_amount) FILTER (WHERE event_type IS DISTINCT FROM 'buy'), 0) AS total_sell_amount_token,
+        min(timestamp) FILTER (WHERE event_type IS DISTINCT FROM 'buy') AS first_sell_timestamp,
+        (array_agg(price_usd ORDER BY timestamp) FILTER (WHERE event_type IS DISTINCT FROM 'buy'))[1]
+          AS first_sell_price_usd,
+        max(timestamp) AS last_activity_timestamp,
+        count(*) FILTER (WHERE is_part_of_transaction_with_mt_3_swappers) AS total_swaps_from_txs_with_mt_3_swappers,
+        count(*) FILTER (WHERE is_part_of_arbitrage_swap_event) AS total_swaps_from_arbitrage_swap_events"""
+
+# Upsert WalletToken из статистик пар в CTE stats (WALLET_TOKEN_SWAP_AGGREGATES) с производными полями.
+# После ON CONFLICT ... DO UPDATE SET - WALLET_TOKEN_DELTAS_SET_CLAUSE (дельты) или WALLET_TOKEN_REPLACE_SET_CLAUSE
+UPSERT_WALLET_TOKENS_FROM_STATS = """
+    INSERT INTO wallet_token AS wt (
+      id, created_at, updated_at, wallet_id, token_id,
+      total_buys_count, total_buy_amount_usd, total_buy_amount_token, first_buy_timestamp, first_buy_price_usd,
+      total_sales_count, total_sell_amount_usd, total_sell_amount_token, first_sell_timestamp, first_sell_price_usd,
+      last_activity_timestamp, total_swaps_from_txs_with_mt_3_swappers, total_swaps_from_arbitrage_swap_events,
+      total_profit_usd, total_profit_percent, first_buy_sell_duration
+    )
+    SELECT
+      uuid_generate_v7(), now(), now(), wallet_id, token_id,
+      total_buys_count, total_buy_amount_usd, total_buy_amount_token, first_buy_timestamp, first_buy_price_usd,
+      total_sales_count, total_sell_amount_usd, total_sell_amount_token, first_sell_timestamp, first_sell_price_usd,
+      last_activity_timestamp, total_swaps_from_txs_with_mt_3_swappers, total_swaps_from_arbitrage_swap_events,
+      CASE WHEN total_buys_count > 0 THEN total_sell_amount_usd - total_buy_amount_usd ELSE 0 END,
+      CASE
+        WHEN total_buys_count = 0 OR total_buy_amount_usd = 0 THEN NULL
+        ELSE round((total_sell_amount_usd - total_buy_amount_usd) / total_buy_amount_usd * 100, 2)::double precision
+      END,
+      CASE
+        WHEN first_buy_timestamp <= first_sell_timestamp THEN (first_sell_timestamp - first_buy_timestamp)::integer
+      END
+    FROM stats
+    ORDER BY wallet_id, token_id
+    ON CONFLICT (wallet_id, token_id) DO UPDATE SET"""
+
+# Замена статистик существующей записи пересчитанными с нуля
+WALLET_TOKEN_REPLACE_SET_CLAUSE = """
+      updated_at = EXCLUDED.updated_at,
+      total_buys_count = EXCLUDED.total_buys_count,
+      total_buy_amount_usd = EXCLUDED.total_buy_amount_usd,
+      total_buy_amount_token = EXCLUDED.total_buy_amount_token,
+      first_buy_timestamp = EXCLUDED.first_buy_timestamp,
+      first_buy_price_usd = EXCLUDED.first_buy_price_usd,
+      total_sales_count = EXCLUDED.total_sales_count,
+      total_sell_amount_usd = EXCLUDED.total_sell_amount_usd,
+      total_sell_amount_token = EXCLUDED.total_sell_amount_token,
+      first_sell_timestamp = EXCLUDED.first_sell_timestamp,
+      first_sell_price_usd = EXCLUDED.first_sell_price_usd,
+      last_activity_timestamp = EXCLUDED.last_activity_timestamp,
+      total_swaps_from_txs_with_mt_3_swappers = EXCLUDED.total_swaps_from_txs_with_mt_3_swappers,
+      total_swaps_from_arbitrage_swap_events = EXCLUDED.total_swaps_from_arbitrage_swap_events,
+      total_profit_usd = EXCLUDED.total_profit_usd,
+      total_profit_percent = EXCLUDED.total_profit_percent,
+      first_buy_sell_duration = EXCLUDED.first_buy_sell_duration
+"""
+
+# Пересчет WalletToken пар ($1 - wallet_id, $2 - token_id) с нуля по всем их свапам в swap (поиск по индексу
+# swap.wallet_id). Результат не зависит от того, какие статистики пар уже были записаны, поэтому повтор
+# прерванного импорта не учитывает свапы дважды. Для запуска нужна uuid_generate_v7()
+RECOMPUTE_WALLET_TOKENS = (
+    """
+    WITH pairs AS (
+      SELECT DISTINCT wallet_id, token_id FROM unnest($1::uuid[], $2::uuid[]) AS pairs (wallet_id, token_id)
+    ),
+    stats AS (
+      SELECT
+        swap.wallet_id,
+        swap.token_id,"""
+    + WALLET_TOKEN_SWAP_AGGREGATES
+    + """
+      FROM swap
+      JOIN pairs ON swap.wallet_id = pairs.wallet_id AND swap.token_id = pairs.token_id
+      GROUP BY swap.wallet_id, swap.token_id
+    )"""
+    + UPSERT_WALLET_TOKENS_FROM_STATS
+    + WALLET_TOKEN_REPLACE_SET_CLAUSE
+)
+
+# UUIDv7 на стороне БД (до PostgreSQL 18 встроенной функции нет): миллисекунды clock_timestamp()
+# в первых 6 байтах uuid4 и версия 7 вместо 4. Для строк, создаваемых SQL-запросами, как uuid7 в Python
+CREATE_FUNC_UUID_GENERATE_V7 = """
+    CREATE OR REPLACE FUNCTION uuid_generate_v7() RETURNS uuid AS $$
+      SELECT encode(
+        set_bit(
+          set_bit(
+            overlay(
+              uuid_send(gen_random_uuid())
+              PLACING substring(int8send(floor(extract(epoch FROM clock_timestamp()) * 1000)::bigint) FROM 3)
+              FROM 1 FOR 6
+            ),
+            52, 1
+          ),
+          53, 1
+        ),
+        'hex'
+      )::uuid
+    $$ LANGUAGE SQL VOLATILE;
+"""
+
+# Бэкфилл: staging-таблица без WAL для уже созданных (как в инкрементальном пути) строк свапов с адресами
+CREATE_BACKFILL_STAGING_TABLE = """
+    CREATE UNLOGGED TABLE {staging_table} (
+      id uuid NOT NULL,
+      wallet_address varchar(90) NOT NULL,
+      token_address varchar(90) NOT NULL,
+      tx_hash varchar(90),
+      block_id bigint,
+      timestamp double precision NOT NULL,
+      event_type varchar(15),
+      quote_amount numeric(40, 20),
+      token_amount numeric(40, 20),
+      cost_usd numeric(40, 20),
+      price_usd numeric(40, 20),
+      is_part_of_transaction_with_mt_3_swappers boolean NOT NULL,
+      is_part_of_arbitrage_swap_event boolean NOT NULL,
+      swap_index smallint NOT NULL
+    )
+"""
+
+BACKFILL_STAGING_COLUMNS = (
+    "id",
+    "wallet_address",
+    "token_address",
+    "tx_hash",
+    "block_id",
+    "timestamp",
+    "event_type",
+    "quote_amount",
+    "token_amount",
+    "cost_usd",
+    "price_usd",
+    "is_part_of_transaction_with_mt_3_swappers",
+    "is_part_of_arbitrage_swap_event",
+    "swap_index",
+)
+
+# Индекс создается после загрузки - вставка в staging идет без поддержки индекса
+CREATE_BACKFILL_STAGING_INDEX = "CREATE INDEX ON {staging_table} (timestamp)"
+
+GET_BACKFILL_STAGING_ADDRESSES = "SELECT DISTINCT {column} AS address FROM {staging_table}"
+
+# Свапы за [$1, $2) из staging вставляются одним INSERT ... SELECT, а WalletToken-дельты считаются
+# GROUP BY только по реально вставленным строкам (RETURNING) и сливаются так же, как MERGE_WALLET_TOKEN_DELTAS.
+# Повтор того же диапазона ничего не меняет - свапы отсекаются ключом дедупликации
+BACKFILL_MERGE_SWAPS_AND_WALLET_TOKENS = (
+    """
+    WITH inserted AS (
+      INSERT INTO swap (
+        id, created_at, updated_at, wallet_id, token_id, tx_hash, block_id, timestamp, event_type,
+        quote_amount, token_amount, cost_usd, price_usd,
+        is_part_of_transaction_with_mt_3_swappers, is_part_of_arbitrage_swap_event, swap_index
+      )
+      SELECT
+        s.id, now(), now(), wallet.id, token.id, s.tx_hash, s.block_id, floor(s.timestamp)::bigint,
+        s.event_type, s.quote_amount, s.token_amount, s.cost_usd, s.price_usd,
+        s.is_part_of_transaction_with_mt_3_swappers, s.is_part_of_arbitrage_swap_event, s.swap_index
+      FROM {staging_table} AS s
+      JOIN wallet ON wallet.address = s.wallet_address
+      JOIN token ON token.address = s.token_address
+      WHERE s.timestamp >= $1 AND s.timestamp < $2
+      ON CONFLICT (tx_hash, wallet_id, token_id, event_type, swap_index, timestamp) DO NOTHING
+      RETURNING wallet_id, token_id, timestamp, event_type, token_amount, cost_usd, price_usd,
+        is_part_of_transaction_with_mt_3_swappers, is_part_of_arbitrage_swap_event
+    ),
+    stats AS (
+      SELECT
+        wallet_id,
+        token_id,"""
+    + WALLET_TOKEN_SWAP_AGGREGATES
+    + """
+      FROM inserted
+      GROUP BY wallet_id, token_id
+    )"""
+    + UPSERT_WALLET_TOKENS_FROM_STATS
+    + WALLET_TOKEN_DELTAS_SET_CLAUSE
+)
+
+# Время первой/последней активности кошельков по свапам периода. Сводится со значением в БД
+# (least/greatest пропускают NULL), поэтому повтор периода и параллельные процессы не откатывают его назад
+UPDATE_WALLETS_ACTIVITY = """
+    UPDATE wallet
+    SET
+      first_activity_timestamp = least(wallet.first_activity_timestamp, activity.first_activity_timestamp),
+      last_activity_timestamp = greatest(wallet.last_activity_timestamp, activity.last_activity_timestamp)
+    FROM unnest($1::uuid[], $2::timestamptz[], $3::timestamptz[])
+      AS activity (wallet_id, first_activity_timestamp, last_activity_timestamp)
+    WHERE wallet.id = activity.wallet_id
+"""
+
+# Время последней активности кошельков по свапам staging за [$1, $2) - только вперед, как в UPDATE_WALLETS_ACTIVITY
+BACKFILL_UPDATE_WALLETS_LAST_ACTIVITY = """
+    UPDATE wallet
+    SET last_activity_timestamp = activity.last_activity_timestamp
+    FROM (
+      SELECT wallet_address, to_timestamp(max(timestamp)) AS last_activity_timestamp
+      FROM {staging_table}
+      WHERE timestamp >= $1 AND timestamp < $2
+      GROUP BY wallet_address
+    ) AS activity
+    WHERE wallet.address = activity.wallet_address
+      AND (wallet.last_activity_timestamp IS NULL OR wallet.last_activity_timestamp < activity.last_activity_timestamp)
+"""
+
+# Сверка WalletToken затронутых бэкфиллом пар с пересчетом с нуля по всем свапам пары из таблицы swap.
+# Цена первой покупки/продажи при нескольких свапах в одну секунду принимается, если совпадает с любым из них
+VERIFY_BACKFILL_WALLET_TOKENS = (
+    """
+    WITH pairs AS (
+      SELECT DISTINCT wallet.id AS wallet_id, token.id AS token_id
+      FROM {staging_table} AS s
+      JOIN wallet ON wallet.address = s.wallet_address
+      JOIN token ON token.address = s.token_address
+    ),
+    expected AS (
+      SELECT
+        swap.wallet_id,
+        swap.token_id,"""
+    + WALLET_TOKEN_SWAP_AGGREGATES
+    + """
+      FROM swap
+      JOIN pairs ON swap.wallet_id = pairs.wallet_id AND swap.token_id = pairs.token_id
+      GROUP BY swap.wallet_id, swap.token_id
+    ),
+    compared AS (
+      SELECT
+        wt.id IS NOT NULL
+        AND wt.total_buys_count = e.total_buys_count
+        AND abs(wt.total_buy_amount_usd - e.total_buy_amount_usd) <= $1
+        AND abs(wt.total_buy_amount_token - e.total_buy_amount_token) <= $1
+        AND wt.first_buy_timestamp IS NOT DISTINCT FROM e.first_buy_timestamp
+        AND wt.total_sales_count = e.total_sales_count
+        AND abs(wt.total_sell_amount_usd - e.total_sell_amount_usd) <= $1
+        AND abs(wt.total_sell_amount_token - e.total_sell_amount_token) <= $1
+        AND wt.first_sell_timestamp IS NOT DISTINCT FROM e.first_sell_timestamp
+        AND wt.last_activity_timestamp IS NOT DISTINCT FROM e.last_activity_timestamp
+        AND wt.total_swaps_from_txs_with_mt_3_swappers = e.total_swaps_from_txs_with_mt_3_swappers
+        AND wt.total_swaps_from_arbitrage_swap_events = e.total_swaps_from_arbitrage_swap_events
+        AND (
+          wt.first_buy_timestamp IS NULL
+          OR EXISTS (
+            SELECT 1 FROM swap
+            WHERE swap.wallet_id = e.wallet_id AND swap.token_id = e.token_id AND swap.event_type = 'buy'
+              AND swap.timestamp = wt.first_buy_timestamp
+              AND swap.price_usd IS NOT DISTINCT FROM wt.first_buy_price_usd
+          )
+        )
+        AND (
+          wt.first_sell_timestamp IS NULL
+          OR EXISTS (
+            SELECT 1 FROM swap
+            WHERE swap.wallet_id = e.wallet_id AND swap.token_id = e.token_id
+              AND swap.event_type IS DISTINCT FROM 'buy'
+              AND swap.timestamp = wt.first_sell_timestamp
+              AND swap.price_usd IS NOT DISTINCT FROM wt.first_sell_price_usd
+          )
+        ) AS is_equal
+      FROM expected AS e
+      LEFT JOIN wallet_token AS wt ON wt.wallet_id = e.wallet_id AND wt.token_id = e.token_id
+    )
+    SELECT count(*) AS pairs_count, count(*) FILTER (WHERE NOT is_equal) AS mismatches_count
+    FROM compared
+"""
+)
+
+# Вторичные индексы таблицы (кроме первичного ключа и уникальных, нужных для ON CONFLICT)
+GET_SECONDARY_INDEXES = """
+    SELECT indexes.indexname AS index_name, indexes.indexdef AS index_definition
+    FROM pg_indexes AS indexes
+    JOIN pg_class ON pg_class.relname = indexes.indexname
+    JOIN pg_index ON pg_index.indexrelid = pg_class.oid
+    WHERE indexes.schemaname = current_schema()
+      AND indexes.tablename = $1
+      AND NOT pg_index.indisunique
+      AND NOT pg_index.indisprimary
+"""
+
+DROP_INDEX = "DROP INDEX IF EXISTS {index_name}"
+
+ANALYZE_TABLE = "ANALYZE {table_name}"
+
+# Откат свапов за [$1, $2): отчет для dry-run без изменений
+GET_ROLLBACK_SWAPS_REPORT = """
+    WITH pairs AS (
+      SELECT wallet_id, token_id, count(*) AS swaps_count
+      FROM swap
+      WHERE timestamp >= $1 AND timestamp < $2
+      GROUP BY wallet_id, token_id
+    )
+    SELECT
+      coalesce(sum(swaps_count), 0)::bigint AS swaps_count,
+      count(*) AS pairs_count,
+      count(DISTINCT wallet_id) AS wallets_count,
+      count(DISTINCT token_id) AS tokens_count,
+      count(*) FILTER (
+        WHERE NOT EXISTS (
+          SELECT 1 FROM swap
+          WHERE swap.wallet_id = pairs.wallet_id AND swap.token_id = pairs.token_id
+            AND (swap.timestamp >= $1 AND swap.timestamp < $2) IS NOT TRUE
+        )
+      ) AS removed_pairs_count
+    FROM pairs
+"""
+
+# Откат свапов за [$1, $2) одним запросом: удаление свапов и пересчет WalletToken затронутых пар с нуля
+# по оставшимся свапам (поиск по индексу swap.wallet_id). Все части запроса видят снимок до удаления,
+# поэтому удаляемые свапы исключаются из пересчета условием на время. Пары без оставшихся свапов удаляются.
+# Для запуска нужна uuid_generate_v7()
+ROLLBACK_SWAPS_AND_WALLET_TOKENS = (
+    """
+    WITH deleted AS (
+      DELETE FROM swap
+      WHERE timestamp >= $1 AND timestamp < $2
+      RETURNING wallet_id, token_id
+    ),
+    pairs AS (
+      SELECT DISTINCT wallet_id, token_id FROM deleted
+    ),
+    stats AS (
+      SELECT
+        swap.wallet_id,
+        swap.token_id,"""
+    + WALLET_TOKEN_SWAP_AGGREGATES
+    + """
+      FROM swap
+      JOIN pairs ON swap.wallet_id = pairs.wallet_id AND swap.token_id = pairs.token_id
+      WHERE (swap.timestamp >= $1 AND swap.timestamp < $2) IS NOT TRUE
+      GROUP BY swap.wallet_id, swap.token_id
+    ),
+    updated AS ("""
+    + UPSERT_WALLET_TOKENS_FROM_STATS
+    + WALLET_TOKEN_REPLACE_SET_CLAUSE
+    + """
+      RETURNING wt.id
+    ),
+    removed AS (
+      DELETE FROM wallet_token AS wt
+      USING pairs
+      WHERE wt.wallet_id = pairs.wallet_id AND wt.token_id = pairs.token_id
+        AND NOT EXISTS (
+          SELECT 1 FROM stats WHERE stats.wallet_id = pairs.wallet_id AND stats.token_id = pairs.token_id
+        )
+      RETURNING wt.id
+    )
+    SELECT
+      (SELECT count(*) FROM deleted) AS swaps_count,
+      (SELECT count(*) FROM updated) AS updated_pairs_count,
+      (SELECT count(*) FROM removed) AS removed_pairs_count,
+      (SELECT array_agg(DISTINCT wallet_id) FROM pairs) AS wallet_ids
+"""
+)
+
+# Время первой и последней активности кошельков после отката - по оставшимся WalletToken (NULL, если их не осталось).
+# last_stats_check сбрасывается, чтобы статистики кошельков пересчитались в первую очередь
+ROLLBACK_UPDATE_WALLETS = """
+    UPDATE wallet
+    SET
+      first_activity_timestamp = to_timestamp(activity.first_activity_timestamp),
+      last_activity_timestamp = to_timestamp(activity.last_activity_timestamp),
+      last_stats_check = NULL
+    FROM (
+      SELECT
+        ids.wallet_id,
+        min(least(wt.first_buy_timestamp, wt.first_sell_timestamp)) AS first_activity_timestamp,
+        max(wt.last_activity_timestamp) AS last_activity_timestamp
+      FROM unnest($1::uuid[]) AS ids (wallet_id)
+      LEFT JOIN wallet_token AS wt ON wt.wallet_id = ids.wallet_id
+      GROUP BY ids.wallet_id
+    ) AS activity
+    WHERE wallet.id = activity.wallet_id
+"""
+
+# Заполнение block_id: страница свапов без block_id после $1 в порядке id (keyset)
+GET_SWAPS_WITHOUT_BLOCK_ID = """
+    SELECT id, tx_hash
+    FROM swap
+    WHERE block_id IS NULL AND id > $1
+    ORDER BY id
+    LIMIT $2
+"""
+
+# block_id проставляется сразу всем свапам транзакции, в т.ч. за пределами текущей страницы
+UPDATE_SWAPS_BLOCK_ID = """
+    UPDATE swap
+    SET block_id = blocks.block_id
+    FROM unnest($1::varchar[], $2::bigint[]) AS blocks (tx_hash, block_id)
+    WHERE swap.tx_hash = blocks.tx_hash AND swap.block_id IS NULL
+"""
+
+# Секционирование swap по timestamp (RANGE). Тип таблицы ('p' - секционированная) и ее секции
+GET_TABLE_PARTITIONS = """
+    SELECT parent.relkind::text AS relkind, child.relname AS partition_name
+    FROM pg_class AS parent
+    LEFT JOIN pg_inherits ON pg_inherits.inhparent = parent.oid
+    LEFT JOIN pg_class AS child ON child.oid = pg_inherits.inhrelid
+    WHERE parent.oid = to_regclass($1)
+"""
+
+CREATE_PARTITION = (
+    "CREATE TABLE IF NOT EXISTS {partition_name} PARTITION OF {table_name} FOR VALUES FROM ({start}) TO ({end})"
+)
+
+# Для строк вне созданных секций - вставка не падает, но секцию на их диапазон создать уже нельзя,
+# поэтому будущие секции создаются заранее и DEFAULT должна оставаться пустой
+CREATE_DEFAULT_PARTITION = "CREATE TABLE IF NOT EXISTS {table_name}_default PARTITION OF {table_name} DEFAULT"
+
+GET_INDEX_NAMES = """
+    SELECT indexname AS index_name
+    FROM pg_indexes
+    WHERE schemaname = current_schema() AND tablename = $1
+"""
+
+RENAME_TABLE = "ALTER TABLE {table_name} RENAME TO {new_table_name}"
+
+RENAME_INDEX = "ALTER INDEX {index_name} RENAME TO {new_index_name}"
+
+DROP_TABLE = "DROP TABLE IF EXISTS {table_name}"
+
+# Первичный ключ и ключ дедупликации секционированной таблицы обязаны включать ключ секционирования
+CREATE_PARTITIONED_SWAP_TABLE = """
+    CREATE TABLE swap (
+      LIKE {source_table} INCLUDING DEFAULTS,
+      PRIMARY KEY (id, timestamp),
+      CONSTRAINT uid_swap_tx_hash_wallet_token_event_index_timestamp
+        UNIQUE (tx_hash, wallet_id, token_id, event_type, swap_index, timestamp),
+      FOREIGN KEY (wallet_id) REFERENCES wallet (id) ON DELETE CASCADE,
+      FOREIGN KEY (token_id) REFERENCES token (id) ON DELETE CASCADE
+    ) PARTITION BY RANGE (timestamp);
+    CREATE INDEX ON swap (tx_hash);
+    CREATE INDEX ON swap (block_id);
+    CREATE INDEX ON swap (timestamp);
+    CREATE INDEX ON swap (wallet_id);
+    CREATE INDEX ON swap (token_id);
+"""
+
+GET_TIMESTAMPS_RANGE = """
+    SELECT
+      min(timestamp) AS min_timestamp,
+      max(timestamp) AS max_timestamp,
+      count(*) AS rows_count,
+      count(*) - count(timestamp) AS null_timestamps_count
+    FROM {table_name}
+"""
+
+# Перенос свапов периода [$1, $2) из прежней таблицы. Повтор после прерывания не создает дублей
+COPY_SWAPS_TO_PARTITIONED = """
+    INSERT INTO swap
+    SELECT * FROM {source_table}
+    WHERE timestamp >= $1 AND timestamp < $2
+    ON CONFLICT DO NOTHING
+"""
+
+# Журнал изменившихся кошельков: одна строка на кошелек, повторное изменение сдвигает min_timestamp
+# к самому раннему затронутому свапу, а changed_at - версия записи для удаления после пересчета
+UPSERT_WALLET_CHANGE_LOG = """
+    INSERT INTO wallet_change_log (wallet_id, min_timestamp, changed_at)
+    SELECT changes.wallet_id, changes.min_timestamp, clock_timestamp()
+    FROM unnest($1::uuid[], $2::bigint[]) AS changes (wallet_id, min_timestamp)
+    ORDER BY changes.wallet_id
+    ON CONFLICT (wallet_id) DO UPDATE
+    SET
+      min_timestamp = least(wallet_change_log.min_timestamp, excluded.min_timestamp),
+      changed_at = excluded.changed_at
+"""
+
+BACKFILL_LOG_WALLET_CHANGES = """
+    INSERT INTO wallet_change_log (wallet_id, min_timestamp, changed_at)
+    SELECT wallet.id, min(s.timestamp)::bigint, clock_timestamp()
+    FROM {staging_table} AS s
+    JOIN wallet ON wallet.address = s.wallet_address
+    WHERE s.timestamp >= $1 AND s.timestamp < $2
+    GROUP BY wallet.id
+    ORDER BY wallet.id
+    ON CONFLICT (wallet_id) DO UPDATE
+    SET
+      min_timestamp = least(wallet_change_log.min_timestamp, excluded.min_timestamp),
+      changed_at = excluded.changed_at
+"""
+
+# Кошельки из журнала, старые изменения первыми. Записи удаленных кошельков отдаются без wallet.id
+GET_CHANGED_WALLETS_FOR_UPDATE_STATS = """
+    SELECT
+      wallet.*,
+      log.wallet_id AS change_wallet_id,
+      log.min_timestamp AS change_min_timestamp,
+      log.changed_at AS change_changed_at
+    FROM wallet_change_log AS log
+    LEFT JOIN wallet ON wallet.id = log.wallet_id
+    ORDER BY log.changed_at
+    LIMIT $1
+"""
+
+# Удаляются только записи, не изменившиеся после чтения: изменение во время пересчета обновит changed_at
+# и кошелек пересчитается еще раз
+DELETE_WALLET_CHANGES = """
+    DELETE FROM wallet_change_log AS log
+    USING unnest($1::uuid[], $2::timestamptz[]) AS changes (wallet_id, changed_at)
+    WHERE log.wallet_id = changes.wallet_id AND log.changed_at = changes.changed_at
+"""
+
+# Токен входит в окно 7d/30d по времени первой продажи, а без продаж - первой покупки
+# (utils.filter_period_tokens), и покидает окно через 7/30 дней после него
+WALLET_TOKEN_WINDOW_ANCHOR_INDEX = "idx_wallet_token_window_anchor"
+CREATE_WALLET_TOKEN_WINDOW_ANCHOR_INDEX = """
+    CREATE INDEX CONCURRENTLY IF NOT EXISTS {index_name}
+    ON wallet_token ((coalesce(first_sell_timestamp, first_buy_timestamp)))
+"""
+
+# Прерванный CREATE INDEX CONCURRENTLY оставляет индекс INVALID: он не используется в запросах,
+# но обновляется при записи, а IF NOT EXISTS его не пересоздает. NULL - индекса нет
+GET_INDEX_IS_VALID = "SELECT indisvalid AS is_valid FROM pg_index WHERE indexrelid = to_regclass($1)"
+
+DROP_INDEX_CONCURRENTLY = "DROP INDEX CONCURRENTLY IF EXISTS {index_name}"
+
+# Кошельки без новых свапов, у которых с последнего пересчета токен покинул окно 7d или 30d.
+# Поиск по токенам ограничен $1 днями до последнего пересчета, кошельки, не пересчитанные дольше,
+# берутся по last_activity_timestamp (была активность в окнах на момент пересчета), а никогда не пересчитанные - все
+GET_WALLETS_WITH_SHIFTED_WINDOWS = """
+    WITH shifted AS (
+      SELECT wallet_token.wallet_id
+      FROM wallet_token
+      JOIN wallet ON wallet.id = wallet_token.wallet_id
+      WHERE coalesce(wallet_token.first_sell_timestamp, wallet_token.first_buy_timestamp)
+          BETWEEN extract(epoch FROM now() - '30 days'::interval - make_interval(days => $1))
+          AND extract(epoch FROM now() - '7 days'::interval)
+        AND wallet.last_stats_check >= now() - make_interval(days => $1)
+        AND (
+          to_timestamp(coalesce(wallet_token.first_sell_timestamp, wallet_token.first_buy_timestamp))
+            + '7 days'::interval BETWEEN wallet.last_stats_check AND now()
+          OR to_timestamp(coalesce(wallet_token.first_sell_timestamp, wallet_token.first_buy_timestamp))
+            + '30 days'::interval BETWEEN wallet.last_stats_check AND now()
+        )
+      UNION
+      SELECT id
+      FROM wallet
+      WHERE last_stats_check < now() - make_interval(days => $1)
+        AND last_activity_timestamp > last_stats_check - '30 days'::interval
+      UNION
+      SELECT id
+      FROM wallet
+      WHERE last_stats_check IS NULL AND last_activity_timestamp > now() - '31 days'::interval
+    )
+    SELECT wallet.*
+    FROM wallet
+    JOIN shifted ON shifted.wallet_id = wallet.id
+    ORDER BY wallet.last_stats_check NULLS FIRST
+    LIMIT $2
+"""
+
+# Обновление схемы существующей БД под модели (update_schema.py). Имена индексов - как у generate_schemas.
+# Колонка таблицы: NULL - колонки нет
+GET_COLUMN_IS_NULLABLE = """
+    SELECT is_nullable = 'YES' AS is_nullable
+    FROM information_schema.columns
+    WHERE table_schema = current_schema() AND table_name = $1 AND column_name = $2
+"""
+
+ADD_FLIPSIDE_CONFIG_COLUMNS = """
+    ALTER TABLE flipsidecrypto_config
+      ADD COLUMN IF NOT EXISTS swaps_realtime_parsed_untill_inserted_timestamp TIMESTAMPTZ,
+      ADD COLUMN IF NOT EXISTS swaps_realtime_from_block_timestamp TIMESTAMPTZ,
+      ADD COLUMN IF NOT EXISTS swaps_last_block_timestamp TIMESTAMPTZ;
+"""
+
+CREATE_WALLET_CHANGE_LOG_TABLE = """
+    CREATE TABLE IF NOT EXISTS wallet_change_log (
+      wallet_id UUID NOT NULL PRIMARY KEY,
+      min_timestamp BIGINT NOT NULL,
+      changed_at TIMESTAMPTZ NOT NULL
+    );
+    CREATE INDEX IF NOT EXISTS idx_wallet_chan_changed_1969e6 ON wallet_change_log (changed_at);
+"""
+
+ADD_SWAP_INDEX_COLUMN = "ALTER TABLE swap ADD COLUMN IF NOT EXISTS swap_index SMALLINT NOT NULL DEFAULT 0"
+
+# Номер уже сохраненного свапа среди свапов транзакции с тем же кошельком, токеном и типом - в том же порядке,
+# что и utils.assign_swap_indexes (id - для полных дублей), поэтому повторный сбор периода дает те же ключи.
+# Свапы без пары по ключу остаются с 0
+NUMBER_EXISTING_SWAPS = """
+    UPDATE swap
+    SET swap_index = numbered.swap_index
+    FROM (
+      SELECT
+        id,
+        row_number() OVER (
+          PARTITION BY tx_hash, wallet_id, token_id, event_type
+          ORDER BY quote_amount, token_amount, block_id, id
+        ) - 1 AS swap_index
+      FROM swap
+      WHERE tx_hash IS NOT NULL
+    ) AS numbered
+    WHERE swap.id = numbered.id AND numbered.swap_index > 0
+"""
+
+SET_SWAP_TIMESTAMP_NOT_NULL = "ALTER TABLE swap ALTER COLUMN timestamp SET NOT NULL"
+
+# Есть ли у таблицы $1 уникальный индекс (или ограничение) ровно по колонкам $2 в их порядке - под любым именем
+HAS_UNIQUE_INDEX = """
+    SELECT EXISTS (
+      SELECT 1
+      FROM pg_index
+      WHERE pg_index.indrelid = to_regclass($1) AND pg_index.indisunique
+        AND ARRAY(
+          SELECT pg_attribute.attname::text
+          FROM unnest(pg_index.indkey) WITH ORDINALITY AS keys (attnum, position)
+          JOIN pg_attribute ON pg_attribute.attrelid = pg_index.indrelid AND pg_attribute.attnum = keys.attnum
+          ORDER BY keys.position
+        ) = $2::text[]
+    ) AS has_index
+"""
+
+# Ключ дедупликации swap - то же имя, что в CREATE_PARTITIONED_SWAP_TABLE
+ADD_SWAP_DEDUP_CONSTRAINT = """
+    ALTER TABLE swap ADD CONSTRAINT uid_swap_tx_hash_wallet_token_event_index_timestamp
+      UNIQUE (tx_hash, wallet_id, token_id, event_type, swap_index, timestamp)
+"""
+
+SWAP_DEDUP_KEY_COLUMNS = ["tx_hash", "wallet_id", "token_id", "event_type", "swap_index", "timestamp"]
@@ -37,6 +37,7 @@ class SQLAlchemySwapRepository(
         blocks_before: int = 3,
         blocks_after: int = 3,
         exclude_wallets: Optional[List] = None,
+        timestamp: int | None = None,
     ):
         """Возвращает соседние сделки (buy/sell) по токену в заданном диапазоне блоков"""
         raise NotImplementedError
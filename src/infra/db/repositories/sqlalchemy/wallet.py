@@ -140,6 +140,15 @@ class SQLAlchemyWalletRepository(
     async def get_wallets_for_update_stats(self, count: int = 1) -> list[WalletEntity]:
         raise NotImplementedError
 
+    async def get_changed_wallets_for_update_stats(self, count: int = 1) -> tuple[list[WalletEntity], list[tuple]]:
+        raise NotImplementedError
+
+    async def get_wallets_with_shifted_windows(self, count: int = 1, lookback_days: int = 2) -> list[WalletEntity]:
+        raise NotImplementedError
+
+    async def delete_wallet_changes(self, changes: list[tuple]) -> int:
+        raise NotImplementedError
+
     # noinspection PyMethodMayBeStatic
     async def get_wallets_by_token_addresses(
         self,
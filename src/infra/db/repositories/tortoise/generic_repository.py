@@ -1,4 +1,5 @@
 import logging
+import uuid
 from dataclasses import asdict
 from typing import (
     Any,
@@ -24,6 +25,8 @@ from src.domain.entities.base_entity import (
 from src.infra.db import queries
 from src.infra.db.utils import (
     bulk_update_records_query,
+    model_unnest_params,
+    unnest_params_sql,
 )
 
 logger = logging.getLogger(__name__)
@@ -236,3 +239,96 @@ class TortoiseGenericRepository(BaseGenericRepository[BaseEntity]):
             on_conflict=on_conflict,
             using_db=using_db,
         )
+
+    async def bulk_upsert_returning(
+        self,
+        objects: list[Model],
+        unique_field: str = "address",
+        returning_fields: Sequence[str] = ("id",),
+        using_db: Optional[BaseDBAsyncClient] = None,
+    ) -> dict[Any, dict]:
+        """
+        Вставка записей с сохранением существующих и получение их полей одним запросом (unnest).
+        Возвращает {значение unique_field: {поле: значение}} как для новых, так и для существующих записей
+        """
+        if not objects:
+            return {}
+        # ON CONFLICT DO UPDATE не допускает двух входных строк с одним ключом
+        objects = list({getattr(obj, unique_field): obj for obj in objects}.values())
+        table_name = self.model_class._meta.db_table
+        columns, sql_types, arrays = model_unnest_params(self.model_class, objects)
+        returning = [unique_field, *returning_fields]
+        query = queries.UPSERT_RETURNING.format(
+            table_name=table_name,
+            columns=", ".join(columns),
+            unnest_params=unnest_params_sql(sql_types),
+            unique_column=unique_field,
+            returning=", ".join(returning),
+        )
+        connection = using_db or Tortoise.get_connection("default")
+        rows = await connection.execute_query_dict(query, arrays)
+        fields_map = self.model_class._meta.fields_map
+        return {
+            row[unique_field]: {field: fields_map[field].to_python_value(row[field]) for field in returning_fields}
+            for row in rows
+        }
+
+    async def bulk_copy(
+        self,
+        records: Iterable[Sequence],
+        columns: Sequence[str],
+        using_db: Optional[BaseDBAsyncClient] = None,
+    ) -> None:
+        """
+        Массовая вставка через бинарный протокол COPY (asyncpg copy_records_to_table).
+        Записи - кортежи значений в порядке columns, без создания обьектов моделей и сборки INSERT-ов
+        """
+        if not records:
+            return None
+        # Внутри in_transaction get_connection возвращает соединение транзакции
+        connection = using_db or Tortoise.get_connection("default")
+        async with connection.acquire_connection() as conn:
+            await conn.copy_records_to_table(
+                self.model_class._meta.db_table,
+                records=records,
+                columns=list(columns),
+            )
+
+    async def bulk_copy_upsert(
+        self,
+        records: Iterable[Sequence],
+        columns: Sequence[str],
+        on_conflict: Iterable[str],
+        update_fields: Iterable[str],
+        using_db: Optional[BaseDBAsyncClient] = None,
+    ) -> None:
+        """
+        Upsert через COPY: записи копируются во временную staging-таблицу,
+        затем сливаются в основную таблицу одним INSERT ... ON CONFLICT DO UPDATE
+        """
+        if not records:
+            return None
+        table_name = self.model_class._meta.db_table
+        # Уникальное имя - несколько upsert-ов могут выполняться в одной транзакции
+        staging_table = f"{table_name}_staging_{uuid.uuid4().hex[:12]}"
+        columns = list(columns)
+        columns_str = ", ".join(columns)
+        merge_query = queries.MERGE_FROM_STAGING_TABLE.format(
+            table_name=table_name,
+            staging_table=staging_table,
+            columns=columns_str,
+            conflict_columns=", ".join(on_conflict),
+            set_clause=", ".join(f"{field} = EXCLUDED.{field}" for field in update_fields),
+        )
+        connection_name = using_db.connection_name if using_db else None
+        async with in_transaction(connection_name) as transaction:
+            async with transaction.acquire_connection() as conn:
+                await conn.execute(
+                    queries.CREATE_STAGING_TABLE.format(
+                        staging_table=staging_table,
+                        table_name=table_name,
+                    )
+                )
+                await conn.copy_records_to_table(staging_table, records=records, columns=columns)
+                await conn.execute(merge_query)
+                await conn.execute(queries.DROP_STAGING_TABLE.format(staging_table=staging_table))
@@ -1,26 +1,33 @@
+from datetime import datetime
 from typing import List, Optional
 
+from tortoise import Tortoise
+
 from src.application.interfaces.repositories.swap import (
     BaseSwapRepository,
 )
+from src.infra.db import partitions, queries
 from src.infra.db.models.tortoise.swap import Swap
 
 from .generic_repository import (
     TortoiseGenericRepository,
 )
 
+# Соседние по блокам свапы лежат в пределах нескольких секунд - окно по времени для отсечения секций
+NEIGHBORS_TIMESTAMP_WINDOW = 600
+
 
 class TortoiseSwapRepository(TortoiseGenericRepository, BaseSwapRepository):
-    model = Swap
+    model_class = Swap
 
-    async def get_first_by_wallet_and_tokens(
+    async def get_first_by_wallet_and_token(
         self,
         wallet_id: str,
         token_id: str,
         event_type: str | None = None,
     ):
         """Возвращает первую по block_id swap операцию (buy/sell) для заданного кошелька и токена"""
-        query = self.model.filter(
+        query = self.model_class.filter(
             wallet_id=wallet_id,
             token_id=token_id,
         ).order_by("block_id")
@@ -36,16 +43,118 @@ class TortoiseSwapRepository(TortoiseGenericRepository, BaseSwapRepository):
         blocks_before: int = 3,
         blocks_after: int = 3,
         exclude_wallets: Optional[List] = None,
+        timestamp: int | None = None,
+        timestamp_window: int = NEIGHBORS_TIMESTAMP_WINDOW,
     ):
-        """Возвращает соседние сделки (buy/sell) по токену в заданном диапазоне блоков"""
-        query = self.model.filter(
+        """
+        Возвращает соседние сделки (buy/sell) по токену в заданном диапазоне блоков.
+        timestamp - время свапа в блоке block_id: запрос читает только секции swap вокруг него
+        """
+        query = self.model_class.filter(
             token_id=token_id,
             block_id__gte=block_id - blocks_before,
             block_id__lte=block_id + blocks_after,
             event_type=event_type,
         )
+        if timestamp is not None:
+            query = query.filter(
+                timestamp__gte=timestamp - timestamp_window,
+                timestamp__lte=timestamp + timestamp_window,
+            )
         if event_type:
             query = query.filter(event_type=event_type)
         if exclude_wallets:
             query = query.filter(wallet_id__not_in=exclude_wallets)
         return await query.all()
+
+    # noinspection PyMethodMayBeStatic
+    async def get_existing_keys(
+        self,
+        keys: list[tuple],
+        timestamp_from: int,
+        timestamp_to: int,
+        chunk_size: int = 50000,
+    ) -> set[tuple]:
+        """
+        Какие из ключей (tx_hash, wallet_id, token_id, event_type, swap_index) свапов
+        за [timestamp_from, timestamp_to] уже есть в БД. Один запрос с JOIN на unnest на каждые chunk_size ключей
+        """
+        connection = Tortoise.get_connection("default")
+        existing = set()
+        for i in range(0, len(keys), chunk_size):
+            chunk = keys[i : i + chunk_size]
+            rows = await connection.execute_query_dict(
+                queries.GET_EXISTING_SWAP_KEYS,
+                [*(list(column) for column in zip(*chunk)), timestamp_from, timestamp_to],
+            )
+            existing.update(
+                (row["tx_hash"], row["wallet_id"], row["token_id"], row["event_type"], row["swap_index"])
+                for row in rows
+            )
+        return existing
+
+    # noinspection PyMethodMayBeStatic
+    async def get_existing_tx_hashes(
+        self,
+        tx_hashes: list[str],
+        timestamp_from: int,
+        timestamp_to: int,
+        chunk_size: int = 50000,
+    ) -> set[str]:
+        """Какие из транзакций уже имеют свапы за [timestamp_from, timestamp_to] в БД"""
+        connection = Tortoise.get_connection("default")
+        existing = set()
+        for i in range(0, len(tx_hashes), chunk_size):
+            rows = await connection.execute_query_dict(
+                queries.GET_EXISTING_SWAP_TX_HASHES,
+                [tx_hashes[i : i + chunk_size], timestamp_from, timestamp_to],
+            )
+            existing.update(row["tx_hash"] for row in rows)
+        return existing
+
+    # noinspection PyMethodMayBeStatic
+    async def has_swaps(self, timestamp_from: int, timestamp_to: int) -> bool:
+        """Есть ли в БД свапы за [timestamp_from, timestamp_to]"""
+        rows = await Tortoise.get_connection("default").execute_query_dict(
+            queries.HAS_SWAPS_IN_RANGE,
+            [timestamp_from, timestamp_to],
+        )
+        return rows[0]["has_swaps"]
+
+    # noinspection PyMethodMayBeStatic
+    async def get_partitions(self) -> list[str] | None:
+        """Секции таблицы или None, если таблица не секционирована"""
+        rows = await Tortoise.get_connection("default").execute_query_dict(
+            queries.GET_TABLE_PARTITIONS,
+            [self.model_class._meta.db_table],
+        )
+        if not rows or rows[0]["relkind"] != "p":
+            return None
+        return [row["partition_name"] for row in rows if row["partition_name"]]
+
+    async def create_partitions(
+        self,
+        start_time: datetime,
+        end_time: datetime,
+        interval: str,
+        existing: list[str] | None = None,
+    ) -> list[str]:
+        """Создает недостающие секции периодов, покрывающих [start_time, end_time]. Возвращает созданные"""
+        connection = Tortoise.get_connection("default")
+        table_name = self.model_class._meta.db_table
+        existing = set(existing if existing is not None else await self.get_partitions() or [])
+        created = []
+        for start, end in partitions.split_into_partitions(start_time, end_time, interval):
+            partition_name = partitions.partition_name(table_name, start, interval)
+            if partition_name in existing:
+                continue
+            await connection.execute_script(
+                queries.CREATE_PARTITION.format(
+                    partition_name=partition_name,
+                    table_name=table_name,
+                    start=int(start.timestamp()),
+                    end=int(end.timestamp()),
+                )
+            )
+            created.append(partition_name)
+        return created
@@ -13,7 +13,7 @@ from .generic_repository import (
 
 
 class TortoiseTokenRepository(TortoiseGenericRepository, BaseTokenRepository):
-    model = Token
+    model_class = Token
 
     # noinspection PyMethodMayBeStatic
     async def get_by_address(self, address: str) -> Token | None:
@@ -24,4 +24,4 @@ class TortoiseTokenPriceRepository(
     TortoiseGenericRepository,
     BaseTokenPriceRepository,
 ):
-    model = TokenPrice
+    model_class = TokenPrice
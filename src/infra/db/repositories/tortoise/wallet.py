@@ -1,7 +1,8 @@
 import logging
 import math
-from typing import Optional
+from typing import AsyncIterator, Optional
 
+from tortoise import Tortoise
 from tortoise.functions import Count
 
 from src.application.interfaces.repositories.wallet import (
@@ -38,6 +39,10 @@ from src.infra.db.models.tortoise import (
     WalletStatisticBuyPriceGt15kAll,
     WalletToken,
 )
+from src.infra.db.utils import (
+    model_unnest_params,
+    unnest_params_sql,
+)
 
 from .generic_repository import (
     TortoiseGenericRepository,
@@ -109,6 +114,40 @@ class TortoiseWalletTokenRepository(
     model_class = WalletToken
     entity_class = WalletTokenEntity
 
+    async def iter_by_wallet_token_pairs(
+        self,
+        pairs: list[tuple],
+        chunk_size: int = 50000,
+    ) -> AsyncIterator[list[WalletToken]]:
+        """
+        Существующие WalletToken для пар (wallet_id, token_id).
+        Один запрос с JOIN на unnest на каждые chunk_size пар, результаты отдаются по частям
+        """
+        query = queries.GET_WALLET_TOKENS_BY_PAIRS.format(table_name=WalletToken._meta.db_table)
+        connection = Tortoise.get_connection("default")
+        for i in range(0, len(pairs), chunk_size):
+            chunk = pairs[i : i + chunk_size]
+            wallet_ids = [wallet_id for wallet_id, _ in chunk]
+            token_ids = [token_id for _, token_id in chunk]
+            rows = await connection.execute_query_dict(query, [wallet_ids, token_ids])
+            yield [WalletToken._init_from_db(**row) for row in rows]
+
+    # noinspection PyMethodMayBeStatic
+    async def merge_deltas(self, objects: list[WalletToken]) -> None:
+        """
+        Слияние статистик, посчитанных только по новым активностям, с существующими записями
+        одним INSERT ... ON CONFLICT DO UPDATE (суммы складываются, первые/последние времена - LEAST/GREATEST)
+        """
+        if not objects:
+            return None
+        columns, sql_types, arrays = model_unnest_params(WalletToken, objects)
+        query = queries.MERGE_WALLET_TOKEN_DELTAS.format(
+            table_name=WalletToken._meta.db_table,
+            columns=", ".join(columns),
+            unnest_params=unnest_params_sql(sql_types),
+        )
+        await Tortoise.get_connection("default").execute_query(query, arrays)
+
 
 class TortoiseWalletRepository(
     TortoiseGenericRepository,
@@ -139,6 +178,61 @@ class TortoiseWalletRepository(
         res = await self._execute_query(query)
         return [WalletEntity(**obj) for obj in res[1] or []]
 
+    # noinspection PyMethodMayBeStatic
+    async def get_changed_wallets_for_update_stats(self, count: int = 1) -> tuple[list[WalletEntity], list[tuple]]:
+        """
+        Кошельки из журнала изменений (старые изменения первыми) и прочитанные записи журнала
+        (wallet_id, min_timestamp, changed_at) - их удаляет delete_wallet_changes после пересчета
+        """
+        rows = await Tortoise.get_connection("default").execute_query_dict(
+            queries.GET_CHANGED_WALLETS_FOR_UPDATE_STATS,
+            [count],
+        )
+        wallets = []
+        changes = []
+        for row in rows:
+            changes.append((row.pop("change_wallet_id"), row.pop("change_min_timestamp"), row.pop("change_changed_at")))
+            if row["id"] is not None:
+                wallets.append(WalletEntity(**row))
+        return wallets, changes
+
+    # noinspection PyMethodMayBeStatic
+    async def get_wallets_with_shifted_windows(self, count: int = 1, lookback_days: int = 2) -> list[WalletEntity]:
+        """Кошельки без новых свапов, статистики 7d/30d которых изменились со сдвигом окон"""
+        rows = await Tortoise.get_connection("default").execute_query_dict(
+            queries.GET_WALLETS_WITH_SHIFTED_WINDOWS,
+            [lookback_days, count],
+        )
+        return [WalletEntity(**row) for row in rows]
+
+    # noinspection PyMethodMayBeStatic
+    async def delete_wallet_changes(self, changes: list[tuple]) -> int:
+        """Удаляет записи журнала, не изменившиеся после чтения"""
+        if not changes:
+            return 0
+        wallet_ids, _, changed_at = zip(*changes)
+        deleted, _ = await Tortoise.get_connection("default").execute_query(
+            queries.DELETE_WALLET_CHANGES,
+            [list(wallet_ids), list(changed_at)],
+        )
+        return deleted
+
+    # noinspection PyMethodMayBeStatic
+    async def create_window_anchor_index(self, index_name: str = queries.WALLET_TOKEN_WINDOW_ANCHOR_INDEX) -> None:
+        """
+        Индекс wallet_token для поиска токенов, покидающих окна 7d/30d.
+        INVALID-индекс после прерванного построения удаляется и строится заново
+        """
+        connection = Tortoise.get_connection("default")
+        rows = await connection.execute_query_dict(queries.GET_INDEX_IS_VALID, [index_name])
+        is_valid = rows[0]["is_valid"] if rows else None
+        if is_valid:
+            return
+        if is_valid is False:
+            logger.warning(f"Индекс {index_name} INVALID (прерванное построение) - пересоздаем")
+            await connection.execute_script(queries.DROP_INDEX_CONCURRENTLY.format(index_name=index_name))
+        await connection.execute_script(queries.CREATE_WALLET_TOKEN_WINDOW_ANCHOR_INDEX.format(index_name=index_name))
+
     # noinspection PyMethodMayBeStatic
     async def get_wallets_by_token_addresses(
         self,
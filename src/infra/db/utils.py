@@ -95,3 +95,44 @@ def convert_to_db_value(value, field_type=None, field_info=None):
     elif field_type == "charfield":
         return f"'{value}'"
     return str(value)  # Если не указан тип поля, просто возвращаем строку
+
+
+def model_copy_records(
+    model_cls: type[Model],
+    objects: list,
+    fields: list[str] | None = None,
+) -> tuple[list[str], list[tuple]]:
+    """
+    Преобразует обьекты моделей в кортежи db-значений для COPY.
+    Возвращает имена колонок и записи в порядке этих колонок
+    """
+    fields_db_projection = model_cls._meta.fields_db_projection
+    if fields is None:
+        fields = list(fields_db_projection)
+    columns = [fields_db_projection[field] for field in fields]
+    # to_db_value приводит значения так же, как bulk_create (в т.ч. auto_now для created_at/updated_at)
+    converters = [(field, model_cls._meta.fields_map[field].to_db_value) for field in fields]
+    records = [tuple(to_db_value(getattr(obj, field), obj) for field, to_db_value in converters) for obj in objects]
+    return columns, records
+
+
+def model_unnest_params(
+    model_cls: type[Model],
+    objects: list,
+) -> tuple[list[str], list[str], list[list]]:
+    """
+    Колонки (без генерируемых БД), их SQL-типы и массивы значений по колонкам - для вставки через unnest
+    """
+    generated_columns = set(model_cls._meta.generated_db_fields)
+    fields = [
+        field for field, column in model_cls._meta.fields_db_projection.items() if column not in generated_columns
+    ]
+    columns, records = model_copy_records(model_cls, objects, fields)
+    sql_types = [model_cls._meta.fields_map[field].get_for_dialect("postgres", "SQL_TYPE") for field in fields]
+    arrays = [list(values) for values in zip(*records)]
+    return columns, sql_types, arrays
+
+
+def unnest_params_sql(sql_types: list[str]) -> str:
+    """Параметры unnest вида $1::UUID[], $2::TIMESTAMPTZ[], ..."""
+    return ", ".join(f"${i}::{sql_type}[]" for i, sql_type in enumerate(sql_types, start=1))
@@ -0,0 +1,55 @@
+"""
+Упорядоченные по времени UUID (версия 7, RFC 9562) для первичных ключей.
+
+Раскладка: 48 бит миллисекунд Unix-времени, версия, 26-битный счетчик внутри миллисекунды
+(12 бит rand_a + 14 старших бит rand_b), вариант, 48 случайных бит.
+ID процесса строго возрастают, поэтому вставки в индекс первичного ключа идут в его правый край,
+а не на случайные страницы, как у uuid4/uuid1 (у uuid1 младшие биты времени стоят в начале).
+"""
+
+import os
+import threading
+import time
+import uuid
+
+COUNTER_BITS = 26
+RANDOM_BYTES = 6
+
+_lock = threading.Lock()
+# Последние выданные миллисекунда и счетчик: (ms << COUNTER_BITS) | counter
+_last_sequence = 0
+
+
+def _reserve_sequences(count: int) -> int:
+    global _last_sequence
+    with _lock:
+        start = max((time.time_ns() // 1_000_000) << COUNTER_BITS, _last_sequence + 1)
+        _last_sequence = start + count - 1
+    return start
+
+
+def uuid7_batch(count: int) -> list[uuid.UUID]:
+    """count возрастающих UUIDv7: одна блокировка и один вызов os.urandom на пачку"""
+    if count <= 0:
+        return []
+    start = _reserve_sequences(count)
+    random_bytes = os.urandom(RANDOM_BYTES * count)
+    ids = []
+    for i in range(count):
+        sequence = start + i
+        offset = i * RANDOM_BYTES
+        ids.append(
+            uuid.UUID(
+                int=(sequence >> COUNTER_BITS) << 80
+                | 0x7 << 76
+                | (sequence >> 14 & 0xFFF) << 64
+                | 0b10 << 62
+                | (sequence & 0x3FFF) << 48
+                | int.from_bytes(random_bytes[offset : offset + RANDOM_BYTES], "big")
+            )
+        )
+    return ids
+
+
+def uuid7() -> uuid.UUID:
+    return uuid7_batch(1)[0]